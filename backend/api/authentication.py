@@ -0,0 +1,208 @@
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .cache import is_cache_shared
+
+User = get_user_model()
+
+TOKEN_KEY = 'api:auth-token:{}'
+GENERATION_KEY = 'api:auth-generation:{}'
+
+
+def get_generation(user_id):
+    """Поколение записей пользователя в общем кэше.
+
+    Начальное значение берется из времени, чтобы после вытеснения
+    ключа записи, сохраненные при старом поколении, не ожили.
+    """
+    key = GENERATION_KEY.format(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(user_id):
+    key = GENERATION_KEY.format(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def get_user_fields():
+    """Кэшируемые поля пользователя; хэш пароля остается отложенным."""
+    return [
+        field.attname for field in User._meta.concrete_fields
+        if field.attname != 'password'
+    ]
+
+
+class LocalTokenStore:
+    """LRU-кэш процесса с ограниченным размером и временем жизни."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            values, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return values
+
+    def set(self, key, values):
+        with self.lock:
+            self.entries[key] = (values, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class SharedTokenStore:
+    """Хранение в общем кэше Django, видимое всем процессам."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+
+    @staticmethod
+    def cache_key(key):
+        return TOKEN_KEY.format(hashlib.sha256(key.encode()).hexdigest())
+
+    def get(self, key):
+        return cache.get(self.cache_key(key))
+
+    def set(self, key, values):
+        cache.set(self.cache_key(key), values, self.ttl)
+
+    def delete_many(self, keys):
+        cache.delete_many([self.cache_key(key) for key in keys])
+
+    def __len__(self):
+        return 0
+
+
+class TokenCache:
+    """Кэш `ключ токена → поля пользователя` со счетчиком попаданий.
+
+    Хранятся значения полей, а не объекты: каждый запрос получает
+    собственный экземпляр `User`. С `AUTH_TOKEN_CACHE_SHARED` записи
+    лежат в общем кэше, и сброс сразу виден всем воркерам; иначе —
+    в LRU процесса размером `AUTH_TOKEN_CACHE_SIZE`. Если кэш Django
+    общий, записи LRU сверяются с поколением пользователя в нем,
+    которое повышается при сбросе в любом воркере.
+    """
+
+    def __init__(self):
+        self.store = None
+        self.versioned = False
+        self.stats = Counter(hits=0, misses=0)
+        self.stats_lock = threading.Lock()
+
+    def get_store(self):
+        if self.store is None:
+            ttl = settings.AUTH_TOKEN_CACHE_TTL
+            if settings.AUTH_TOKEN_CACHE_SHARED:
+                self.store = SharedTokenStore(ttl)
+            else:
+                self.store = LocalTokenStore(
+                    settings.AUTH_TOKEN_CACHE_SIZE, ttl
+                )
+                self.versioned = is_cache_shared()
+        return self.store
+
+    def get(self, key):
+        values = self.get_store().get(key)
+        if values is not None and self.versioned:
+            user_id, generation, values = values
+            if generation != get_generation(user_id):
+                values = None
+        with self.stats_lock:
+            self.stats['hits' if values is not None else 'misses'] += 1
+        if values is None:
+            return None
+        return User.from_db('default', get_user_fields(), values)
+
+    def set(self, key, user):
+        store = self.get_store()
+        values = [getattr(user, name) for name in get_user_fields()]
+        if self.versioned:
+            values = (user.pk, get_generation(user.pk), values)
+        store.set(key, values)
+
+    def invalidate(self, user_id, *keys):
+        """Сброс записей пользователя `user_id` с ключами `keys`."""
+        self.get_store().delete_many(keys)
+        if self.versioned:
+            bump_generation(user_id)
+
+    def user_keys(self, user_id):
+        return list(Token.objects.filter(
+            user_id=user_id
+        ).values_list('key', flat=True))
+
+    def get_stats(self):
+        """Согласованные между собой счетчики и доля попаданий."""
+        with self.stats_lock:
+            hits, misses = self.stats['hits'], self.stats['misses']
+        requests = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / requests, 3) if requests else None,
+        }
+
+    @property
+    def hit_rate(self):
+        """Доля попаданий или `None`, если обращений еще не было."""
+        return self.get_stats()['hit_rate']
+
+    def snapshot(self):
+        return {**self.get_stats(), 'size': len(self.get_store())}
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """`TokenAuthentication` без запроса к базе при попадании в кэш.
+
+    В кэш попадают только активные пользователи. Записи сбрасываются
+    сигналами при удалении токена (выход) и сохранении пользователя
+    (смена пароля, деактивация, изменение профиля).
+    """
+
+    def authenticate_credentials(self, key):
+        if settings.AUTH_TOKEN_CACHE_TTL <= 0:
+            return super().authenticate_credentials(key)
+        user = token_cache.get(key)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user)
+            return user, token
+        return user, Token(key=key, user=user)
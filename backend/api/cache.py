@@ -0,0 +1,194 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from recipe.models import Tag, TrendingRecipe
+from recipe.trending import CACHE_KEY as TRENDING_KEY
+from .routers import read_from_primary
+
+VERSION_KEY = 'api:version:{}'
+TAG_IDS_KEY = 'api:tag-ids:{}'
+PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_cache_shared():
+    """Виден ли кэш Django всем процессам сервера."""
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_CACHES
+
+
+def check_cache_shared():
+    """Версии, ответы и журналы изменений хранятся в кэше Django.
+
+    Если кэш виден только процессу, изменение в одном воркере
+    не сбросит данные остальных, поэтому запуск нескольких
+    воркеров с таким кэшем запрещен.
+    """
+    if settings.GUNICORN_WORKERS > 1 and not is_cache_shared():
+        raise ImproperlyConfigured(
+            f'При GUNICORN_WORKERS={settings.GUNICORN_WORKERS} нужен '
+            'общий кэш: задайте CACHE_LOCATION (memcached) '
+            'или CACHE_BACKEND.'
+        )
+
+
+def object_entity(entity, pk):
+    """Сущность отдельного объекта, например `recipe:5`."""
+    return f'{entity}:{pk}'
+
+
+def get_versions(entities):
+    """Текущие версии сущностей.
+
+    Начальная версия берется из времени, чтобы после вытеснения
+    счетчика из кэша ключи не совпали со старыми.
+    """
+    keys = [VERSION_KEY.format(entity) for entity in entities]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(entity):
+    key = VERSION_KEY.format(entity)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def get_tag_ids():
+    """Словарь `slug → id` всех тегов.
+
+    Хранится в кэше под текущей версией тегов, поэтому изменение
+    тегов сразу приводит к новому ключу.
+    """
+    key = TAG_IDS_KEY.format(*get_versions(('tag',)))
+    tag_ids = cache.get(key)
+    if tag_ids is None:
+        tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, tag_ids, settings.API_CACHE_TIMEOUT)
+    return tag_ids
+
+
+def get_trending(window):
+    """Рейтинг окна `window`: список `(id рецепта, счет)`.
+
+    Рейтинг берется из кэша, куда его записывает `rebuild_trending`;
+    после `TRENDING_CACHE_TIMEOUT` секунд перечитывается из таблицы.
+    """
+    key = TRENDING_KEY.format(window)
+    leaders = cache.get(key)
+    if leaders is None:
+        leaders = list(TrendingRecipe.objects.filter(
+            window=window
+        ).order_by('-score', '-recipe_id').values_list('recipe_id', 'score'))
+        cache.set(key, leaders, settings.TRENDING_CACHE_TIMEOUT)
+    return leaders
+
+
+class AnonymousCacheMixin:
+    """Кэширование ответов на GET-запросы анонимных пользователей.
+
+    Ключ строится из действия, `pk`, версий сущностей из
+    `cache_entities` и нормализованных параметров `cache_query_params`.
+    Для `retrieve` сущность `cache_object_entity` заменяется версией
+    самого объекта, и изменение других объектов его ответ не сбрасывает.
+    Запросы с другими параметрами не кэшируются. Версии повышаются
+    сигналами при изменении моделей, поэтому сбрасывать кэш целиком
+    не требуется. Промах заполняется из основной базы: реплика сразу
+    после повышения версии может отдать устаревшие данные, которые
+    иначе попали бы в кэш под новым ключом.
+    """
+    cache_actions = ('list', 'retrieve')
+    cache_entities = ()
+    cache_query_params = ()
+    cache_object_entity = None
+
+    def get_cache_entities(self, kwargs):
+        entity = self.cache_object_entity
+        if entity is None or self.action_map['get'] != 'retrieve':
+            return self.cache_entities
+        pk = kwargs['pk']
+        if not pk.isdigit():
+            return None
+        return [
+            object_entity(entity, int(pk)) if name == entity else name
+            for name in self.cache_entities
+        ]
+
+    def get_cache_key(self, request, kwargs):
+        if (
+            request.method != 'GET'
+            or 'HTTP_AUTHORIZATION' in request.META
+            or self.action_map.get('get') not in self.cache_actions
+        ):
+            return None
+        entities = self.get_cache_entities(kwargs)
+        if entities is None:
+            return None
+        params = []
+        for name in sorted(request.GET):
+            if name not in self.cache_query_params:
+                return None
+            params.append((name, sorted(request.GET.getlist(name))))
+        raw = repr((
+            type(self).__name__,
+            self.action_map['get'],
+            kwargs.get('pk'),
+            get_versions(entities),
+            params,
+            request.META.get('HTTP_ACCEPT', ''),
+        ))
+        return 'api:response:' + hashlib.md5(raw.encode()).hexdigest()
+
+    def cached_response(self, request, content, content_type,
+                        etag, last_modified):
+        response = HttpResponse(content, content_type=content_type)
+        if etag:
+            response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = last_modified
+        return get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified and parse_http_date_safe(
+                last_modified
+            ),
+            response=response,
+        )
+
+    def dispatch(self, request, *args, **kwargs):
+        key = self.get_cache_key(request, kwargs)
+        if key is None:
+            return super().dispatch(request, *args, **kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            return self.cached_response(request, *cached)
+        read_from_primary(request)
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200:
+            def store(response):
+                cache.set(
+                    key,
+                    (
+                        response.content,
+                        response['Content-Type'],
+                        response.get('ETag'),
+                        response.get('Last-Modified'),
+                    ),
+                    settings.API_CACHE_TIMEOUT
+                )
+            response.add_post_render_callback(store)
+        return response
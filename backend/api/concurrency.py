@@ -0,0 +1,156 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, wraps
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections
+from django.http import StreamingHttpResponse
+
+
+@lru_cache(maxsize=None)
+def get_executor():
+    """Пул потоков для ORM-запросов асинхронных представлений.
+
+    У каждого потока свое соединение с базой, поэтому размер пула
+    `ASGI_THREAD_POOL_SIZE` ограничивает и число соединений процесса.
+    """
+    return ThreadPoolExecutor(
+        max_workers=settings.ASGI_THREAD_POOL_SIZE,
+        thread_name_prefix='orm',
+    )
+
+
+def call_with_connections(func, *args, **kwargs):
+    """Вызов с обслуживанием соединений, как в начале и конце запроса."""
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_pool(func, *args, **kwargs):
+    """Выполнение блокирующего кода в пуле потоков ORM."""
+    return await sync_to_async(
+        call_with_connections,
+        thread_sensitive=False,
+        executor=get_executor(),
+    )(func, *args, **kwargs)
+
+
+async def iterate_in_pool(iterable, size):
+    """Асинхронный итератор по блокирующему `iterable`.
+
+    Элементы читаются в пуле потоков ORM пачками по `size`. Пачки
+    могут читаться разными потоками, поэтому `iterable` не должен
+    держать открытый курсор базы между пачками.
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = await run_in_pool(lambda: list(islice(iterator, size)))
+        if not batch:
+            return
+        for item in batch:
+            yield item
+
+
+class AsyncStreamingHttpResponse(StreamingHttpResponse):
+    """Потоковый ответ, тело которого — асинхронный итератор.
+
+    Отдается только `StreamingASGIHandler`.
+    """
+    is_async = True
+
+    @property
+    def streaming_content(self):
+        return self.iterate_bytes(self._iterator)
+
+    @streaming_content.setter
+    def streaming_content(self, value):
+        self._iterator = value
+
+    async def iterate_bytes(self, parts):
+        async for part in parts:
+            yield self.make_bytes(part)
+
+    def __iter__(self):
+        raise TypeError('Тело ответа читается только асинхронно')
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """`ASGIHandler`, отдающий и `AsyncStreamingHttpResponse`.
+
+    Django 3.2 читает потоковый ответ синхронно в цикле событий,
+    где запросы к базе запрещены; тело асинхронного ответа читается
+    через `async for`, и запросы выполняются в пуле потоков.
+    """
+
+    async def send_response(self, response, send):
+        if not getattr(response, 'is_async', False):
+            return await super().send_response(response, send)
+        headers = [
+            (
+                header.encode('ascii') if isinstance(header, str) else header,
+                value.encode('latin1') if isinstance(value, str) else value,
+            )
+            for header, value in response.items()
+        ]
+        headers += [
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            for cookie in response.cookies.values()
+        ]
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+        try:
+            async for part in response.streaming_content:
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            await send({'type': 'http.response.body'})
+        finally:
+            await sync_to_async(response.close, thread_sensitive=True)()
+
+
+def async_view(view, actions):
+    """Асинхронная обертка представления DRF.
+
+    Методы, соответствующие действиям `actions`, выполняются в пуле
+    потоков ORM параллельно. Остальные, как и синхронные представления
+    при ASGI, выполняются в общем потоке Django.
+    """
+    sync_view = sync_to_async(view)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if view.actions.get(request.method.lower()) in actions:
+            return await run_in_pool(view, request, *args, **kwargs)
+        return await sync_view(request, *args, **kwargs)
+
+    return wrapper
+
+
+class AsyncActionsMixin:
+    """Асинхронные действия `async_actions` при `ASYNC_VIEWS`.
+
+    Настройка включается при запуске через `foodgram_backend.asgi`;
+    при WSGI представления остаются синхронными.
+    """
+    async_actions = ('list', 'retrieve')
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if (
+            not settings.ASYNC_VIEWS
+            or not set(actions.values()) & set(cls.async_actions)
+        ):
+            return view
+        return async_view(view, cls.async_actions)
@@ -0,0 +1,116 @@
+import hashlib
+
+from django.db.models import Exists, OuterRef
+from django.views.decorators.http import condition
+
+from recipe.models import (
+    Favorite,
+    Recipe,
+    Shopping,
+    Subscription,
+    TableVersion,
+)
+
+RECIPE_TABLES = ('tag', 'ingredient', 'user')
+
+
+def get_table_versions(request, names):
+    """Версии таблиц `names` в виде `(версия, дата создания, дата
+    изменения)`, запрошенные один раз на запрос."""
+    versions = getattr(request, '_table_versions', None)
+    if versions is None:
+        versions = {
+            name: values
+            for name, *values in TableVersion.objects.values_list(
+                'name', 'version', 'created_at', 'updated_at'
+            )
+        }
+        request._table_versions = versions
+    return [versions.get(name, (0, None, None)) for name in names]
+
+
+def version_tag(name, version, created_at):
+    """Часть `ETag` таблицы: имя, версия и время создания счетчика."""
+    if created_at is None:
+        return f'{name}{version}'
+    return f'{name}{version}.{int(created_at.timestamp() * 1000):x}'
+
+
+def table_condition(*names):
+    """Условный GET для ответов, зависящих только от таблиц `names`."""
+    def etag(request, *args, **kwargs):
+        versions = get_table_versions(request, names)
+        return '-'.join(
+            version_tag(name, version, created_at)
+            for name, (version, created_at, _) in zip(names, versions)
+        )
+
+    def last_modified(request, *args, **kwargs):
+        dates = [
+            updated_at
+            for *_, updated_at in get_table_versions(request, names)
+            if updated_at is not None
+        ]
+        return max(dates, default=None)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def get_recipe_state(request, pk):
+    """Дата изменения рецепта и флаги текущего пользователя."""
+    state = getattr(request, '_recipe_state', None)
+    if state is None:
+        recipes = Recipe.objects.filter(pk=pk)
+        fields = ['updated_at']
+        user = request.user
+        if user.is_authenticated:
+            recipes = recipes.annotate(
+                favorited=Exists(Favorite.objects.filter(
+                    user=user, recipe=OuterRef('pk')
+                )),
+                in_shopping_cart=Exists(Shopping.objects.filter(
+                    user=user, recipe=OuterRef('pk')
+                )),
+                subscribed=Exists(Subscription.objects.filter(
+                    user=user, subscriber=OuterRef('author')
+                )),
+            )
+            fields += ['favorited', 'in_shopping_cart', 'subscribed']
+        state = request._recipe_state = recipes.values_list(
+            *fields
+        ).first()
+    return state
+
+
+def recipe_etag(request, pk=None, **kwargs):
+    state = get_recipe_state(request, pk)
+    if state is None:
+        return None
+    versions = get_table_versions(request, RECIPE_TABLES)
+    raw = repr((pk, request.user.pk, state, versions))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def recipe_last_modified(request, pk=None, **kwargs):
+    """Дата изменения рецепта, тегов, ингредиентов или пользователей.
+
+    Для авторизованных пользователей не отдается: ответ зависит
+    от избранного и списка покупок, у которых нет даты изменения.
+    """
+    if request.user.is_authenticated:
+        return None
+    state = get_recipe_state(request, pk)
+    if state is None:
+        return None
+    dates = [state[0]] + [
+        updated_at
+        for *_, updated_at in get_table_versions(request, RECIPE_TABLES)
+        if updated_at is not None
+    ]
+    return max(dates)
+
+
+recipe_condition = condition(
+    etag_func=recipe_etag,
+    last_modified_func=recipe_last_modified
+)
@@ -1,39 +1,168 @@
-import base64
-import webcolors
-
-from rest_framework import serializers
-from django.core.files.base import ContentFile
-from recipe.models import Subscription
-
-
-class Hex2NameColor(serializers.Field):
-    """Сериализатор поля цвета тега."""
-    def to_representation(self, value):
-        return value
-
-    def to_internal_value(self, data):
-        try:
-            data = webcolors.hex_to_name(data)
-        except ValueError:
-            raise serializers.ValidationError('Для этого цвета нет имени')
-        return data
-
-
-class Base64ImageField(serializers.ImageField):
-    """Сериализатор поля картинки рецепта."""
-    def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
-
-        return super().to_internal_value(data)
-
-
-def is_subscribed(user, subscriber):
-    if user.is_authenticated:
-        return Subscription.objects.filter(
-            user=user, subscriber=subscriber
-        ).exists()
-    return False
+import base64
+import binascii
+import weakref
+import webcolors
+
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from recipe.models import Subscription
+
+BASE64_CHUNK_SIZE = 64 * 1024
+BASE64_SEPARATOR = ';base64,'
+
+
+class Hex2NameColor(serializers.Field):
+    """Сериализатор поля цвета тега."""
+    def to_representation(self, value):
+        return value
+
+    def to_internal_value(self, data):
+        try:
+            data = webcolors.hex_to_name(data)
+        except ValueError:
+            raise serializers.ValidationError('Для этого цвета нет имени')
+        return data
+
+
+def close_quietly(file):
+    try:
+        file.close()
+    except FileNotFoundError:
+        pass
+
+
+class Base64UploadedFile(TemporaryUploadedFile):
+    """Временный файл декодированной картинки.
+
+    Хранилище перемещает файл при сохранении рецепта, поэтому
+    при сборке мусора он закрывается без ошибки об отсутствии файла.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        weakref.finalize(self, close_quietly, self.file)
+
+
+class Base64ImageField(serializers.ImageField):
+    """Сериализатор поля картинки рецепта.
+
+    Принимает картинку строкой `data:image/...;base64,...` или файлом
+    из multipart-запроса. Base64 декодируется частями во временный
+    файл, размер в байтах и пикселях проверяется до полного
+    декодирования картинки Pillow.
+    """
+    default_error_messages = {
+        'too_large': 'Размер картинки больше {max_size} байт.',
+        'too_big': 'Картинка больше {max_side} пикселей по стороне.',
+        'invalid_base64': 'Некорректная строка base64.',
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) and data.startswith('data:image'):
+            data = self.decode(data)
+        elif getattr(data, 'size', 0) > settings.RECIPE_IMAGE_MAX_SIZE:
+            self.fail('too_large', max_size=settings.RECIPE_IMAGE_MAX_SIZE)
+        self.check_dimensions(data)
+        return super().to_internal_value(data)
+
+    def decode(self, data):
+        """Декодирование частями без копии всей строки base64."""
+        separator = data.find(BASE64_SEPARATOR)
+        if separator < 0:
+            self.fail('invalid_base64')
+        ext = data[:separator].split('/')[-1]
+        begin = separator + len(BASE64_SEPARATOR)
+        max_size = settings.RECIPE_IMAGE_MAX_SIZE
+        if (len(data) - begin) // 4 * 3 > max_size + 2:
+            self.fail('too_large', max_size=max_size)
+        file = Base64UploadedFile(
+            'temp.' + ext, 'image/' + ext, 0, None
+        )
+        try:
+            for start in range(begin, len(data), BASE64_CHUNK_SIZE):
+                chunk = base64.b64decode(
+                    data[start:start + BASE64_CHUNK_SIZE], validate=True
+                )
+                file.size += len(chunk)
+                if file.size > max_size:
+                    self.fail('too_large', max_size=max_size)
+                file.write(chunk)
+        except binascii.Error:
+            file.close()
+            self.fail('invalid_base64')
+        except serializers.ValidationError:
+            file.close()
+            raise
+        file.seek(0)
+        return file
+
+    def check_dimensions(self, data):
+        if not hasattr(data, 'seek'):
+            return
+        max_side = settings.RECIPE_IMAGE_MAX_SIDE
+        try:
+            with Image.open(data) as image:
+                width, height = image.size
+        except (Image.DecompressionBombError, OSError):
+            self.fail('invalid_image')
+        finally:
+            data.seek(0)
+        if max(width, height) > max_side:
+            self.fail('too_big', max_side=max_side)
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Список первичных ключей, проверяемый одним запросом `id__in`.
+
+    В ошибке перечисляются все несуществующие ключи сразу.
+    Порядок и повторы входных данных сохраняются.
+    """
+    default_error_messages = {
+        'does_not_exist': 'Объекты не существуют: {pk_values}.',
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        child = self.child_relation
+        pk_field = child.get_queryset().model._meta.pk
+        pks = []
+        for value in data:
+            try:
+                if isinstance(value, bool):
+                    raise TypeError
+                pks.append(pk_field.to_python(value))
+            except (TypeError, ValueError, ValidationError):
+                child.fail('incorrect_type', data_type=type(value).__name__)
+        objects = child.get_queryset().in_bulk(pks)
+        missing = [pk for pk in dict.fromkeys(pks) if pk not in objects]
+        if missing:
+            self.fail(
+                'does_not_exist', pk_values=', '.join(map(str, missing))
+            )
+        return [objects[pk] for pk in pks]
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Первичный ключ, списки которого проверяются одним запросом."""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+
+def is_subscribed(user, subscriber):
+    if user.is_authenticated:
+        return Subscription.objects.filter(
+            user=user, subscriber=subscriber
+        ).exists()
+    return False
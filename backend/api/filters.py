@@ -1,12 +1,34 @@
 import django_filters
+from django import forms
+from django.db.models import Exists, OuterRef
 
-from recipe.models import Recipe, Favorite, Shopping
+from recipe import fulltext
+from recipe.models import Recipe, Favorite, Shopping, TagRecipe
+from .cache import get_tag_ids
+
+
+class SlugListField(forms.MultipleChoiceField):
+    """Список слагов без проверки по заранее собранным вариантам."""
+
+    def valid_value(self, value):
+        return True
+
+
+class SlugListFilter(django_filters.MultipleChoiceFilter):
+    """Фильтр по нескольким значениям `?name=a&name=b`."""
+    field_class = SlugListField
 
 
 class ModelFilter(django_filters.FilterSet):
-    """Фильтр модели `Recipe`."""
-    tags = django_filters.AllValuesMultipleFilter(
-        field_name='tags__slug',
+    """Фильтр модели `Recipe`.
+
+    Теги ищутся по кэшированному словарю `slug → id`, а рецепты
+    с тегами отбираются подзапросом `EXISTS`, поэтому соединение
+    не дает повторов и `DISTINCT` не нужен. `search` ищет
+    по полнотекстовому индексу и упорядочивает по релевантности.
+    """
+    tags = SlugListFilter(
+        method='filter_tags',
     )
     author = django_filters.NumberFilter(
         field_name='author__id',
@@ -19,6 +41,23 @@ class ModelFilter(django_filters.FilterSet):
         field_name='shoppings',
         method='filter_shoppings'
     )
+    search = django_filters.CharFilter(
+        method='filter_search',
+    )
+
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        tag_ids = get_tag_ids()
+        ids = [tag_ids[slug] for slug in value if slug in tag_ids]
+        if not ids:
+            return queryset.none()
+        return queryset.filter(Exists(TagRecipe.objects.filter(
+            recipe=OuterRef('pk'), tag_id__in=ids
+        )))
+
+    def filter_search(self, queryset, name, value):
+        return fulltext.search(queryset, value)
 
     def filter_favorites(self, queryset, name, value):
         user = self.request.user
@@ -38,4 +77,6 @@ class ModelFilter(django_filters.FilterSet):
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'author', 'tags', 'is_favorited', 'is_in_shopping_cart', 'search'
+        )
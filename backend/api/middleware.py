@@ -0,0 +1,373 @@
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from secrets import compare_digest
+
+from asgiref.sync import markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from foodgram_backend.backends.pool import get_pool_stats
+from .authentication import token_cache
+from .routers import REPLICA, SAFE_METHODS, current_request, pin_to_primary
+
+logger = logging.getLogger(__name__)
+performance_logger = logging.getLogger('api.performance')
+
+PLACEHOLDERS = re.compile(r'%s(?:, %s)+')
+
+query_observers = ContextVar('query_observers', default=())
+
+
+def dispatch_query(execute, sql, params, many, context):
+    """Обертка `execute_wrapper`, передающая запрос наблюдателям.
+
+    Наблюдатели хранятся в контекстной переменной, поэтому видят запросы
+    из любого потока, в котором выполняется обработка запроса: и при
+    WSGI, и в пуле потоков асинхронных представлений при ASGI.
+    """
+    for observer in query_observers.get():
+        execute = partial(observer, execute)
+    return execute(sql, params, many, context)
+
+
+@contextmanager
+def observe_queries(observer):
+    token = query_observers.set(query_observers.get() + (observer,))
+    try:
+        yield observer
+    finally:
+        query_observers.reset(token)
+
+
+class QueryBudgetExceeded(Exception):
+    """Представление выполнило больше запросов, чем заявлено."""
+
+
+class QueryCounter:
+    """Обертка `execute_wrapper`, считающая SQL-запросы."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class QueryTimer:
+    """Обертка `execute_wrapper`, замеряющая время и повторы SQL-запросов.
+
+    Одинаковый текст запроса с разными параметрами — признак N+1,
+    списки `IN (%s, %s, ...)` любой длины считаются одинаковыми.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[PLACEHOLDERS.sub('%s', sql)] += 1
+
+    @property
+    def duplicates(self):
+        return sum(
+            count - 1 for count in self.fingerprints.values() if count > 1
+        )
+
+    @property
+    def most_duplicated(self):
+        sql, count = self.fingerprints.most_common(1)[0]
+        return sql if count > 1 else None
+
+
+def get_view_action(request):
+    """Класс представления и действие, обработавшие запрос."""
+    match = request.resolver_match
+    if match is None:
+        return None, None
+    actions = getattr(match.func, 'actions', None) or {}
+    return (
+        getattr(match.func, 'cls', None),
+        actions.get(request.method.lower())
+    )
+
+
+def get_view_name(request):
+    """Имя вида `RecipeViewSet.list` для логов и метрик."""
+    view_class, action = get_view_action(request)
+    if view_class is not None:
+        return f'{view_class.__name__}.{action or request.method.lower()}'
+    match = request.resolver_match
+    return match.view_name if match else None
+
+
+def get_query_budget(request):
+    """Лимит запросов, заявленный представлением для текущего действия.
+
+    Представление объявляет атрибут `query_budget` — словарь
+    `{действие: число запросов}`.
+    """
+    view_class, action = get_view_action(request)
+    budget = getattr(view_class, 'query_budget', None)
+    if not budget or action is None:
+        return None, None
+    return f'{view_class.__name__}.{action}', budget.get(action)
+
+
+class ObservingMiddleware:
+    """Основа промежуточных слоев, работающих и при WSGI, и при ASGI.
+
+    `observe` — контекстный менеджер вокруг обработки запроса,
+    `finish` получает ответ и значение, выданное `observe`.
+    В асинхронной цепочке `__call__` возвращает корутину, чтобы Django
+    не переводил слой в общий синхронный поток.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with self.observe(request) as observer:
+            response = self.get_response(request)
+        return self.finish(request, response, observer)
+
+    async def __acall__(self, request):
+        with self.observe(request) as observer:
+            response = await self.get_response(request)
+        return self.finish(request, response, observer)
+
+    def observe(self, request):
+        raise NotImplementedError
+
+    def finish(self, request, response, observer):
+        raise NotImplementedError
+
+
+class QueryBudgetMiddleware(ObservingMiddleware):
+    """Контроль числа SQL-запросов на один запрос к API.
+
+    Включается настройкой `QUERY_BUDGET_ENABLED`. При превышении лимита
+    пишет предупреждение в лог, а при `QUERY_BUDGET_STRICT` выбрасывает
+    `QueryBudgetExceeded`, чтобы регрессия N+1 роняла тесты.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_BUDGET_ENABLED', False):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def observe(self, request):
+        return observe_queries(QueryCounter())
+
+    def finish(self, request, response, counter):
+        name, budget = get_query_budget(request)
+        if budget is not None and counter.count > budget:
+            message = (
+                f'{name}: {counter.count} SQL-запросов '
+                f'при лимите {budget}'
+            )
+            if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+class ReplicaRoutingMiddleware(ObservingMiddleware):
+    """Передача запроса `ReplicaRouter` и закрепление за основной базой.
+
+    После успешного изменяющего запроса чтение клиента на
+    `REPLICA_PIN_SECONDS` переводится на основную базу, чтобы он
+    видел свои изменения, пока реплика отстает.
+    Без базы `replica` в настройках слой отключается.
+    """
+
+    def __init__(self, get_response):
+        if REPLICA not in settings.DATABASES:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    @contextmanager
+    def observe(self, request):
+        token = current_request.set(request)
+        try:
+            yield
+        finally:
+            current_request.reset(token)
+
+    def finish(self, request, response, observer):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(request)
+        return response
+
+
+class PerformanceMiddleware(ObservingMiddleware):
+    """Замер времени обработки запроса, SQL и рендеринга.
+
+    Включается для всех запросов настройкой `PERF_TIMING_ENABLED`
+    или для отдельных запросов заголовком `X-Perf-Timing`
+    со значением `PERF_TIMING_TOKEN`. Результат отдается в заголовке
+    `Server-Timing` и пишется в лог `api.performance` одной строкой JSON.
+    Если ни одна настройка не задана, промежуточный слой отключается.
+    В запись лога добавляются счетчики кэша токенов и пулов
+    соединений с базой. Потоковые ответы логируются после отдачи
+    тела с отметкой `streamed`.
+    """
+    header = 'HTTP_X_PERF_TIMING'
+
+    def __init__(self, get_response):
+        self.enabled = getattr(settings, 'PERF_TIMING_ENABLED', False)
+        self.token = getattr(settings, 'PERF_TIMING_TOKEN', '')
+        if not self.enabled and not self.token:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def is_requested(self, request):
+        if self.enabled:
+            return True
+        value = request.META.get(self.header)
+        return value is not None and compare_digest(
+            value.encode(), self.token.encode()
+        )
+
+    @contextmanager
+    def observe(self, request):
+        if not self.is_requested(request):
+            yield None
+            return
+        request.render_duration = 0
+        request.timing_start = time.perf_counter()
+        with observe_queries(QueryTimer()) as timer:
+            yield timer
+
+    def finish(self, request, response, timer):
+        if timer is None:
+            return response
+        total = time.perf_counter() - request.timing_start
+        self.set_header(request, response, timer, total)
+        if response.streaming:
+            observe_stream = (
+                self.observe_async_stream
+                if getattr(response, 'is_async', False)
+                else self.observe_stream
+            )
+            response.streaming_content = observe_stream(
+                request, response, timer, response.streaming_content
+            )
+        else:
+            self.log(request, response, timer, total)
+        return response
+
+    def observe_stream(self, request, response, timer, content):
+        """Учет запросов, выполненных при отдаче потокового ответа.
+
+        Тело `StreamingHttpResponse` читается после выхода из слоя,
+        поэтому запись лога пишется, когда поток прочитан или закрыт.
+        Заголовок `Server-Timing` к этому времени уже отправлен
+        и содержит только обработку до начала потока.
+        """
+        content = iter(content)
+        try:
+            while True:
+                with observe_queries(timer):
+                    chunk = next(content, None)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            self.log(
+                request, response, timer,
+                time.perf_counter() - request.timing_start
+            )
+
+    async def observe_async_stream(self, request, response, timer, content):
+        """То же для асинхронного тела `AsyncStreamingHttpResponse`."""
+        try:
+            while True:
+                with observe_queries(timer):
+                    try:
+                        chunk = await content.__anext__()
+                    except StopAsyncIteration:
+                        return
+                yield chunk
+        finally:
+            self.log(
+                request, response, timer,
+                time.perf_counter() - request.timing_start
+            )
+
+    def process_template_response(self, request, response):
+        if not hasattr(request, 'render_duration'):
+            return response
+        render = response.render
+
+        def timed_render():
+            start = time.perf_counter()
+            try:
+                return render()
+            finally:
+                request.render_duration += time.perf_counter() - start
+
+        response.render = timed_render
+        return response
+
+    def get_timings(self, request, timer, total):
+        render = request.render_duration
+        return render, max(total - timer.duration - render, 0)
+
+    def set_header(self, request, response, timer, total):
+        render, app = self.get_timings(request, timer, total)
+        response['Server-Timing'] = ', '.join((
+            f'total;dur={total * 1000:.2f}',
+            f'db;dur={timer.duration * 1000:.2f};desc="{timer.count} '
+            f'queries, {timer.duplicates} duplicated"',
+            f'app;dur={app * 1000:.2f}',
+            f'render;dur={render * 1000:.2f}',
+        ))
+
+    def log(self, request, response, timer, total):
+        render, app = self.get_timings(request, timer, total)
+        record = {
+            'view': get_view_name(request),
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'db_ms': round(timer.duration * 1000, 2),
+            'app_ms': round(app * 1000, 2),
+            'render_ms': round(render * 1000, 2),
+            'queries': timer.count,
+            'duplicated_queries': timer.duplicates,
+        }
+        if response.streaming:
+            record['streamed'] = True
+        record['auth_cache'] = token_cache.snapshot()
+        pool_stats = get_pool_stats()
+        if pool_stats:
+            record['db_pool'] = pool_stats
+        if timer.duplicates:
+            record['most_duplicated_sql'] = timer.most_duplicated[:300]
+        performance_logger.log(
+            logging.WARNING if timer.duplicates else logging.INFO,
+            json.dumps(record, ensure_ascii=False)
+        )
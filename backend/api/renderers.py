@@ -0,0 +1,71 @@
+import csv
+import json
+
+from rest_framework import renderers
+
+
+class Echo:
+    """Буфер для `csv.writer`, возвращающий записанную строку."""
+    def write(self, value):
+        return value
+
+
+class ShoppingCartRenderer(renderers.BaseRenderer):
+    """Базовый рендерер списка покупок.
+
+    Метод `stream` построчно выдает файл по итератору словарей
+    с ключами `name`, `measurement_unit` и `amount`, поэтому
+    размер списка не влияет на потребление памяти.
+    Ответы с ошибками выводятся как JSON.
+    """
+    charset = 'utf-8'
+
+    def stream(self, ingredients):
+        raise NotImplementedError
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            return json.dumps(data, ensure_ascii=False).encode(self.charset)
+        return ''.join(self.stream(data)).encode(self.charset)
+
+
+class ShoppingCartTextRenderer(ShoppingCartRenderer):
+    """Список покупок в виде текстового файла."""
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, ingredients):
+        yield 'Список покупок:\n\n'
+        for ingredient in ingredients:
+            yield '{name} ({measurement_unit}) - {amount}\n'.format(
+                **ingredient
+            )
+
+
+class ShoppingCartCSVRenderer(ShoppingCartRenderer):
+    """Список покупок в формате CSV."""
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients):
+        writer = csv.writer(Echo())
+        yield writer.writerow(('name', 'measurement_unit', 'amount'))
+        for ingredient in ingredients:
+            yield writer.writerow((
+                ingredient['name'],
+                ingredient['measurement_unit'],
+                ingredient['amount'],
+            ))
+
+
+class ShoppingCartJSONRenderer(ShoppingCartRenderer):
+    """Список покупок в формате JSON."""
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, ingredients):
+        separator = '['
+        for ingredient in ingredients:
+            yield separator + json.dumps(ingredient, ensure_ascii=False)
+            separator = ','
+        yield ']' if separator == ',' else '[]'
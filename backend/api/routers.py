@@ -0,0 +1,79 @@
+import hashlib
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+REPLICA = 'replica'
+PIN_KEY = 'api:db-pin:{}'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PRIMARY_APPS = ('authtoken',)
+
+current_request = ContextVar('current_request', default=None)
+
+
+def get_pin_key(request):
+    """Ключ закрепления за основной базой по заголовку авторизации."""
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    return PIN_KEY.format(hashlib.md5(authorization.encode()).hexdigest())
+
+
+def pin_to_primary(request):
+    """Чтение клиента из основной базы в течение `REPLICA_PIN_SECONDS`."""
+    key = get_pin_key(request)
+    if key is not None:
+        cache.set(key, True, settings.REPLICA_PIN_SECONDS)
+
+
+def get_read_database(request):
+    """База для чтения в рамках запроса, `None` — основная.
+
+    Реплика используется для безопасных методов представлений
+    с атрибутом `use_replica`, если клиент недавно ничего не менял.
+    """
+    if request.method not in SAFE_METHODS:
+        return None
+    match = request.resolver_match
+    if match is None:
+        return None
+    database = getattr(request, '_read_database', False)
+    if database is False:
+        view_class = getattr(match.func, 'cls', None)
+        key = get_pin_key(request)
+        database = request._read_database = (
+            REPLICA
+            if getattr(view_class, 'use_replica', False)
+            and not (key and cache.get(key))
+            else None
+        )
+    return database
+
+
+def read_from_primary(request):
+    """Чтение из основной базы до конца запроса."""
+    request._read_database = None
+
+
+class ReplicaRouter:
+    """Чтение из реплики для запросов, разрешенных `get_read_database`.
+
+    Запрос передается через `current_request`, который выставляет
+    `ReplicaRoutingMiddleware`. Запись и токены авторизации всегда
+    идут в основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_APPS:
+            return 'default'
+        request = current_request.get()
+        if request is None:
+            return None
+        return get_read_database(request)
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
@@ -0,0 +1,398 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from recipe.models import Ingredient, IngredientRecipe
+from .cache import get_versions
+
+NGRAM_SIZE = 3
+JOURNAL_SEQ_KEY = 'api:recipe-ingredients:seq'
+JOURNAL_KEY = 'api:recipe-ingredients:{}'
+JOURNAL_TIMEOUT = 24 * 60 * 60
+
+
+def ngrams(value, size):
+    """Все подстроки `value` длины `size`."""
+    return {value[i:i + size] for i in range(len(value) - size + 1)}
+
+
+class IngredientIndex:
+    """Индекс ингредиентов в памяти процесса для автодополнения.
+
+    Префиксный поиск выполняется бинарным поиском по отсортированному
+    списку названий, поиск по подстроке — пересечением списков
+    n-грамм. Ответы хранятся уже сериализованными.
+    """
+
+    def __init__(self, ingredients):
+        entries = sorted(
+            (name.casefold(), id, name, measurement_unit)
+            for id, name, measurement_unit in ingredients
+        )
+        self.keys = [entry[0] for entry in entries]
+        self.items = [
+            {'id': id, 'name': name, 'measurement_unit': measurement_unit}
+            for _, id, name, measurement_unit in entries
+        ]
+        self.grams = {}
+        for position, key in enumerate(self.keys):
+            for size in range(1, NGRAM_SIZE + 1):
+                for gram in ngrams(key, size):
+                    self.grams.setdefault(gram, []).append(position)
+
+    @classmethod
+    def from_db(cls):
+        """Индекс по основной базе: реплика может отставать от версии."""
+        return cls(Ingredient.objects.using(DEFAULT_DB_ALIAS).values_list(
+            'id', 'name', 'measurement_unit'
+        ))
+
+    def prefix_positions(self, query):
+        start = bisect_left(self.keys, query)
+        end = start
+        while end < len(self.keys) and self.keys[end].startswith(query):
+            end += 1
+        return range(start, end)
+
+    def substring_positions(self, query):
+        if len(query) <= NGRAM_SIZE:
+            return self.grams.get(query, [])
+        postings = sorted(
+            (self.grams.get(gram, []) for gram in ngrams(query, NGRAM_SIZE)),
+            key=len
+        )
+        candidates = set(postings[0]).intersection(*postings[1:])
+        return [
+            position for position in sorted(candidates)
+            if query in self.keys[position]
+        ]
+
+    def search(self, query, limit=None):
+        """Ингредиенты, название которых содержит `query`.
+
+        Совпадения по началу названия идут раньше совпадений
+        по подстроке, внутри групп — по алфавиту.
+        """
+        query = query.casefold()
+        if not query:
+            return self.items[:limit]
+        prefix = self.prefix_positions(query)
+        result = [self.items[position] for position in prefix]
+        if limit is not None and len(result) >= limit:
+            return result[:limit]
+        for position in self.substring_positions(query):
+            if position not in prefix:
+                result.append(self.items[position])
+                if limit is not None and len(result) >= limit:
+                    break
+        return result
+
+
+_index = None
+_version = None
+_built_at = 0
+_lock = threading.Lock()
+
+
+def is_index_fresh(version, ttl):
+    return (
+        _index is not None and _version == version
+        and time.monotonic() - _built_at < ttl
+    )
+
+
+def get_ingredient_index():
+    """Индекс текущего процесса, при необходимости перестроенный.
+
+    Индекс перестраивается, когда версия ингредиентов в общем кэше
+    отличается от той, с которой он построен: версию повышают
+    изменения `Ingredient` и `load_ingredients` в любом процессе.
+    `INGREDIENT_INDEX_TTL` ограничивает возраст индекса на случай
+    потери версии.
+    """
+    global _index, _version, _built_at
+    ttl = settings.INGREDIENT_INDEX_TTL
+    version = get_versions(['ingredient'])[0]
+    if is_index_fresh(version, ttl):
+        return _index
+    with _lock:
+        if not is_index_fresh(version, ttl):
+            _index = IngredientIndex.from_db()
+            _version = version
+            _built_at = time.monotonic()
+        return _index
+
+
+def invalidate_ingredient_index(**kwargs):
+    global _index
+    _index = None
+
+
+def to_bitmap(ids):
+    """Битовая карта, в которой выставлены биты с номерами `ids`."""
+    if not ids:
+        return 0
+    bits = bytearray(max(ids) // 8 + 1)
+    for id in ids:
+        bits[id >> 3] |= 1 << (id & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def unset_bit(bitmaps, key, bit):
+    """Сброс бита в карте `bitmaps[key]`; пустая карта удаляется."""
+    bitmap = bitmaps.get(key, 0) & ~bit
+    if bitmap:
+        bitmaps[key] = bitmap
+    else:
+        bitmaps.pop(key, None)
+
+
+def popcount(bitmap):
+    return bin(bitmap).count('1')
+
+
+def iter_bits(bitmap):
+    """Номера выставленных битов по убыванию."""
+    digits = bin(bitmap)
+    top = len(digits) - 3
+    position = digits.find('1', 2)
+    while position != -1:
+        yield top - position + 2
+        position = digits.find('1', position + 1)
+
+
+class IngredientMatches:
+    """Ранжированные совпадения, нарезаемые постранично без сортировки.
+
+    Уровни — битовые карты рецептов с одинаковыми числами найденных
+    и всех ингредиентов, уже упорядоченные по покрытию. Элементы —
+    кортежи `(id рецепта, найдено, всего)`, внутри уровня — по
+    убыванию `id`.
+    """
+
+    def __init__(self, levels):
+        self.levels = levels
+        self.count = sum(count for *_, count in levels)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        start, stop, _ = index.indices(self.count)
+        size = stop - start
+        result = []
+        for matched, total, bitmap, count in self.levels:
+            if len(result) >= size:
+                break
+            if start >= count:
+                start -= count
+                continue
+            for recipe_id in islice(
+                iter_bits(bitmap), start, start + size - len(result)
+            ):
+                result.append((recipe_id, matched, total))
+            start = 0
+        return result
+
+
+class RecipeIngredientIndex:
+    """Инвертированный индекс `ингредиент → рецепты` в памяти процесса.
+
+    Рецепты каждого ингредиента хранятся битовой картой — целым
+    числом, в котором бит с номером `id` рецепта выставлен. Рядом
+    лежат карты рецептов по числу ингредиентов. Индекс не изменяется
+    на месте: `apply` возвращает новый, поэтому читающие потоки
+    работают с согласованной копией.
+    """
+
+    def __init__(self, recipes, postings, sizes, seq=None):
+        self.recipes = recipes
+        self.postings = postings
+        self.sizes = sizes
+        self.seq = seq
+
+    @classmethod
+    def build(cls, recipes, seq=None):
+        """Индекс по словарю `id рецепта → frozenset id ингредиентов`."""
+        postings = defaultdict(list)
+        sizes = defaultdict(list)
+        for recipe_id, ingredients in recipes.items():
+            sizes[len(ingredients)].append(recipe_id)
+            for ingredient_id in ingredients:
+                postings[ingredient_id].append(recipe_id)
+        return cls(
+            recipes,
+            {
+                ingredient_id: to_bitmap(ids)
+                for ingredient_id, ids in postings.items()
+            },
+            {size: to_bitmap(ids) for size, ids in sizes.items()},
+            seq,
+        )
+
+    @staticmethod
+    def load(recipe_ids=None):
+        """Словарь `id рецепта → frozenset id ингредиентов`.
+
+        Читается из основной базы: реплика может отставать от журнала
+        изменений. Рецепты из `recipe_ids` без ингредиентов попадают
+        в словарь с пустым множеством.
+        """
+        rows = IngredientRecipe.objects.using(DEFAULT_DB_ALIAS)
+        recipes = defaultdict(set)
+        if recipe_ids is not None:
+            rows = rows.filter(recipe_id__in=recipe_ids)
+            recipes.update((recipe_id, set()) for recipe_id in recipe_ids)
+        for recipe_id, ingredient_id in rows.values_list(
+            'recipe_id', 'ingredient_id'
+        ).order_by().iterator(chunk_size=10000):
+            recipes[recipe_id].add(ingredient_id)
+        return {
+            recipe_id: frozenset(ingredients)
+            for recipe_id, ingredients in recipes.items()
+        }
+
+    @classmethod
+    def from_db(cls, seq=None):
+        return cls.build(cls.load(), seq)
+
+    def apply(self, recipes, seq):
+        """Новый индекс с измененными составами рецептов `recipes`.
+
+        Пустое множество ингредиентов удаляет рецепт из индекса.
+        """
+        result = dict(self.recipes)
+        postings = dict(self.postings)
+        sizes = dict(self.sizes)
+        for recipe_id, ingredients in recipes.items():
+            old = result.pop(recipe_id, frozenset())
+            if ingredients:
+                result[recipe_id] = ingredients
+            bit = 1 << recipe_id
+            for ingredient_id in old - ingredients:
+                unset_bit(postings, ingredient_id, bit)
+            for ingredient_id in ingredients - old:
+                postings[ingredient_id] = postings.get(ingredient_id, 0) | bit
+            if len(old) != len(ingredients):
+                if old:
+                    unset_bit(sizes, len(old), bit)
+                if ingredients:
+                    sizes[len(ingredients)] = (
+                        sizes.get(len(ingredients), 0) | bit
+                    )
+        return type(self)(result, postings, sizes, seq)
+
+    def rank(self, ingredient_ids, max_missing=None):
+        """Рецепты, в которых есть хотя бы один из `ingredient_ids`.
+
+        Число найденных ингредиентов каждого рецепта считается
+        поразрядным сложением битовых карт: `slices[j]` — j-й двоичный
+        разряд счетчика для всех рецептов сразу. Рецепты упорядочены
+        по доле имеющихся ингредиентов, затем по их числу и по `id`;
+        `max_missing` ограничивает число недостающих.
+        """
+        ingredient_ids = set(ingredient_ids)
+        slices = []
+        for ingredient_id in ingredient_ids:
+            carry = self.postings.get(ingredient_id, 0)
+            for position, bits in enumerate(slices):
+                if not carry:
+                    break
+                slices[position], carry = bits ^ carry, bits & carry
+            if carry:
+                slices.append(carry)
+        found = 0
+        for bits in slices:
+            found |= bits
+        levels = []
+        for matched in range(1, len(ingredient_ids) + 1):
+            if matched >> len(slices):
+                break
+            exact = found
+            for position, bits in enumerate(slices):
+                exact &= bits if matched >> position & 1 else ~bits
+            if not exact:
+                continue
+            for total, recipes in self.sizes.items():
+                if total < matched or (
+                    max_missing is not None and total - matched > max_missing
+                ):
+                    continue
+                bitmap = exact & recipes
+                if bitmap:
+                    levels.append((matched, total, bitmap, popcount(bitmap)))
+        levels.sort(key=lambda level: (-level[0] / level[1], -level[0]))
+        return IngredientMatches(levels)
+
+
+_recipe_index = None
+_recipe_lock = threading.Lock()
+
+
+def get_journal_seq():
+    """Номер последней записи журнала изменений составов рецептов.
+
+    Начальный номер берется из времени, чтобы после вытеснения
+    счетчика из кэша процессы не приняли журнал за непрерывный.
+    """
+    seq = cache.get(JOURNAL_SEQ_KEY)
+    if seq is None:
+        cache.add(JOURNAL_SEQ_KEY, time.time_ns(), timeout=None)
+        seq = cache.get(JOURNAL_SEQ_KEY)
+    return seq
+
+
+def log_recipe_change(recipe_id):
+    """Запись в общий журнал, что состав рецепта изменился.
+
+    Вызывается после фиксации транзакции: процесс, дочитавший журнал
+    до этой записи, загрузит из базы уже новый состав. Журнал виден
+    другим воркерам только в общем кэше — при нескольких воркерах
+    это проверяет `check_cache_shared` при запуске.
+    """
+    get_journal_seq()
+    try:
+        seq = cache.incr(JOURNAL_SEQ_KEY)
+    except ValueError:
+        cache.set(JOURNAL_SEQ_KEY, time.time_ns(), timeout=None)
+        return
+    cache.set(JOURNAL_KEY.format(seq), recipe_id, JOURNAL_TIMEOUT)
+
+
+def get_recipe_ingredient_index():
+    """Индекс текущего процесса, догнанный по журналу изменений.
+
+    Изменившиеся рецепты перечитываются из базы и применяются
+    к индексу. Если записей больше `RECIPE_INDEX_MAX_REPLAY`
+    или часть из них вытеснена из кэша, индекс строится заново.
+    """
+    global _recipe_index
+    seq = get_journal_seq()
+    index = _recipe_index
+    if index is not None and index.seq == seq:
+        return index
+    with _recipe_lock:
+        index = _recipe_index
+        if index is not None and index.seq == seq:
+            return index
+        lag = seq - index.seq if index is not None else -1
+        entries = {}
+        if 0 < lag <= settings.RECIPE_INDEX_MAX_REPLAY:
+            entries = cache.get_many([
+                JOURNAL_KEY.format(number)
+                for number in range(index.seq + 1, seq + 1)
+            ])
+        if entries and len(entries) == lag:
+            index = index.apply(
+                RecipeIngredientIndex.load(set(entries.values())), seq
+            )
+        else:
+            index = RecipeIngredientIndex.from_db(seq)
+        _recipe_index = index
+        return index
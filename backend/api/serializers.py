@@ -2,8 +2,10 @@ from rest_framework import serializers
 from rest_framework.validators import UniqueValidator, UniqueTogetherValidator
 from django.contrib.auth import get_user_model
 from djoser.serializers import UserSerializer, UserCreateSerializer
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 
+from recipe import shopping_list
 from recipe.models import (
     Recipe,
     Ingredient,
@@ -12,13 +14,20 @@ from recipe.models import (
     TagRecipe,
     Subscription,
     Favorite,
-    Shopping
+    Shopping,
+)
+from .fields import (
+    Hex2NameColor,
+    Base64ImageField,
+    BulkPrimaryKeyRelatedField,
+    is_subscribed,
 )
-from .fields import Hex2NameColor, Base64ImageField, is_subscribed
 
 
 User = get_user_model()
 
+BULK_BATCH_SIZE = 1000
+
 
 class CustomUserCreateSerializer(UserCreateSerializer):
     """Сериализатор модели `User` для регистрации."""
@@ -65,6 +74,8 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'subscribed'):
+            return obj.subscribed
         return is_subscribed(self.context.get('request').user, obj)
 
 
@@ -155,6 +166,53 @@ class TagRecipeSerializer(serializers.ModelSerializer):
         )
 
 
+class RecipeListSerializer(serializers.ListSerializer):
+    """Создание нескольких рецептов в одной транзакции.
+
+    Рецепты сохраняются по одному, чтобы сработали загрузка картинок
+    и сигналы, а связи с ингредиентами и тегами всех рецептов
+    вставляются общими пакетами. Существование ингредиентов всего
+    списка проверяется одним запросом до проверки рецептов.
+    """
+
+    def to_internal_value(self, data):
+        ids = set()
+        if isinstance(data, list):
+            for item in data:
+                ingredients = isinstance(item, dict) and item.get(
+                    'ingredients'
+                )
+                for ingredient in ingredients or ():
+                    try:
+                        ids.add(int(ingredient['id']))
+                    except (KeyError, TypeError, ValueError):
+                        continue
+        self.child.known_ingredients = set(Ingredient.objects.filter(
+            id__in=ids
+        ).values_list('id', flat=True))
+        return super().to_internal_value(data)
+
+    @transaction.atomic
+    def create(self, validated_data):
+        recipes = []
+        ingredients = []
+        tags = []
+        for data in validated_data:
+            recipe_ingredients = data.pop('ingredients')
+            recipe_tags = data.pop('tags')
+            recipe = Recipe.objects.create(**data)
+            recipes.append(recipe)
+            ingredients += self.child.build_ingredients(
+                recipe_ingredients, recipe
+            )
+            tags += [TagRecipe(tag=tag, recipe=recipe) for tag in recipe_tags]
+        IngredientRecipe.objects.bulk_create(
+            ingredients, batch_size=BULK_BATCH_SIZE
+        )
+        TagRecipe.objects.bulk_create(tags, batch_size=BULK_BATCH_SIZE)
+        return recipes
+
+
 class RecipeWriteSerializer(serializers.ModelSerializer):
     """Сериализатор модели `Recipe` для создания рецепта."""
     image = Base64ImageField(required=True)
@@ -162,10 +220,14 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         many=True,
         required=True,
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
         many=True,
-        required=True
+        required=True,
+        error_messages={
+            'does_not_exist': 'Нельзя добавить несуществующие теги: '
+                              '{pk_values}',
+        }
     )
     cooking_time = serializers.IntegerField(min_value=1, required=True)
     author = CustomUserSerializer(
@@ -185,6 +247,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             'text',
             'cooking_time'
         )
+        list_serializer_class = RecipeListSerializer
 
     def validate_ingredients(self, value):
         if not value:
@@ -196,12 +259,23 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
                 f'''Нельзя дважды добавить ингредиент
                 {value}
                 ''')
-        for ingredient in ingredients:
-            if not Ingredient.objects.filter(id=ingredient).exists():
-                raise serializers.ValidationError(
-                    'Нельзя добавить несуществующий ингредиент')
+        missing = ingredients - self.get_existing_ingredients(ingredients)
+        if missing:
+            raise serializers.ValidationError(
+                'Нельзя добавить несуществующие ингредиенты: '
+                + ', '.join(map(str, sorted(missing)))
+            )
         return value
 
+    def get_existing_ingredients(self, ids):
+        """Ингредиенты из `ids`, которые есть в базе."""
+        known = getattr(self, 'known_ingredients', None)
+        if known is None:
+            return set(Ingredient.objects.filter(
+                id__in=ids
+            ).values_list('id', flat=True))
+        return ids & known
+
     def validate_tags(self, value):
         if not value:
             raise serializers.ValidationError(
@@ -210,24 +284,24 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         if len(value) != len(tags):
             raise serializers.ValidationError(
                 'Нельзя дважды добавить тег')
-        for tag in tags:
-            if not Tag.objects.filter(id=tag.id).exists():
-                raise serializers.ValidationError(
-                    'Нельзя добавить несуществующий тег')
         return value
 
-    def create_ingredients(self, received_ingredients, recipe):
-        ingredients = []
-        for ingredient in received_ingredients:
-            ingredients.append(
-                IngredientRecipe(
-                    ingredient_id=ingredient.pop('ingredient__id'),
-                    amount=ingredient.pop('amount'),
-                    recipe=recipe
-                )
+    def build_ingredients(self, received_ingredients, recipe):
+        return [
+            IngredientRecipe(
+                ingredient_id=ingredient['ingredient__id'],
+                amount=ingredient['amount'],
+                recipe=recipe
             )
-        IngredientRecipe.objects.bulk_create(ingredients)
+            for ingredient in received_ingredients
+        ]
+
+    def create_ingredients(self, received_ingredients, recipe):
+        IngredientRecipe.objects.bulk_create(
+            self.build_ingredients(received_ingredients, recipe)
+        )
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
@@ -238,14 +312,75 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         recipe.tags.set(tags)
         return recipe
 
+    def update_ingredients(self, received_ingredients, recipe):
+        """Изменение только отличающихся связей с ингредиентами.
+
+        Удаленные связи удаляются одним запросом, изменившиеся
+        количества сохраняются одним `bulk_update`, новые —
+        одним `bulk_create`. Разница переносится в списки покупок
+        пользователей, добавивших рецепт.
+        """
+        amounts = {
+            ingredient['ingredient__id']: ingredient['amount']
+            for ingredient in received_ingredients
+        }
+        stored = {
+            row.ingredient_id: row
+            for row in IngredientRecipe.objects.filter(recipe=recipe)
+        }
+        removed = [
+            row for ingredient_id, row in stored.items()
+            if ingredient_id not in amounts
+        ]
+        deltas = {row.ingredient_id: -row.amount for row in removed}
+        changed = []
+        for ingredient_id, row in stored.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and amount != row.amount:
+                deltas[ingredient_id] = amount - row.amount
+                row.amount = amount
+                changed.append(row)
+        added = [
+            IngredientRecipe(
+                ingredient_id=ingredient_id, amount=amount, recipe=recipe
+            )
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in stored
+        ]
+        deltas.update({row.ingredient_id: row.amount for row in added})
+        if removed:
+            IngredientRecipe.objects.filter(
+                id__in=[row.id for row in removed]
+            ).delete()
+        if changed:
+            IngredientRecipe.objects.bulk_update(changed, ['amount'])
+        if added:
+            IngredientRecipe.objects.bulk_create(added)
+        shopping_list.change_recipe(recipe.id, deltas)
+
+    def update_tags(self, received_tags, recipe):
+        """Изменение только отличающихся связей с тегами."""
+        tags = {tag.id for tag in received_tags}
+        stored = set(TagRecipe.objects.filter(
+            recipe=recipe
+        ).values_list('tag_id', flat=True))
+        if stored - tags:
+            TagRecipe.objects.filter(
+                recipe=recipe, tag_id__in=stored - tags
+            ).delete()
+        if tags - stored:
+            TagRecipe.objects.bulk_create([
+                TagRecipe(tag_id=tag_id, recipe=recipe)
+                for tag_id in tags - stored
+            ])
+
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients_data = validated_data.pop('ingredients')
         tags_data = validated_data.pop('tags')
         instance = super().update(instance, validated_data)
-        instance.ingredients.clear()
-        instance.tags.clear()
-        self.create_ingredients(ingredients_data, instance)
-        instance.tags.set(tags_data)
+        self.update_ingredients(ingredients_data, instance)
+        self.update_tags(tags_data, instance)
         return instance
 
     def to_representation(self, obj):
@@ -289,18 +424,42 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         )
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         if self.context.get('request').user.is_authenticated:
             user = self.context.get('request').user
             return Favorite.objects.filter(user=user, recipe=obj).exists()
         return False
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         if self.context.get('request').user.is_authenticated:
             user = self.context.get('request').user
             return Shopping.objects.filter(user=user, recipe=obj).exists()
         return False
 
 
+class RecipeMatchSerializer(RecipeReadSerializer):
+    """Рецепт с числом имеющихся и недостающих ингредиентов."""
+    matched_ingredients = serializers.IntegerField(read_only=True)
+    missing_ingredients = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeReadSerializer.Meta):
+        fields = RecipeReadSerializer.Meta.fields + (
+            'matched_ingredients',
+            'missing_ingredients',
+        )
+
+
+class RecipeTrendingSerializer(RecipeReadSerializer):
+    """Рецепт с числом добавлений за окно рейтинга."""
+    trending_score = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeReadSerializer.Meta):
+        fields = RecipeReadSerializer.Meta.fields + ('trending_score',)
+
+
 class FavoriteSerializer(serializers.ModelSerializer):
     """Сериализатор модели `Favorite`."""
     name = serializers.CharField(read_only=True, source='recipe.name')
@@ -382,10 +541,13 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         )
 
     def get_recipes(self, obj):
-        recipes = Recipe.objects.filter(
-            author=obj.subscriber
-        ).all().order_by('-id')
         limit = self.context.get('recipes_limit')
+        if hasattr(obj.subscriber, 'feed_recipes'):
+            recipes = obj.subscriber.feed_recipes
+        else:
+            recipes = Recipe.objects.filter(
+                author=obj.subscriber
+            ).all().order_by('-id')
         if limit:
             recipes = recipes[:int(limit)]
         return RecipeShortSerializer(
@@ -394,9 +556,11 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         ).data
 
     def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj.subscriber).count()
+        return obj.subscriber.recipes_count
 
     def get_is_subscribed(self, obj):
+        if obj.pk is not None:
+            return True
         return is_subscribed(obj.user, obj.subscriber)
 
     def create(self, validated_data):
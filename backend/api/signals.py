@@ -0,0 +1,132 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipe.models import (
+    Ingredient,
+    IngredientRecipe,
+    Recipe,
+    Tag,
+    TagRecipe,
+)
+from recipe.signals import ingredients_loaded
+from .authentication import token_cache
+from .cache import bump_version, object_entity
+from .middleware import dispatch_query
+from .search import invalidate_ingredient_index, log_recipe_change
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(ingredients_loaded)
+def ingredient_changed(sender, **kwargs):
+    invalidate_ingredient_index()
+    transaction.on_commit(partial(bump_version, 'ingredient'))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    transaction.on_commit(partial(bump_version, 'tag'))
+
+
+def bump_recipes(recipe_ids):
+    """Версия списков рецептов и версии ответов самих рецептов."""
+    bump_version('recipe')
+    for recipe_id in recipe_ids:
+        bump_version(object_entity('recipe', recipe_id))
+
+
+def recipes_changed(recipe_ids):
+    transaction.on_commit(partial(bump_recipes, list(recipe_ids)))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(post_delete, sender=IngredientRecipe)
+@receiver(post_save, sender=TagRecipe)
+@receiver(post_delete, sender=TagRecipe)
+def recipe_changed(sender, instance, **kwargs):
+    recipes_changed([instance.pk if sender is Recipe else instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_relations_changed(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    """Со стороны тега или ингредиента меняются рецепты из `pk_set`;
+    при очистке их список берется до удаления связей."""
+    if not reverse:
+        if action.startswith('post_'):
+            recipes_changed([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        recipes_changed(pk_set)
+    elif action == 'pre_clear':
+        field = next(
+            field.name for field in sender._meta.fields
+            if field.related_model is type(instance)
+        )
+        recipes_changed(sender.objects.filter(
+            **{field: instance}
+        ).values_list('recipe_id', flat=True))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(post_delete, sender=IngredientRecipe)
+def recipe_ingredients_changed(sender, instance, **kwargs):
+    """Состав рецепта меняется пакетными запросами без сигналов,
+    поэтому в журнал попадает и каждое сохранение самого рецепта."""
+    recipe_id = instance.pk if sender is Recipe else instance.recipe_id
+    transaction.on_commit(partial(log_recipe_change, recipe_id))
+
+
+def invalidate_tokens(user_id, *keys):
+    """Сброс записей кэша токенов сразу и после фиксации транзакции.
+
+    Повторный сброс убирает записи, которые параллельные запросы
+    успели закэшировать из еще не измененных строк.
+    """
+    token_cache.invalidate(user_id, *keys)
+    transaction.on_commit(partial(token_cache.invalidate, user_id, *keys))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_tokens(instance.user_id, instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def user_changed(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields == {'last_login'}:
+        return
+    invalidate_tokens(instance.pk, *token_cache.user_keys(instance.pk))
+
+
+@receiver(post_save, sender=get_user_model())
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    """Ответы о рецептах содержат данные автора."""
+    if created or update_fields == {'last_login'}:
+        return
+    recipe_ids = list(
+        Recipe.objects.filter(author=instance).values_list('id', flat=True)
+    )
+    if recipe_ids:
+        recipes_changed(recipe_ids)
+
+
+@receiver(connection_created)
+def install_query_observers(sender, connection, **kwargs):
+    """Подключение `dispatch_query` к каждому соединению с базой.
+
+    Обертка ставится первой: `execute_wrapper` снимает последнюю.
+    """
+    if dispatch_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, dispatch_query)
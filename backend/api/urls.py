@@ -11,6 +11,7 @@ from api.views import (
     FavoriteViewSet,
     SubscriptionViewSet,
     ShoppingViewSet,
+    StatsView,
 )
 
 router = routers.DefaultRouter()
@@ -37,6 +38,7 @@ router.register(
 urlpatterns = [
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
+    path('stats/', StatsView.as_view(), name='stats'),
 ]
 
 if settings.DEBUG:
@@ -1,20 +1,31 @@
-from django.http import HttpResponse
-from django.db.models import Sum
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.db.models import F, Q
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import (
     viewsets,
     mixins,
-    filters,
     status,
 )
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.pagination import (
+    CursorPagination,
+    PageNumberPagination,
+)
 from djoser.views import UserViewSet
 
+from foodgram_backend.backends.pool import get_pool_stats
+
 from recipe.models import (
     Recipe,
     Ingredient,
@@ -22,10 +33,15 @@ from recipe.models import (
     Subscription,
     Favorite,
     Shopping,
-    IngredientRecipe
+    ShoppingListItem,
+    SimilarRecipe,
 )
+from recipe.trending import WINDOWS as TRENDING_WINDOWS
 from .serializers import (
+    RecipeMatchSerializer,
     RecipeReadSerializer,
+    RecipeShortSerializer,
+    RecipeTrendingSerializer,
     RecipeWriteSerializer,
     TagSerializer,
     IngredientSerializer,
@@ -33,12 +49,48 @@ from .serializers import (
     SubscriptionSerializer,
     ShoppingSerializer,
 )
+from .cache import AnonymousCacheMixin, get_trending
+from .concurrency import (
+    AsyncActionsMixin,
+    AsyncStreamingHttpResponse,
+    iterate_in_pool,
+)
+from .conditional import recipe_condition, table_condition
 from .permissions import AuthorOrReadOnly
+from .renderers import (
+    ShoppingCartTextRenderer,
+    ShoppingCartCSVRenderer,
+    ShoppingCartJSONRenderer,
+)
+from .authentication import token_cache
 from .filters import ModelFilter
+from .search import get_ingredient_index, get_recipe_ingredient_index
 
 
 User = get_user_model()
 
+SHOPPING_CART_CHUNK_SIZE = 500
+
+
+def iterate_by_name(ingredients, size):
+    """Строки списка покупок пачками по `(name, measurement_unit)`."""
+    last = None
+    while True:
+        batch = ingredients
+        if last is not None:
+            batch = batch.filter(
+                Q(name__gt=last['name'])
+                | Q(
+                    name=last['name'],
+                    measurement_unit__gt=last['measurement_unit']
+                )
+            )
+        batch = list(batch[:size])
+        yield from batch
+        if len(batch) < size:
+            return
+        last = batch[-1]
+
 
 class CreateDestroyViewSet(mixins.CreateModelMixin, mixins.DestroyModelMixin,
                            viewsets.GenericViewSet):
@@ -56,11 +108,67 @@ class CreateDestroyViewSet(mixins.CreateModelMixin, mixins.DestroyModelMixin,
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class CustomPagination(PageNumberPagination):
+class KeysetPagination(CursorPagination):
+    """Постраничный вывод по курсору без `COUNT(*)` и `OFFSET`.
+
+    Курсор хранит `id` последней записи, следующая страница выбирается
+    условием по `id`. Порядок берется из `order_by` запроса, по умолчанию
+    `-id`. Общее число записей считается только с `?count=true`.
+    """
+    ordering = '-id'
     page_size_query_param = 'limit'
+    count_query_param = 'count'
+
+    def get_ordering(self, request, queryset, view):
+        return tuple(queryset.query.order_by) or (self.ordering,)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param) in (
+            '1', 'true'
+        ):
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['previous'] = self.get_previous_link()
+        response['results'] = data
+        return Response(response)
+
+
+class LimitPagination(PageNumberPagination):
+    """Нумерация страниц с размером страницы в `?limit=`."""
+    page_size_query_param = 'limit'
+
+
+class CustomPagination(LimitPagination):
+    """Постраничный вывод по номеру страницы или по курсору.
+
+    С параметром `?cursor=` (в том числе пустым) запрос обслуживает
+    `KeysetPagination`, без него — обычная нумерация страниц.
+    """
+    cursor_query_param = 'cursor'
+    keyset_class = KeysetPagination
 
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            self.display_page_controls = False
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
 
-class CustomUserViewSet(UserViewSet):
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class CustomUserViewSet(AsyncActionsMixin, UserViewSet):
     """Обработка запросов `users`.
 
     Запросы к `api/users/me` доступны
@@ -70,6 +178,11 @@ class CustomUserViewSet(UserViewSet):
     любому авторизованному пользователю.
     """
     pagination_class = CustomPagination
+    use_replica = True
+    async_actions = ('get_subscription',)
+    query_budget = {
+        'get_subscription': 4,
+    }
 
     def get_permissions(self):
         if self.action == "me":
@@ -86,47 +199,73 @@ class CustomUserViewSet(UserViewSet):
     )
     def get_subscription(self, request):
         limit = request.GET.get('recipes_limit', None)
-        user = self.request.user
-        subscriptions = Subscription.objects.filter(user=user)
+        if limit is not None and not limit.isdigit():
+            limit = None
+        subscriptions = Subscription.objects.filter(
+            user=request.user
+        ).for_read(limit and int(limit)).order_by('id')
+        context = {'recipes_limit': limit}
         page = self.paginate_queryset(subscriptions)
         if page is not None:
             serializer = SubscriptionSerializer(
                 page,
                 many=True,
-                context={
-                    'recipes_limit': limit
-                }
+                context=context
             )
             return self.get_paginated_response(serializer.data)
         serializer = SubscriptionSerializer(
-            Subscription.objects.filter(user=user),
+            subscriptions,
             many=True,
-            context={
-                'recipes_limit': limit
-            }
+            context=context
         )
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+@method_decorator(table_condition('tag'), name='list')
+@method_decorator(table_condition('tag'), name='retrieve')
+class TagViewSet(AsyncActionsMixin, AnonymousCacheMixin,
+                 viewsets.ReadOnlyModelViewSet):
     """Вывод тегов."""
+    use_replica = True
+    cache_entities = ('tag',)
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
-    """Вывод ингредиентов."""
+@method_decorator(table_condition('ingredient'), name='list')
+@method_decorator(table_condition('ingredient'), name='retrieve')
+class IngredientViewSet(AsyncActionsMixin, AnonymousCacheMixin,
+                        viewsets.ReadOnlyModelViewSet):
+    """Вывод ингредиентов.
+
+    Список и поиск `?name=` обслуживаются индексом в памяти:
+    сначала совпадения по началу названия, затем по подстроке.
+    Параметр `limit` ограничивает размер ответа.
+    """
+    use_replica = True
+    cache_entities = ('ingredient',)
+    cache_query_params = ('name', 'limit')
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = (DjangoFilterBackend, filters.SearchFilter)
     pagination_class = None
-    filterset_fields = ('name',)
-    search_fields = ('^name',)
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name', '')
+        limit = request.query_params.get('limit', '')
+        limit = int(limit) if limit.isdigit() else None
+        return Response(get_ingredient_index().search(name, limit))
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AsyncActionsMixin, AnonymousCacheMixin,
+                    viewsets.ModelViewSet):
     """Обработка запросов `recpes`."""
+    use_replica = True
+    cache_entities = ('recipe', 'tag', 'ingredient')
+    cache_object_entity = 'recipe'
+    cache_query_params = (
+        'page', 'limit', 'cursor', 'count', 'tags', 'author', 'search'
+    )
     queryset = Recipe.objects.select_related(
         'author'
     ).all()
@@ -135,6 +274,43 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filterset_class = ModelFilter
     pagination_class = CustomPagination
     ordering = ['-id']
+    async_actions = ('list', 'retrieve', 'download_shopping_cart')
+
+    query_budget = {
+        'list': 7,
+        'retrieve': 7,
+        'from_ingredients': 7,
+        'similar': 3,
+        'trending': 7,
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            return queryset.for_read(self.request.user)
+        return queryset
+
+    def get_ranked_recipes(self, rows, fields):
+        """Рецепты для вывода по строкам `(id, *значения)` в их порядке.
+
+        Значения записываются в атрибуты `fields`, рецепты, удаленные
+        после построения рейтинга, пропускаются.
+        """
+        recipes = Recipe.objects.filter(
+            id__in=[row[0] for row in rows]
+        ).for_read(self.request.user).in_bulk()
+        result = []
+        for recipe_id, *values in rows:
+            recipe = recipes.get(recipe_id)
+            if recipe is not None:
+                for field, value in zip(fields, values):
+                    setattr(recipe, field, value)
+                result.append(recipe)
+        return result
+
+    @method_decorator(recipe_condition)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
@@ -144,38 +320,221 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @action(
+        methods=['POST'],
+        detail=False,
+        url_name='bulk',
+        url_path='bulk',
+        permission_classes=[IsAuthenticated],
+    )
+    def bulk(self, request):
+        """Создание списка рецептов в одной транзакции.
+
+        Размер списка ограничен настройкой `RECIPE_BULK_MAX_SIZE`.
+        """
+        if not isinstance(request.data, list) or not request.data:
+            raise ValidationError('Ожидается непустой список рецептов')
+        if len(request.data) > settings.RECIPE_BULK_MAX_SIZE:
+            raise ValidationError(
+                'Слишком много рецептов в одном запросе, '
+                f'максимум {settings.RECIPE_BULK_MAX_SIZE}'
+            )
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        recipes = serializer.save(author=request.user)
+        queryset = Recipe.objects.filter(
+            id__in=[recipe.id for recipe in recipes]
+        ).for_read(request.user).order_by('id')
+        return Response(
+            RecipeReadSerializer(
+                queryset, many=True, context=self.get_serializer_context()
+            ).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(
+        methods=['GET'],
+        detail=False,
+        url_name='from_ingredients',
+        url_path='from_ingredients',
+        pagination_class=LimitPagination,
+    )
+    def from_ingredients(self, request):
+        """Рецепты из имеющихся ингредиентов `?ingredients=<id>`.
+
+        Выше рецепты с большей долей имеющихся ингредиентов, подбор
+        выполняется индексом в памяти. `?max_missing=` ограничивает
+        число недостающих ингредиентов.
+        """
+        ingredients = request.query_params.getlist('ingredients')
+        max_missing = request.query_params.get('max_missing', '')
+        if not ingredients or not all(map(str.isdigit, ingredients)):
+            raise ValidationError(
+                {'ingredients': 'Укажите id имеющихся ингредиентов'}
+            )
+        if len(ingredients) > settings.RECIPE_MATCH_MAX_INGREDIENTS:
+            raise ValidationError({
+                'ingredients': 'Слишком много ингредиентов, максимум '
+                               f'{settings.RECIPE_MATCH_MAX_INGREDIENTS}'
+            })
+        if max_missing and not max_missing.isdigit():
+            raise ValidationError(
+                {'max_missing': 'Ожидается неотрицательное целое число'}
+            )
+        matches = self.paginate_queryset(
+            get_recipe_ingredient_index().rank(
+                map(int, ingredients),
+                int(max_missing) if max_missing else None
+            )
+        )
+        recipes = self.get_ranked_recipes(
+            [
+                (recipe_id, matched, total - matched)
+                for recipe_id, matched, total in matches
+            ],
+            ('matched_ingredients', 'missing_ingredients')
+        )
+        return self.get_paginated_response(RecipeMatchSerializer(
+            recipes, many=True, context=self.get_serializer_context()
+        ).data)
+
+    @action(
+        methods=['GET'],
+        detail=False,
+        url_name='trending',
+        url_path='trending',
+    )
+    def trending(self, request):
+        """Популярные рецепты за окно `?window=24h|7d`.
+
+        Рейтинг заранее считает `rebuild_trending`, поэтому время ответа
+        не зависит от размера таблиц. `?limit=` ограничивает число
+        рецептов.
+        """
+        window = request.query_params.get('window', '24h')
+        limit = request.query_params.get('limit', '')
+        if window not in TRENDING_WINDOWS:
+            raise ValidationError({
+                'window': 'Допустимые значения: '
+                          + ', '.join(TRENDING_WINDOWS)
+            })
+        leaders = get_trending(window)
+        if limit.isdigit():
+            leaders = leaders[:int(limit)]
+        recipes = self.get_ranked_recipes(leaders, ('trending_score',))
+        return Response(RecipeTrendingSerializer(
+            recipes, many=True, context=self.get_serializer_context()
+        ).data)
+
+    @action(
+        methods=['GET'],
+        detail=True,
+        url_name='similar',
+        url_path='similar',
+    )
+    def similar(self, request, pk=None):
+        """Похожие рецепты, лучшие первыми.
+
+        Читаются из таблицы, которую заполняет `rebuild_similar_recipes`;
+        в запросе ничего не вычисляется.
+        """
+        recipe = self.get_object()
+        recipes = [
+            row.similar for row in SimilarRecipe.objects.filter(
+                recipe=recipe
+            ).select_related('similar').order_by('-score', 'similar_id')
+        ]
+        return Response(RecipeShortSerializer(
+            recipes, many=True, context=self.get_serializer_context()
+        ).data)
+
     @action(
         methods=['GET'],
         detail=False,
         url_name='download_shopping_cart',
         url_path='download_shopping_cart',
         permission_classes=[IsAuthenticated],
+        renderer_classes=[
+            ShoppingCartTextRenderer,
+            ShoppingCartCSVRenderer,
+            ShoppingCartJSONRenderer,
+        ],
     )
     def download_shopping_cart(self, request):
-        user = self.request.user
-        shopping = Shopping.objects.filter(user=user).values_list(
-            'recipe',
-            flat=True
-        )
-        lines = []
-        file_name = 'shopping_cart.txt'
-        lines.append('Список покупок:\n')
-        ingredients = IngredientRecipe.objects.filter(
-            recipe_id__in=shopping
-        ).values('ingredient').annotate(totals=Sum('amount'))
-        for ingredient in ingredients:
-            lines.append('{0} - {1}'.format(
-                Ingredient.objects.get(id=ingredient['ingredient']),
-                ingredient['totals']
+        """Выгрузка списка покупок.
+
+        Формат выбирается параметром `?format=txt|csv|json`,
+        по умолчанию — текстовый файл.
+        """
+        ingredients = ShoppingListItem.objects.filter(
+            user=request.user
+        ).values(
+            'amount',
+            name=F('ingredient__name'),
+            measurement_unit=F('ingredient__measurement_unit'),
+        ).order_by('name', 'measurement_unit')
+        is_async = isinstance(request._request, ASGIRequest)
+        if is_async:
+            # Тело асинхронного ответа читается пачками в разных потоках
+            # пула, поэтому строки выбираются по ключу без курсора.
+            ingredients = iterate_by_name(
+                ingredients, SHOPPING_CART_CHUNK_SIZE
             )
+        else:
+            ingredients = ingredients.iterator(
+                chunk_size=SHOPPING_CART_CHUNK_SIZE
             )
-        response_content = '\n'.join(lines)
-        response = HttpResponse(response_content, content_type="text")
-        response['Content-Disposition'] = 'attachment; filename={0}'.format(
-            file_name
+        rows = (
+            {
+                'name': ingredient['name'],
+                'measurement_unit': ingredient['measurement_unit'],
+                'amount': ingredient['amount'],
+            }
+            for ingredient in ingredients
+        )
+        renderer = request.accepted_renderer
+        content = renderer.stream(rows)
+        if is_async:
+            response_class = AsyncStreamingHttpResponse
+            content = iterate_in_pool(content, SHOPPING_CART_CHUNK_SIZE)
+        else:
+            response_class = StreamingHttpResponse
+        response = response_class(
+            content,
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename=shopping_cart.{renderer.format}'
         )
         return response
 
+    @action(
+        methods=['GET'],
+        detail=False,
+        url_name='shopping_list',
+        url_path='shopping_list',
+        permission_classes=[IsAuthenticated],
+    )
+    def shopping_list(self, request):
+        """Текущий список покупок с суммарными количествами."""
+        items = ShoppingListItem.objects.filter(
+            user=request.user
+        ).values(
+            'ingredient_id',
+            'amount',
+            name=F('ingredient__name'),
+            measurement_unit=F('ingredient__measurement_unit'),
+        ).order_by('name', 'measurement_unit')
+        return Response([
+            {
+                'id': item['ingredient_id'],
+                'name': item['name'],
+                'measurement_unit': item['measurement_unit'],
+                'amount': item['amount'],
+            }
+            for item in items
+        ])
+
 
 class FavoriteViewSet(CreateDestroyViewSet):
     """Обработка запросов `api/recipes/{id}/favorites`."""
@@ -216,3 +575,14 @@ class ShoppingViewSet(CreateDestroyViewSet):
     """Обработка запросов `api/recipes/{id}/shopping_cart`."""
     serializer_class = ShoppingSerializer
     queryset = Shopping.objects.select_related('user').all()
+
+
+class StatsView(APIView):
+    """Счетчики пула соединений и кэша токенов текущего воркера."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'db_pool': get_pool_stats(),
+            'auth_cache': token_cache.snapshot(),
+        })
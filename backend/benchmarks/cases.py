@@ -0,0 +1,347 @@
+import base64
+import io
+from urllib.parse import parse_qs, quote, urlparse
+
+from django.contrib.auth import get_user_model
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipe.models import Ingredient, Recipe, Subscription, Tag
+from .dataset import PASSWORD
+
+User = get_user_model()
+
+SKIPPED_ROUTES = {
+    'user-activation': 'отправка писем',
+    'user-resend-activation': 'отправка писем',
+    'user-reset-password': 'отправка писем',
+    'user-reset-password-confirm': 'требует токен из письма',
+    'user-reset-username': 'отправка писем',
+    'user-reset-username-confirm': 'требует токен из письма',
+    'user-set-username': 'меняет учетные данные',
+    'user-set-password': 'меняет учетные данные',
+    'stats': 'служебный маршрут администратора',
+}
+
+
+def png():
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), 'orange').save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+class Case:
+    """Замер одного запроса к API.
+
+    `path` и `data` форматируются значениями контекста. `prepare`
+    вызывается перед каждым замером и может вернуть другой клиент,
+    `undo` — после замера, чтобы вернуть данные в исходное состояние.
+    """
+
+    def __init__(self, name, route, path, method='get', anonymous=False,
+                 data=None, status=200, prepare=None, undo=None):
+        self.name = name
+        self.route = route
+        self.path = path
+        self.method = method
+        self.anonymous = anonymous
+        self.data = data
+        self.status = status
+        self.prepare = prepare
+        self.undo = undo
+
+    def url(self, context):
+        return self.path.format(**context)
+
+    def payload(self, context):
+        if callable(self.data):
+            return self.data(context)
+        return self.data
+
+
+def recipe_data(context):
+    return {
+        'ingredients': [
+            {'id': context['ingredient_id'], 'amount': 10},
+            {'id': context['other_ingredient_id'], 'amount': 20},
+        ],
+        'tags': [context['tag_id']],
+        'image': context['image'],
+        'name': 'Рецепт для замера',
+        'text': 'Описание',
+        'cooking_time': 15,
+    }
+
+
+def post(path):
+    def request(client, context, response=None):
+        client.post(path.format(**context))
+    return request
+
+
+def delete(path):
+    def request(client, context, response=None):
+        client.delete(path.format(**context))
+    return request
+
+
+def remember_id(path, key):
+    def request(client, context, response=None):
+        context[key] = client.post(path.format(**context)).json()['id']
+    return request
+
+
+def create_recipe(client, context, response=None):
+    context['new_recipe_id'] = client.post(
+        '/api/recipes/', recipe_data(context), format='json'
+    ).json()['id']
+
+
+def delete_created_recipe(client, context, response):
+    client.delete(f'/api/recipes/{response.json()["id"]}/')
+
+
+def delete_created_recipes(client, context, response):
+    for recipe in response.json():
+        client.delete(f'/api/recipes/{recipe["id"]}/')
+
+
+def login(client, context, response=None):
+    token = client.post('/api/auth/token/login/', {
+        'email': context['login_email'], 'password': PASSWORD,
+    }).json()['auth_token']
+    login_client = APIClient()
+    login_client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+    return login_client
+
+
+def logout(client, context, response):
+    login(client, context).post('/api/auth/token/logout/')
+
+
+FAVORITE = '/api/recipes/{recipe_id}/favorite/'
+SHOPPING = '/api/recipes/{recipe_id}/shopping_cart/'
+SUBSCRIBE = '/api/users/{author_id}/subscribe/'
+
+CASES = [
+    Case('api-root', 'api-root', '/api/', anonymous=True),
+    Case('tags-anon', 'tag-list', '/api/tags/', anonymous=True),
+    Case('tag-detail', 'tag-detail', '/api/tags/{tag_id}/'),
+    Case('ingredients-all', 'ingredient-list', '/api/ingredients/'),
+    Case(
+        'ingredients-search', 'ingredient-list',
+        '/api/ingredients/?name={ingredient_prefix}'
+    ),
+    Case(
+        'ingredient-detail', 'ingredient-detail',
+        '/api/ingredients/{ingredient_id}/'
+    ),
+    Case(
+        'recipes-anon', 'recipe-list', '/api/recipes/?page=2&limit=6',
+        anonymous=True
+    ),
+    Case('recipes-auth', 'recipe-list', '/api/recipes/?page=2&limit=6'),
+    Case('recipes-auth-100', 'recipe-list', '/api/recipes/?limit=100'),
+    Case(
+        'recipes-deep-page', 'recipe-list',
+        '/api/recipes/?page={deep_page}&limit=6'
+    ),
+    Case(
+        'recipes-deep-cursor', 'recipe-list',
+        '/api/recipes/?cursor={deep_cursor}&limit=6'
+    ),
+    Case(
+        'recipes-filtered', 'recipe-list',
+        '/api/recipes/?tags={tag_slug}&tags={other_tag_slug}'
+        '&is_favorited=1'
+    ),
+    Case(
+        'recipes-search', 'recipe-list',
+        '/api/recipes/?search={search_term}&limit=6'
+    ),
+    Case(
+        'recipes-from-ingredients', 'recipe-from_ingredients',
+        '/api/recipes/from_ingredients/?{pantry}&limit=6'
+    ),
+    Case(
+        'recipes-trending', 'recipe-trending',
+        '/api/recipes/trending/?window=7d&limit=10'
+    ),
+    Case(
+        'recipes-author', 'recipe-list', '/api/recipes/?author={author_id}'
+    ),
+    Case(
+        'recipe-anon', 'recipe-detail', '/api/recipes/{recipe_id}/',
+        anonymous=True
+    ),
+    Case('recipe-auth', 'recipe-detail', '/api/recipes/{recipe_id}/'),
+    Case(
+        'recipe-similar', 'recipe-similar',
+        '/api/recipes/{recipe_id}/similar/'
+    ),
+    Case(
+        'recipe-create', 'recipe-list', '/api/recipes/', method='post',
+        data=recipe_data, status=201, undo=delete_created_recipe
+    ),
+    Case(
+        'recipe-bulk-10', 'recipe-bulk', '/api/recipes/bulk/',
+        method='post', status=201, undo=delete_created_recipes,
+        data=lambda context: [recipe_data(context) for _ in range(10)]
+    ),
+    Case(
+        'recipe-update', 'recipe-detail', '/api/recipes/{own_recipe_id}/',
+        method='patch', data=recipe_data
+    ),
+    Case(
+        'recipe-delete', 'recipe-detail', '/api/recipes/{new_recipe_id}/',
+        method='delete', status=204, prepare=create_recipe
+    ),
+    Case(
+        'download-shopping-cart', 'recipe-download_shopping_cart',
+        '/api/recipes/download_shopping_cart/'
+    ),
+    Case(
+        'shopping-list', 'recipe-shopping_list', '/api/recipes/shopping_list/'
+    ),
+    Case(
+        'favorite-create', 'favorite-list', FAVORITE, method='post',
+        status=201, undo=delete(FAVORITE)
+    ),
+    Case(
+        'favorite-remove', 'favorite-list', FAVORITE, method='delete',
+        status=204, prepare=post(FAVORITE)
+    ),
+    Case(
+        'favorite-destroy', 'favorite-detail',
+        FAVORITE + '{favorite_id}/', method='delete', status=204,
+        prepare=remember_id(FAVORITE, 'favorite_id')
+    ),
+    Case(
+        'favorite-delete', 'favorite-delete', FAVORITE + '0/delete/',
+        method='delete', status=204, prepare=post(FAVORITE)
+    ),
+    Case(
+        'shopping-create', 'shopping-list', SHOPPING, method='post',
+        status=201, undo=delete(SHOPPING)
+    ),
+    Case(
+        'shopping-remove', 'shopping-list', SHOPPING, method='delete',
+        status=204, prepare=post(SHOPPING)
+    ),
+    Case(
+        'shopping-destroy', 'shopping-detail',
+        SHOPPING + '{shopping_id}/', method='delete', status=204,
+        prepare=remember_id(SHOPPING, 'shopping_id')
+    ),
+    Case(
+        'shopping-delete', 'shopping-delete', SHOPPING + '0/delete/',
+        method='delete', status=204, prepare=post(SHOPPING)
+    ),
+    Case(
+        'subscribe-create', 'subscribe-list', SUBSCRIBE, method='post',
+        status=201, undo=delete(SUBSCRIBE)
+    ),
+    Case(
+        'subscribe-remove', 'subscribe-list', SUBSCRIBE, method='delete',
+        status=204, prepare=post(SUBSCRIBE)
+    ),
+    Case(
+        'subscribe-destroy', 'subscribe-detail',
+        SUBSCRIBE + '{subscription_id}/', method='delete', status=204,
+        prepare=remember_id(SUBSCRIBE, 'subscription_id')
+    ),
+    Case(
+        'subscribe-delete', 'subscribe-delete', SUBSCRIBE + '0/delete/',
+        method='delete', status=204, prepare=post(SUBSCRIBE)
+    ),
+    Case('users', 'user-list', '/api/users/?limit=6'),
+    Case('user-detail', 'user-detail', '/api/users/{author_id}/'),
+    Case('users-me', 'user-me', '/api/users/me/'),
+    Case(
+        'subscriptions', 'user-subscriptions',
+        '/api/users/subscriptions/?recipes_limit=3'
+    ),
+    Case(
+        'subscriptions-100', 'user-subscriptions',
+        '/api/users/subscriptions/?limit=100&recipes_limit=3'
+    ),
+    Case(
+        'subscriptions-cursor', 'user-subscriptions',
+        '/api/users/subscriptions/?cursor=&limit=6&recipes_limit=3'
+    ),
+    Case(
+        'login', 'login', '/api/auth/token/login/', method='post',
+        anonymous=True, data=lambda context: {
+            'email': context['login_email'], 'password': PASSWORD,
+        },
+        undo=logout
+    ),
+    Case(
+        'logout', 'logout', '/api/auth/token/logout/', method='post',
+        status=204, prepare=login
+    ),
+]
+
+
+def build_context():
+    """Данные для подстановки в запросы и клиент бенчмарк-пользователя.
+
+    Рецепт и автор выбираются так, чтобы пользователь еще не добавил
+    рецепт в избранное и покупки и не был подписан на автора.
+    """
+    try:
+        user = User.objects.get(email='bench0@example.com')
+    except User.DoesNotExist:
+        return None, None
+    token, _ = Token.objects.get_or_create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    recipe = Recipe.objects.exclude(favorites__user=user).exclude(
+        shoppings__user=user
+    ).first()
+    author = User.objects.filter(
+        username__startswith='bench'
+    ).exclude(id=user.id).exclude(
+        id__in=Subscription.objects.filter(user=user).values('subscriber')
+    ).order_by('id').first()
+    tags = list(Tag.objects.order_by('id')[:2])
+    ingredients = list(Ingredient.objects.order_by('id')[:2])
+    context = {
+        'recipe_id': recipe.id,
+        'author_id': author.id,
+        'tag_id': tags[0].id,
+        'tag_slug': tags[0].slug,
+        'other_tag_slug': tags[-1].slug,
+        'ingredient_id': ingredients[0].id,
+        'other_ingredient_id': ingredients[-1].id,
+        'ingredient_prefix': quote(ingredients[0].name[:3]),
+        'search_term': quote(Recipe.objects.order_by('id').first().name),
+        'pantry': '&'.join(
+            f'ingredients={ingredient_id}' for ingredient_id in sorted(
+                set(recipe.ingredients.values_list('id', flat=True))
+                | {ingredient.id for ingredient in ingredients}
+            )
+        ),
+        'login_email': 'bench1@example.com',
+        'image': png(),
+    }
+    context['deep_page'], context['deep_cursor'] = deep_position(client)
+    context['own_recipe_id'] = client.post(
+        '/api/recipes/', recipe_data(context), format='json'
+    ).json()['id']
+    return client, context
+
+
+def deep_position(client, page_size=6):
+    """Номер и курсор последней полной страницы списка рецептов."""
+    deep_page = max(Recipe.objects.count() // page_size, 1)
+    next_link = client.get(
+        '/api/recipes/',
+        {'cursor': '', 'limit': (deep_page - 1) * page_size or page_size}
+    ).json()['next']
+    cursor = parse_qs(urlparse(next_link or '').query).get('cursor', [''])
+    return deep_page, quote(cursor[0])
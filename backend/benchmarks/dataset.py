@@ -0,0 +1,205 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+
+from recipe.models import (
+    Favorite,
+    Ingredient,
+    IngredientRecipe,
+    Recipe,
+    Shopping,
+    Subscription,
+    Tag,
+    TagRecipe,
+)
+
+User = get_user_model()
+
+PASSWORD = 'benchmark-password'
+BATCH_SIZE = 2000
+FOCUS_ROWS = 20
+HISTORY = timedelta(days=14)
+TAG_COLORS = (
+    '#E26C2D', '#49B64E', '#8775D2', '#F0C929', '#2D9CDB', '#EB5757',
+)
+
+
+def unique_pairs(rng, count, left, right, exclude_same=False):
+    """`count` случайных различных пар из `left` x `right`.
+
+    С `exclude_same` пары из одинаковых элементов не выбираются.
+    Если столько пар составить нельзя, выбрасывается `ValueError`.
+    При выборке больше половины возможных пар они перебираются
+    все, чтобы случайный подбор не затягивался на последних парах.
+    """
+    same = len(set(left) & set(right)) if exclude_same else 0
+    available = len(left) * len(right) - same
+    if count > available:
+        raise ValueError(
+            f'Нельзя выбрать {count} различных пар, возможно {available}.'
+        )
+    if count * 2 > available:
+        return sorted(rng.sample([
+            (first, second) for first in left for second in right
+            if not exclude_same or first != second
+        ], count))
+    pairs = set()
+    while len(pairs) < count:
+        pair = (rng.choice(left), rng.choice(right))
+        if exclude_same and pair[0] == pair[1]:
+            continue
+        pairs.add(pair)
+    return sorted(pairs)
+
+
+@transaction.atomic
+def generate(users=50, recipes=500, ingredients_per_recipe=8, tags=6,
+             favorites=2000, carts=500, subscriptions=500, seed=0,
+             ingredients_path=None, stdout=None):
+    """Заполнение базы синтетическими данными.
+
+    Ингредиенты загружаются из поставляемого `data/ingredients.csv`,
+    остальное генерируется пакетными вставками, после которых
+    пересчитываются счетчики, списки покупок, поисковый индекс,
+    похожие рецепты и рейтинги популярности. Избранное и покупки
+    разнесены по времени за последние две недели.
+    Первому пользователю (`bench0@example.com`), от имени которого идут
+    авторизованные замеры, дополнительно достаются избранное, покупки
+    и подписки.
+    """
+    rng = random.Random(seed)
+    args = [ingredients_path] if ingredients_path else []
+    call_command('load_ingredients', *args, stdout=stdout)
+    ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+
+    password = make_password(PASSWORD)
+    User.objects.bulk_create(
+        [
+            User(
+                username=f'bench{i}',
+                email=f'bench{i}@example.com',
+                first_name='Бенчмарк',
+                last_name=f'Пользователь {i}',
+                password=password,
+            )
+            for i in range(users)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    user_ids = list(User.objects.filter(
+        username__startswith='bench'
+    ).order_by('id').values_list('id', flat=True))
+
+    Tag.objects.bulk_create(
+        [
+            Tag(
+                name=f'Тег {i}',
+                color=TAG_COLORS[i % len(TAG_COLORS)],
+                slug=f'tag-{i}',
+            )
+            for i in range(tags)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    tag_ids = list(Tag.objects.values_list('id', flat=True))
+
+    first_id = Recipe.objects.order_by('-id').values_list(
+        'id', flat=True
+    ).first() or 0
+    Recipe.objects.bulk_create(
+        [
+            Recipe(
+                author_id=rng.choice(user_ids),
+                name=f'Рецепт {i}',
+                text='Описание рецепта. ' * rng.randint(5, 40),
+                cooking_time=rng.randint(5, 180),
+                image='recipes/images/benchmark.png',
+            )
+            for i in range(recipes)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    recipe_ids = list(Recipe.objects.filter(
+        id__gt=first_id
+    ).values_list('id', flat=True))
+
+    IngredientRecipe.objects.bulk_create(
+        [
+            IngredientRecipe(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=rng.randint(1, 500),
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in rng.sample(
+                ingredient_ids,
+                min(ingredients_per_recipe, len(ingredient_ids))
+            )
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    TagRecipe.objects.bulk_create(
+        [
+            TagRecipe(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in rng.sample(
+                tag_ids, rng.randint(1, min(3, len(tag_ids)))
+            )
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    bench_user = user_ids[0]
+    clock = random.Random(seed)
+    now = timezone.now()
+    for model, count in ((Favorite, favorites), (Shopping, carts)):
+        pairs = unique_pairs(rng, count, user_ids, recipe_ids)
+        pairs += unique_pairs(
+            rng, min(FOCUS_ROWS, len(recipe_ids)), [bench_user], recipe_ids
+        )
+        model.objects.bulk_create(
+            [
+                model(
+                    user_id=user_id,
+                    recipe_id=recipe_id,
+                    created_at=now - clock.random() * HISTORY,
+                )
+                for user_id, recipe_id in pairs
+            ],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+    pairs = unique_pairs(
+        rng, subscriptions, user_ids, user_ids, exclude_same=True
+    )
+    pairs += unique_pairs(
+        rng, min(FOCUS_ROWS, len(user_ids) - 1), [bench_user], user_ids[1:]
+    )
+    Subscription.objects.bulk_create(
+        [
+            Subscription(user_id=user_id, subscriber_id=subscriber_id)
+            for user_id, subscriber_id in pairs
+        ],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    call_command('rebuild_counters', stdout=stdout)
+    call_command('rebuild_shopping_lists', stdout=stdout)
+    call_command('rebuild_search_index', stdout=stdout)
+    call_command('rebuild_similar_recipes', '--full', stdout=stdout)
+    call_command('rebuild_trending', stdout=stdout)
+
+
+def describe():
+    """Число строк в таблицах, по которым сверяется базовая линия."""
+    return {
+        model._meta.model_name: model.objects.count()
+        for model in (
+            User, Ingredient, Tag, Recipe, IngredientRecipe, TagRecipe,
+            Favorite, Shopping, Subscription,
+        )
+    }
@@ -0,0 +1,89 @@
+import random
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, F, FloatField, Q
+from django.db.models.functions import Cast
+
+from recipe.models import Ingredient, Recipe
+from api.search import RecipeIngredientIndex
+from .bench_ingredient_search import measure
+
+
+def db_match(ingredient_ids, limit):
+    """Та же выдача через `GROUP BY`/`HAVING` по связям с ингредиентами."""
+    queryset = Recipe.objects.annotate(
+        matched=Count(
+            'ingredient_recipe',
+            filter=Q(ingredient_recipe__ingredient_id__in=ingredient_ids)
+        ),
+        total=Count('ingredient_recipe'),
+    ).filter(matched__gt=0).annotate(
+        coverage=Cast('matched', FloatField()) / F('total')
+    ).order_by('-coverage', '-matched', '-id')
+    return queryset.count(), list(
+        queryset.values_list('id', 'matched', 'total')[:limit]
+    )
+
+
+def index_match(index, ingredient_ids, limit):
+    matches = index.rank(ingredient_ids)
+    return len(matches), matches[0:limit]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение подбора рецептов по имеющимся ингредиентам '
+        'через битовый индекс и через БД.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=100)
+        parser.add_argument('--ingredients', type=int, default=10)
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        index = RecipeIngredientIndex.from_db()
+        build = (time.perf_counter() - start) * 1000
+        if not index.recipes:
+            raise CommandError('Нет рецептов с ингредиентами.')
+        rng = random.Random(options['seed'])
+        recipe_ids = list(index.recipes)
+        ingredient_ids = list(
+            Ingredient.objects.values_list('id', flat=True)
+        )
+        queries = []
+        for _ in range(options['queries']):
+            have = set(index.recipes[rng.choice(recipe_ids)])
+            while len(have) < options['ingredients']:
+                have.add(rng.choice(ingredient_ids))
+            queries.append(sorted(have))
+        limit = options['limit']
+        for query in queries[:10]:
+            if db_match(query, limit) != index_match(index, query, limit):
+                raise CommandError(f'Выдачи расходятся для {query}')
+
+        memory = sum(
+            sys.getsizeof(bitmap)
+            for bitmaps in (index.postings, index.sizes)
+            for bitmap in bitmaps.values()
+        )
+        self.stdout.write(
+            f'Рецептов: {len(index.recipes)}, запросов: {len(queries)}, '
+            f'ингредиентов в запросе: {options["ingredients"]}'
+        )
+        self.stdout.write(
+            f'Построение индекса: {build:.1f} мс, '
+            f'битовые карты: {memory / 2 ** 20:.1f} МБ'
+        )
+        for title, search in (
+            ('БД', lambda query: db_match(query, limit)),
+            ('Индекс', lambda query: index_match(index, query, limit)),
+        ):
+            mean, p95 = measure(search, queries)
+            self.stdout.write(
+                f'{title}: среднее {mean:.3f} мс, p95 {p95:.3f} мс'
+            )
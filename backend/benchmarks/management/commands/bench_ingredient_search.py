@@ -0,0 +1,62 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.models import Ingredient
+from api.search import IngredientIndex
+from api.serializers import IngredientSerializer
+
+
+def measure(search, queries):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return (
+        statistics.mean(timings),
+        timings[int(len(timings) * 0.95) - 1],
+    )
+
+
+class Command(BaseCommand):
+    help = 'Сравнение поиска ингредиентов через индекс и через БД.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        names = list(Ingredient.objects.values_list('name', flat=True))
+        if not names:
+            raise CommandError('Таблица ингредиентов пуста.')
+        rng = random.Random(options['seed'])
+        queries = []
+        for _ in range(options['queries']):
+            name = rng.choice(names)
+            queries.append(name[:rng.randint(1, min(4, len(name)))])
+
+        start = time.perf_counter()
+        index = IngredientIndex.from_db()
+        build = (time.perf_counter() - start) * 1000
+
+        def db_search(query):
+            return IngredientSerializer(
+                Ingredient.objects.filter(name__istartswith=query),
+                many=True
+            ).data
+
+        self.stdout.write(f'Ингредиентов: {len(names)}, '
+                          f'запросов: {len(queries)}')
+        self.stdout.write(f'Построение индекса: {build:.1f} мс')
+        for title, search in (
+            ('БД', db_search),
+            ('Индекс', index.search),
+        ):
+            mean, p95 = measure(search, queries)
+            self.stdout.write(
+                f'{title}: среднее {mean:.3f} мс, p95 {p95:.3f} мс'
+            )
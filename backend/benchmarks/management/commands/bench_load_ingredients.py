@@ -0,0 +1,54 @@
+import csv
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipe.models import Ingredient
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер load_ingredients на сгенерированном CSV: первая загрузка '
+        'и повторная, когда все строки уже есть. Изменения откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def load(self, path, batch_size):
+        start = time.perf_counter()
+        call_command(
+            'load_ingredients', str(path), batch_size=batch_size,
+            stdout=StringIO()
+        )
+        return time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'ingredients.csv'
+            with open(path, 'w', encoding='utf-8', newline='') as file:
+                writer = csv.writer(file)
+                for i in range(options['rows']):
+                    writer.writerow([f'ингредиент {i}', f'ед. {i % 20}'])
+            before = Ingredient.objects.count()
+            try:
+                with transaction.atomic():
+                    fresh = self.load(path, options['batch_size'])
+                    added = Ingredient.objects.count() - before
+                    repeat = self.load(path, options['batch_size'])
+                    raise Rollback
+            except Rollback:
+                pass
+        self.stdout.write(f'Строк: {options["rows"]}, добавлено: {added}')
+        self.stdout.write(f'Первая загрузка: {fresh:.2f} с')
+        self.stdout.write(f'Повторная загрузка: {repeat:.2f} с')
@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.dataset import describe, generate
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Заполнение пустой базы синтетическими данными для замеров.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--recipes', type=int, default=500)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--tags', type=int, default=6)
+        parser.add_argument('--favorites', type=int, default=2000)
+        parser.add_argument('--carts', type=int, default=500)
+        parser.add_argument('--subscriptions', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--ingredients', dest='ingredients_path', default=None,
+            help='Файл ингредиентов, по умолчанию data/ingredients.csv.'
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 2:
+            raise CommandError('Нужно хотя бы два пользователя.')
+        if User.objects.filter(username__startswith='bench').exists():
+            raise CommandError(
+                'В базе уже есть данные для замеров, '
+                'используйте пустую базу.'
+            )
+        try:
+            generate(
+                users=options['users'],
+                recipes=options['recipes'],
+                ingredients_per_recipe=options['ingredients_per_recipe'],
+                tags=options['tags'],
+                favorites=options['favorites'],
+                carts=options['carts'],
+                subscriptions=options['subscriptions'],
+                seed=options['seed'],
+                ingredients_path=options['ingredients_path'],
+                stdout=self.stdout,
+            )
+        except ValueError as error:
+            raise CommandError(str(error))
+        for table, count in describe().items():
+            self.stdout.write(f'{table}: {count}')
@@ -0,0 +1,223 @@
+import asyncio
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from recipe.models import Ingredient, Recipe
+
+User = get_user_model()
+
+MODES = ('wsgi', 'asgi')
+PATHS = (
+    ('recipes', '/api/recipes/?limit=6'),
+    ('recipe', '/api/recipes/{recipe_id}/'),
+    ('tags', '/api/tags/'),
+    ('ingredients', '/api/ingredients/?name={ingredient_prefix}'),
+    ('subscriptions', '/api/users/subscriptions/?limit=6&recipes_limit=3'),
+    ('shopping-cart', '/api/recipes/download_shopping_cart/'),
+)
+ROW = '{:<6} {:<14} {:>10} {:>10} {:>10}'
+HOST = 'localhost'
+
+
+def build_paths():
+    user = User.objects.filter(email='bench0@example.com').first()
+    recipe = Recipe.objects.order_by('id').first()
+    ingredient = Ingredient.objects.order_by('id').first()
+    if user is None or recipe is None or ingredient is None:
+        return None, None
+    token, _ = Token.objects.get_or_create(user=user)
+    context = {
+        'recipe_id': recipe.id,
+        'ingredient_prefix': quote(ingredient.name[:3]),
+    }
+    return f'Token {token.key}', [
+        (name, path.format(**context)) for name, path in PATHS
+    ]
+
+
+def wsgi_run(paths, authorization, total, concurrency):
+    """Запросы через `WSGIHandler` из `concurrency` потоков.
+
+    Так обслуживает запросы gunicorn с `--threads`.
+    """
+    handler = WSGIHandler()
+
+    def request(path):
+        path, _, query = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': HOST,
+            'SERVER_PORT': '80',
+            'HTTP_HOST': HOST,
+            'HTTP_AUTHORIZATION': authorization,
+            'wsgi.input': io.BytesIO(),
+            'wsgi.errors': sys.stderr,
+            'wsgi.url_scheme': 'http',
+        }
+        statuses = []
+        start = time.perf_counter()
+        response = handler(
+            environ, lambda status, headers: statuses.append(status)
+        )
+        b''.join(response)
+        response.close()
+        return int(statuses[0][:3]), time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        results = list(executor.map(request, paths * total))
+    return results, time.perf_counter() - start
+
+
+def asgi_run(paths, authorization, total, concurrency):
+    """Запросы через `ASGIHandler`, не больше `concurrency` одновременно.
+
+    Так обслуживает запросы uvicorn в одном цикле событий.
+    """
+    handler = ASGIHandler()
+
+    async def request(path, semaphore):
+        path, _, query = path.partition('?')
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'query_string': query.encode(),
+            'headers': [
+                (b'host', HOST.encode()),
+                (b'authorization', authorization.encode()),
+            ],
+            'server': (HOST, 80),
+            'client': ('127.0.0.1', 0),
+        }
+        statuses = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+
+        async with semaphore:
+            start = time.perf_counter()
+            await handler(scope, receive, send)
+            return statuses[0], time.perf_counter() - start
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+        start = time.perf_counter()
+        results = await asyncio.gather(*(
+            request(path, semaphore) for path in paths * total
+        ))
+        return results, time.perf_counter() - start
+
+    return asyncio.run(run())
+
+
+RUNNERS = {'wsgi': wsgi_run, 'asgi': asgi_run}
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест горячих маршрутов чтения при WSGI и ASGI: '
+        'пропускная способность и задержки при параллельных запросах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode', choices=MODES + ('both',), default='both',
+            help='Режим сервера, both — оба в отдельных процессах.'
+        )
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['mode'] == 'both':
+            results = {
+                mode: self.run_process(mode, options) for mode in MODES
+            }
+        else:
+            results = {options['mode']: self.run_mode(options)}
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+            return
+        self.stdout.write(
+            f'Параллельных запросов: {options["concurrency"]}, '
+            f'потоков ORM при ASGI: {settings.ASGI_THREAD_POOL_SIZE}'
+        )
+        self.stdout.write(ROW.format(
+            'режим', 'маршрут', 'запр/с', 'медиана', 'p95'
+        ))
+        for mode, rows in results.items():
+            for name, row in rows.items():
+                self.stdout.write(ROW.format(
+                    mode, name, row['rps'], row['median_ms'], row['p95_ms']
+                ))
+
+    def run_process(self, mode, options):
+        """Замер в отдельном процессе: режим задается при импорте URL."""
+        env = dict(os.environ, ASYNC_VIEWS=str(mode == 'asgi').lower())
+        process = subprocess.run(
+            [
+                sys.executable, sys.argv[0], 'load_test', '--json',
+                '--mode', mode,
+                '--requests', str(options['requests']),
+                '--concurrency', str(options['concurrency']),
+            ],
+            env=env, capture_output=True, text=True,
+        )
+        if process.returncode:
+            raise CommandError(process.stderr)
+        return json.loads(process.stdout)[mode]
+
+    def run_mode(self, options):
+        if (options['mode'] == 'asgi') != settings.ASYNC_VIEWS:
+            raise CommandError(
+                'Режим не совпадает с настройкой ASYNC_VIEWS.'
+            )
+        authorization, paths = build_paths()
+        if paths is None:
+            raise CommandError(
+                'Нет данных для замеров, выполните generate_dataset.'
+            )
+        run = RUNNERS[options['mode']]
+        rows = {}
+        for name, path in paths:
+            cache.clear()
+            run([path], authorization, 1, 1)
+            results, elapsed = run(
+                [path], authorization,
+                options['requests'], options['concurrency']
+            )
+            statuses = {status for status, _ in results}
+            if statuses != {200}:
+                raise CommandError(f'{name}: ответы {sorted(statuses)}')
+            timings = sorted(duration * 1000 for _, duration in results)
+            rows[name] = {
+                'rps': round(len(results) / elapsed, 1),
+                'median_ms': round(statistics.median(timings), 2),
+                'p95_ms': round(timings[int(len(timings) * 0.95) - 1], 2),
+            }
+        return rows
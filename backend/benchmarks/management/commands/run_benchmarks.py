@@ -0,0 +1,174 @@
+import json
+import statistics
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from rest_framework.test import APIClient
+
+from api import urls
+from api.middleware import QueryCounter
+from benchmarks.cases import CASES, SKIPPED_ROUTES, build_context
+from benchmarks.dataset import describe
+
+BASELINE_PATH = Path(__file__).resolve().parents[2] / 'baseline.json'
+ROW = '{:<24} {:>10} {:>10} {:>6}'
+
+
+def route_names(patterns):
+    for pattern in patterns:
+        if hasattr(pattern, 'url_patterns'):
+            yield from route_names(pattern.url_patterns)
+        elif pattern.name:
+            yield pattern.name
+
+
+def run_case(case, client, context, repeat):
+    """Медиана и p95 времени ответа в мс и число SQL-запросов."""
+    timings = []
+    queries = 0
+    for _ in range(repeat + 1):
+        request_client = APIClient() if case.anonymous else client
+        if case.prepare:
+            request_client = case.prepare(
+                request_client, context
+            ) or request_client
+        cache.clear()
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            start = time.perf_counter()
+            response = getattr(request_client, case.method)(
+                case.url(context), case.payload(context), format='json'
+            )
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code != case.status:
+            raise CommandError(
+                f'{case.name}: ответ {response.status_code}, '
+                f'ожидался {case.status}'
+            )
+        if case.undo:
+            case.undo(client, context, response)
+        if timings or repeat == 0:
+            queries = max(queries, counter.count)
+        timings.append(elapsed)
+    timings = sorted(timings[1:]) or timings
+    return {
+        'median_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(timings[max(0, int(len(timings) * 0.95) - 1)], 2),
+        'queries': queries,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер времени ответа и числа SQL-запросов для маршрутов API '
+        'и сравнение с базовой линией.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument(
+            '--baseline', default=str(BASELINE_PATH),
+            help='Файл базовой линии.'
+        )
+        parser.add_argument(
+            '--update-baseline', action='store_true',
+            help='Записать результаты как новую базовую линию.'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=1.0,
+            help='Допустимый относительный рост медианы времени.'
+        )
+        parser.add_argument(
+            '--min-delta', type=float, default=5.0,
+            help='Рост медианы в мс, который не считается регрессией.'
+        )
+        parser.add_argument(
+            '--case', action='append', dest='cases',
+            help='Запустить только указанные замеры.'
+        )
+
+    def handle(self, *args, **options):
+        uncovered = (
+            set(route_names(urls.urlpatterns))
+            - {case.route for case in CASES}
+            - set(SKIPPED_ROUTES)
+        )
+        if uncovered:
+            raise CommandError(
+                'Маршруты без замеров: ' + ', '.join(sorted(uncovered))
+            )
+        client, context = build_context()
+        if client is None:
+            raise CommandError(
+                'Нет данных для замеров, выполните generate_dataset.'
+            )
+        cases = [
+            case for case in CASES
+            if not options['cases'] or case.name in options['cases']
+        ]
+        results = {}
+        self.stdout.write(ROW.format('замер', 'медиана', 'p95', 'SQL'))
+        try:
+            for case in cases:
+                results[case.name] = run_case(
+                    case, client, context, options['repeat']
+                )
+                self.stdout.write(ROW.format(
+                    case.name, *results[case.name].values()
+                ))
+        finally:
+            client.delete(f'/api/recipes/{context["own_recipe_id"]}/')
+
+        baseline_path = Path(options['baseline'])
+        if options['update_baseline']:
+            baseline_path.write_text(json.dumps(
+                {'dataset': describe(), 'cases': results},
+                ensure_ascii=False, indent=2, sort_keys=True
+            ) + '\n')
+            self.stdout.write(self.style.SUCCESS(
+                f'Базовая линия записана в {baseline_path}'
+            ))
+            return
+        if not baseline_path.exists():
+            self.stdout.write(self.style.WARNING('Базовой линии нет.'))
+            return
+        self.compare(json.loads(baseline_path.read_text()), results, options)
+
+    def compare(self, baseline, results, options):
+        if baseline.get('dataset') != describe():
+            self.stdout.write(self.style.WARNING(
+                'Объем данных отличается от базовой линии, '
+                'сравнение времени может быть неточным.'
+            ))
+        regressions = []
+        for name, result in results.items():
+            expected = baseline['cases'].get(name)
+            if expected is None:
+                continue
+            if result['queries'] > expected['queries']:
+                regressions.append(
+                    f'{name}: {result["queries"]} SQL-запросов '
+                    f'вместо {expected["queries"]}'
+                )
+            limit = max(
+                expected['median_ms'] * (1 + options['tolerance']),
+                expected['median_ms'] + options['min_delta'],
+            )
+            if result['median_ms'] > limit:
+                regressions.append(
+                    f'{name}: медиана {result["median_ms"]} мс '
+                    f'вместо {expected["median_ms"]} мс'
+                )
+        if regressions:
+            raise CommandError(
+                'Регрессии производительности:\n' + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
@@ -0,0 +1,46 @@
+"""Настройки для замеров производительности.
+
+По умолчанию используется отдельная база SQLite, с `BENCHMARK_DB=postgres`
+— PostgreSQL из переменных `POSTGRES_*` основного проекта. Пул соединений
+настраивается теми же переменными `DB_POOL_*`, что и в основном проекте.
+`BENCHMARK_REPLICA_PATH` подключает вторую базу SQLite как реплику.
+"""
+import os
+import tempfile
+
+from foodgram_backend.settings import *  # noqa: F401,F403
+from foodgram_backend.settings import (
+    BASE_DIR,
+    DB_POOL,
+    DB_POOL_ENABLED,
+    INSTALLED_APPS,
+)
+
+INSTALLED_APPS = INSTALLED_APPS + ['benchmarks']
+
+SECRET_KEY = os.getenv('SECRET_KEY', 'benchmark')
+
+DEBUG = False
+
+ALLOWED_HOSTS = ['testserver', 'localhost']
+
+if os.getenv('BENCHMARK_DB', 'sqlite') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'foodgram_backend.backends.sqlite3',
+            'NAME': os.getenv(
+                'BENCHMARK_SQLITE_PATH',
+                os.path.join(BASE_DIR, 'benchmark.sqlite3')
+            ),
+            'POOL': DB_POOL if DB_POOL_ENABLED else None,
+        }
+    }
+    if os.getenv('BENCHMARK_REPLICA_PATH'):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'NAME': os.getenv('BENCHMARK_REPLICA_PATH'),
+        }
+
+MEDIA_ROOT = os.path.join(tempfile.gettempdir(), 'foodgram_benchmark_media')
+
+QUERY_BUDGET_ENABLED = False
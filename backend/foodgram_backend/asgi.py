@@ -1,7 +1,12 @@
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+
+from api.concurrency import StreamingASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+os.environ.setdefault('ASYNC_VIEWS', 'true')
+
+django.setup(set_prefix=False)
 
-application = get_asgi_application()
+application = StreamingASGIHandler()
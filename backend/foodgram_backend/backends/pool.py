@@ -0,0 +1,200 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter, deque
+
+logger = logging.getLogger(__name__)
+
+STATS = ('hits', 'misses', 'waits', 'timeouts', 'discarded')
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    """Свободное соединение не появилось за отведенное время."""
+
+
+class ConnectionPool:
+    """Пул соединений DB-API, общий для потоков процесса.
+
+    `connect` открывает новое соединение, `check` проверяет выданное
+    из пула и должен выбросить исключение, если оно неработоспособно.
+    Соединения старше `max_lifetime` секунд закрываются при возврате
+    и выдаче. Если все `max_size` соединений заняты, `acquire` ждет
+    не дольше `timeout` секунд и выбрасывает `PoolTimeout`.
+    """
+
+    def __init__(self, connect, check=None, min_size=0, max_size=10,
+                 max_lifetime=1800, timeout=10):
+        self.connect = connect
+        self.check = check
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.condition = threading.Condition()
+        self.idle = deque()
+        self.created = {}
+        self.pending = 0
+        self.stats = Counter(dict.fromkeys(STATS, 0))
+        self.filled = False
+        self.inherited = []
+
+    @property
+    def size(self):
+        return len(self.created) + self.pending
+
+    def reset_after_fork(self):
+        """Сброс пула в дочернем процессе.
+
+        Сокеты унаследованных соединений общие с родителем, поэтому
+        они не закрываются, а только перестают выдаваться.
+        """
+        self.condition = threading.Condition()
+        self.inherited.extend(self.idle)
+        self.idle.clear()
+        self.created.clear()
+        self.pending = 0
+        self.stats = Counter(dict.fromkeys(STATS, 0))
+        self.filled = False
+
+    def expired(self, connection):
+        return (
+            time.monotonic() - self.created[id(connection)]
+            > self.max_lifetime
+        )
+
+    def open(self):
+        """Новое соединение; место под него уже учтено в `pending`."""
+        try:
+            connection = self.connect()
+        except Exception:
+            with self.condition:
+                self.pending -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.pending -= 1
+            self.created[id(connection)] = time.monotonic()
+        return connection
+
+    def fill(self):
+        """Открытие `min_size` соединений при первом обращении."""
+        self.filled = True
+        connections = []
+        while True:
+            with self.condition:
+                if self.size >= self.min_size:
+                    break
+                self.pending += 1
+            connections.append(self.open())
+        with self.condition:
+            self.idle.extend(connections)
+
+    def acquire(self):
+        if not self.filled:
+            self.fill()
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self.condition:
+                connection = self.take(deadline)
+            if connection is None:
+                return self.open()
+            try:
+                if self.check is not None:
+                    self.check(connection)
+            except Exception:
+                logger.info('Соединение из пула не прошло проверку')
+                self.discard(connection)
+                continue
+            return connection
+
+    def take(self, deadline):
+        """Свободное соединение или `None`, если можно открыть новое."""
+        waited = False
+        while True:
+            while self.idle:
+                connection = self.idle.pop()
+                if not self.expired(connection):
+                    self.stats['hits'] += 1
+                    return connection
+                self.close(connection)
+            if self.size < self.max_size:
+                self.stats['misses'] += 1
+                self.pending += 1
+                return None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.stats['timeouts'] += 1
+                raise PoolTimeout(
+                    f'Нет свободных соединений за {self.timeout} с, '
+                    f'занято {self.size}'
+                )
+            if not waited:
+                self.stats['waits'] += 1
+                waited = True
+            self.condition.wait(remaining)
+
+    def release(self, connection):
+        with self.condition:
+            if id(connection) not in self.created:
+                self.inherited.append(connection)
+                return
+            if self.expired(connection):
+                self.close(connection)
+            else:
+                self.idle.append(connection)
+            self.condition.notify()
+
+    def discard(self, connection):
+        with self.condition:
+            if id(connection) in self.created:
+                self.close(connection)
+                self.condition.notify()
+
+    def close(self, connection):
+        """Закрытие соединения; вызывается под `condition`."""
+        del self.created[id(connection)]
+        self.stats['discarded'] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def snapshot(self):
+        with self.condition:
+            return {
+                **self.stats,
+                'size': self.size,
+                'idle': len(self.idle),
+            }
+
+
+def get_pool(alias, connect, check, options):
+    """Пул соединения `alias`, создается при первом обращении."""
+    pool = pools.get(alias)
+    if pool is None:
+        with pools_lock:
+            pool = pools.get(alias)
+            if pool is None:
+                pool = pools[alias] = ConnectionPool(
+                    connect, check, **options
+                )
+    return pool
+
+
+def get_pool_stats():
+    """Счетчики всех пулов процесса: `{alias: {...}}`."""
+    return {alias: pool.snapshot() for alias, pool in pools.items()}
+
+
+def reset_pools_after_fork():
+    global pools_lock
+    pools_lock = threading.Lock()
+    for pool in pools.values():
+        pool.reset_after_fork()
+
+
+os.register_at_fork(after_in_child=reset_pools_after_fork)
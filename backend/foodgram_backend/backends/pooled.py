@@ -0,0 +1,57 @@
+from functools import partial
+
+from .pool import get_pool, pools
+
+POOL_OPTIONS = ('MIN_SIZE', 'MAX_SIZE', 'MAX_LIFETIME', 'TIMEOUT')
+
+
+def health_check(connection):
+    cursor = connection.cursor()
+    try:
+        cursor.execute('SELECT 1')
+    finally:
+        cursor.close()
+
+
+class PooledDatabaseMixin:
+    """Выдача соединений `DatabaseWrapper` из пула процесса.
+
+    Параметры пула задаются ключом `POOL` настроек базы: `MIN_SIZE`,
+    `MAX_SIZE`, `MAX_LIFETIME`, `TIMEOUT` и `HEALTH_CHECK` (проверка
+    `SELECT 1` при выдаче). Без `POOL` бэкенд работает как обычный.
+    `close()` возвращает соединение в пул, а не закрывает его;
+    соединение, закрытое внутри транзакции, из пула удаляется.
+    """
+
+    def pool_enabled(self):
+        return bool(self.settings_dict.get('POOL'))
+
+    def get_new_connection(self, conn_params):
+        if not self.pool_enabled():
+            return super().get_new_connection(conn_params)
+        options = self.settings_dict['POOL']
+        pool = get_pool(
+            self.alias,
+            partial(super().get_new_connection, conn_params),
+            health_check if options.get('HEALTH_CHECK', True) else None,
+            {
+                name.lower(): value
+                for name, value in options.items()
+                if name in POOL_OPTIONS
+            },
+        )
+        return pool.acquire()
+
+    def _close(self):
+        pool = pools.get(self.alias)
+        if pool is None or not self.pool_enabled():
+            return super()._close()
+        if self.in_atomic_block:
+            pool.discard(self.connection)
+            return
+        try:
+            self.connection.rollback()
+        except Exception:
+            pool.discard(self.connection)
+        else:
+            pool.release(self.connection)
@@ -0,0 +1,13 @@
+from django.db.backends.sqlite3 import base
+
+from ..pooled import PooledDatabaseMixin
+
+
+class DatabaseWrapper(PooledDatabaseMixin, base.DatabaseWrapper):
+    """SQLite с пулом соединений, для замеров и локальной проверки.
+
+    База в памяти пулом не обслуживается: у каждого соединения она своя.
+    """
+
+    def pool_enabled(self):
+        return super().pool_enabled() and not self.is_in_memory_db()
@@ -33,7 +33,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6,
@@ -56,14 +56,59 @@ DJOSER = {
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.PerformanceMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.QueryBudgetMiddleware',
 ]
 
+QUERY_BUDGET_ENABLED = (
+    str(os.getenv('QUERY_BUDGET_ENABLED', DEBUG)).lower() == 'true'
+)
+
+QUERY_BUDGET_STRICT = (
+    str(os.getenv('QUERY_BUDGET_STRICT')).lower() == 'true'
+)
+
+PERF_TIMING_ENABLED = (
+    str(os.getenv('PERF_TIMING_ENABLED')).lower() == 'true'
+)
+
+PERF_TIMING_TOKEN = os.getenv('PERF_TIMING_TOKEN', '')
+
+ASYNC_VIEWS = str(os.getenv('ASYNC_VIEWS')).lower() == 'true'
+
+ASGI_THREAD_POOL_SIZE = int(os.getenv('ASGI_THREAD_POOL_SIZE', 8))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
+
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', 300))
+
+RECIPE_INDEX_MAX_REPLAY = int(os.getenv('RECIPE_INDEX_MAX_REPLAY', 1000))
+
+RECIPE_MATCH_MAX_INGREDIENTS = int(
+    os.getenv('RECIPE_MATCH_MAX_INGREDIENTS', 50)
+)
+
 ROOT_URLCONF = 'foodgram_backend.urls'
 
 TEMPLATES = [
@@ -95,17 +140,70 @@ WSGI_APPLICATION = 'foodgram_backend.wsgi.application'
 #     }
 # }
 
+DB_POOL = {
+    'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+    'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+    'MAX_LIFETIME': int(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+    'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+    'HEALTH_CHECK': (
+        str(os.getenv('DB_POOL_HEALTH_CHECK', True)).lower() == 'true'
+    ),
+}
+
+DB_POOL_ENABLED = (
+    str(os.getenv('DB_POOL_ENABLED', False)).lower() == 'true'
+)
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'foodgram_backend.backends.postgresql',
         'NAME': os.getenv('POSTGRES_DB', 'django'),
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
         'PORT': os.getenv('DB_PORT', 5432),
+        'POOL': DB_POOL if DB_POOL_ENABLED else None,
+    }
+}
+
+if os.getenv('REPLICA_DB_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.getenv('REPLICA_DB_HOST'),
+        'PORT': os.getenv('REPLICA_DB_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 10))
+
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 10000))
+
+AUTH_TOKEN_CACHE_TTL = int(os.getenv('AUTH_TOKEN_CACHE_TTL', 300))
+
+AUTH_TOKEN_CACHE_SHARED = (
+    str(os.getenv('AUTH_TOKEN_CACHE_SHARED')).lower() == 'true'
+)
+
+GUNICORN_WORKERS = int(os.getenv('GUNICORN_WORKERS', 1))
+
+CACHE_LOCATION = os.getenv('CACHE_LOCATION')
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.memcached.PyMemcacheCache'
+            if CACHE_LOCATION
+            else 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': CACHE_LOCATION or 'foodgram',
     }
 }
 
+API_CACHE_TIMEOUT = int(os.getenv('API_CACHE_TIMEOUT', 300))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -138,4 +236,22 @@ STATIC_ROOT = '/app/static_django/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+RECIPE_IMAGE_MAX_SIZE = int(
+    os.getenv('RECIPE_IMAGE_MAX_SIZE', 10 * 1024 * 1024)
+)
+
+RECIPE_IMAGE_MAX_SIDE = int(os.getenv('RECIPE_IMAGE_MAX_SIDE', 5000))
+
+RECIPE_BULK_MAX_SIZE = int(os.getenv('RECIPE_BULK_MAX_SIZE', 100))
+
+SIMILAR_RECIPES_COUNT = int(os.getenv('SIMILAR_RECIPES_COUNT', 10))
+
+TRENDING_SIZE = int(os.getenv('TRENDING_SIZE', 50))
+
+TRENDING_CACHE_TIMEOUT = int(os.getenv('TRENDING_CACHE_TIMEOUT', 300))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Recipe, Ingredient, Tag, Favorite
+from .models import Recipe, Ingredient, Tag
 
 
 class RecipeAdmin(admin.ModelAdmin):
@@ -11,13 +11,12 @@ class RecipeAdmin(admin.ModelAdmin):
         'image',
         'text',
         'cooking_time',
-        'favorite_count'
+        'favorites_count',
+        'shoppings_count',
     )
     list_filter = ('author', 'name', 'tags')
     filter_horizontal = ('tags', 'ingredients')
-
-    def favorite_count(self, obj):
-        return Favorite.objects.filter(recipe_id=obj.id).count()
+    readonly_fields = ('favorites_count', 'shoppings_count')
 
 
 class IngredientAdmin(admin.ModelAdmin):
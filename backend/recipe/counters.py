@@ -0,0 +1,46 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('recipe.Recipe', 'favorites_count', 'recipe.Favorite', 'recipe'),
+    ('recipe.Recipe', 'shoppings_count', 'recipe.Shopping', 'recipe'),
+    ('user.User', 'recipes_count', 'recipe.Recipe', 'author'),
+)
+
+
+def count_related(model, field):
+    """Подзапрос с числом строк `model`, ссылающихся на запись."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                total=Count('pk')
+            ).values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+def rebuild(get_model, dry_run=False):
+    """Пересчет счетчиков, разошедшихся с таблицами связей.
+
+    `get_model` — функция получения модели по метке, чтобы пересчет
+    работал и в миграциях. Возвращает число исправленных записей
+    для каждого счетчика.
+    """
+    fixed = {}
+    for label, counter, related_label, field in COUNTERS:
+        model = get_model(label)
+        actual = count_related(get_model(related_label), field)
+        drifted = model.objects.annotate(actual=actual).exclude(
+            **{counter: F('actual')}
+        )
+        if dry_run:
+            fixed[f'{label}.{counter}'] = drifted.count()
+            continue
+        fixed[f'{label}.{counter}'] = model.objects.filter(
+            pk__in=drifted.values('pk')
+        ).update(**{counter: actual})
+    return fixed
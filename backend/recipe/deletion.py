@@ -0,0 +1,19 @@
+from django.db import models
+
+
+def cascade_marked(collector, field, sub_objs, using):
+    """`CASCADE`, отмечающий удаляемые объекты именем поля связи.
+
+    Обработчики `pre_delete` и `post_delete` по отметке пропускают
+    построчную работу, которую одним запросом выполняет обработчик
+    удаляемого родителя. Объект, удаляемый сразу по двум связям,
+    сохраняет первую отметку.
+    """
+    models.CASCADE(collector, field, sub_objs, using)
+    for instance in sub_objs:
+        instance.__dict__.setdefault('deleted_by_cascade', field.name)
+
+
+def deleted_by_cascade(instance, *fields):
+    """Удаляется ли объект каскадом по одной из связей `fields`."""
+    return getattr(instance, 'deleted_by_cascade', None) in fields
@@ -0,0 +1,132 @@
+import re
+from itertools import islice
+
+from django.db import connection, connections
+from django.db.models import BooleanField, Expression, FloatField, Q
+
+BATCH_SIZE = 1000
+TABLE = 'recipe_search'
+CONFIG = 'russian'
+WORDS = re.compile(r'\w+')
+
+# Ключ строки назван `rowid` на всех базах, как скрытый столбец FTS5:
+# по нему модель `RecipeSearch` соединяет индекс с рецептами. Таблица
+# создается миграциями 0008 и 0012.
+UPSERT = {
+    'postgresql': (
+        f'INSERT INTO {TABLE} (rowid, document) VALUES ('
+        f"%s, setweight(to_tsvector('{CONFIG}', %s), 'A') "
+        f"|| setweight(to_tsvector('{CONFIG}', %s), 'B')) "
+        'ON CONFLICT (rowid) DO UPDATE SET document = excluded.document'
+    ),
+    'sqlite': f'INSERT INTO {TABLE} (rowid, name, text) VALUES (%s, %s, %s)',
+}
+
+DELETE = {
+    'postgresql': f'DELETE FROM {TABLE} WHERE rowid = %s',
+    'sqlite': f'DELETE FROM {TABLE} WHERE rowid = %s',
+}
+
+# Условие и оценка вычисляются по строке индекса, присоединенной
+# к рецепту (`{table}` — ее псевдоним в запросе). Название весит
+# больше описания: веса `A`/`B` в PostgreSQL и множители столбцов
+# `bm25` в SQLite. `bm25` тем меньше, чем точнее совпадение,
+# поэтому берется со знаком минус.
+MATCH = {
+    'postgresql': (
+        f"{{table}}.document @@ websearch_to_tsquery('{CONFIG}', %s)"
+    ),
+    'sqlite': '{table} MATCH %s',
+}
+
+RANK = {
+    'postgresql': (
+        f"ts_rank({{table}}.document, websearch_to_tsquery('{CONFIG}', %s))"
+    ),
+    'sqlite': '-bm25({table}, 10.0, 1.0)',
+}
+
+
+class IndexExpression(Expression):
+    """SQL-шаблон над строкой индекса из соединения `search_entry`."""
+
+    def __init__(self, template, value, output_field):
+        super().__init__(output_field=output_field)
+        self.template = template
+        self.value = value
+
+    def as_sql(self, compiler, connection):
+        alias = compiler.query.table_map[TABLE][0]
+        return self.template.format(
+            table=compiler.quote_name_unless_alias(alias)
+        ), [self.value] * self.template.count('%s')
+
+
+def index_recipes(rows, replace=True):
+    """Запись в индекс строк `(id, название, описание)`.
+
+    `replace=False` — рецептов в индексе заведомо нет.
+    """
+    vendor = connection.vendor
+    if vendor not in UPSERT:
+        return
+    rows = list(rows)
+    with connection.cursor() as cursor:
+        if replace and vendor == 'sqlite':
+            cursor.executemany(DELETE[vendor], [(row[0],) for row in rows])
+        cursor.executemany(UPSERT[vendor], rows)
+
+
+def remove_recipes(ids):
+    vendor = connection.vendor
+    if vendor not in DELETE:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(DELETE[vendor], [(id,) for id in ids])
+
+
+def rebuild(get_model):
+    """Полное перестроение индекса по таблице рецептов.
+
+    `get_model` — функция получения модели по метке, чтобы индекс
+    строился и в миграциях. Возвращает число проиндексированных рецептов.
+    """
+    if connection.vendor not in UPSERT:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+    rows = get_model('recipe.Recipe').objects.values_list(
+        'id', 'name', 'text'
+    ).order_by().iterator(chunk_size=BATCH_SIZE)
+    indexed = 0
+    while True:
+        batch = list(islice(rows, BATCH_SIZE))
+        if not batch:
+            return indexed
+        index_recipes(batch, replace=False)
+        indexed += len(batch)
+
+
+def search(queryset, value):
+    """Рецепты, найденные по названию и описанию, лучшие первыми.
+
+    Оценка доступна в атрибуте `search_rank`. На базах без
+    полнотекстового индекса выполняется поиск подстроки без ранжирования.
+    """
+    vendor = connections[queryset.db].vendor
+    words = WORDS.findall(value)
+    if not words:
+        return queryset
+    if vendor not in MATCH:
+        return queryset.filter(
+            Q(name__icontains=value) | Q(text__icontains=value)
+        )
+    if vendor == 'sqlite':
+        value = ' '.join(f'"{word}"*' for word in words)
+    return queryset.filter(
+        search_entry__isnull=False
+    ).filter(
+        IndexExpression(MATCH[vendor], value, BooleanField())
+    ).annotate(
+        search_rank=IndexExpression(RANK[vendor], value, FloatField())
+    ).order_by('-search_rank', '-id')
@@ -0,0 +1,195 @@
+import csv
+import json
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipe.models import Ingredient
+from recipe.signals import ingredients_loaded
+
+DEFAULT_PATH = Path(settings.BASE_DIR).parent / 'data' / 'ingredients.csv'
+CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    reader = csv.reader(file)
+    for row in reader:
+        if not row:
+            continue
+        if len(row) < 2:
+            raise CommandError(
+                f'Строка {reader.line_num}: ожидаются название '
+                f'и единица измерения, получено: {row}'
+            )
+        yield row[0].strip(), row[1].strip()
+
+
+def read_json(file):
+    """Построчное чтение массива JSON без загрузки файла целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    while True:
+        chunk = file.read(CHUNK_SIZE)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,[':
+                started = started or buffer[position] == '['
+                position += 1
+            if position < len(buffer) and buffer[position] == ']':
+                return
+            if not started or position == len(buffer):
+                break
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break
+            yield item['name'].strip(), item['measurement_unit'].strip()
+        if not chunk:
+            return
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+class CSVStream:
+    """Файлоподобный объект для `COPY ... FROM STDIN`."""
+
+    def __init__(self, rows):
+        self.lines = (self.format(row) for row in rows)
+        self.buffer = ''
+
+    @staticmethod
+    def format(row):
+        return ','.join(
+            '"{}"'.format(value.replace('"', '""')) for value in row
+        ) + '\n'
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            line = next(self.lines, None)
+            if line is None:
+                break
+            self.buffer += line
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+class Command(BaseCommand):
+    help = (
+        'Загрузка ингредиентов из CSV или JSON. '
+        'Уже существующие пары (название, единица измерения) пропускаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default=str(DEFAULT_PATH),
+            help='Файл .csv или .json, по умолчанию data/ingredients.csv.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Размер пакета вставки.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, какие ингредиенты будут добавлены.'
+        )
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='Не использовать COPY на PostgreSQL.'
+        )
+
+    def read(self, path):
+        readers = {'.csv': read_csv, '.json': read_json}
+        reader = readers.get(path.suffix.lower())
+        if reader is None:
+            raise CommandError(f'Неподдерживаемый формат файла: {path}')
+        if not path.exists():
+            raise CommandError(f'Файл не найден: {path}')
+        with open(path, encoding='utf-8') as file:
+            yield from reader(file)
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        rows = self.read(Path(options['path']))
+        if options['dry_run']:
+            self.diff(rows, options['batch_size'])
+        elif connection.vendor == 'postgresql' and not options['no_copy']:
+            self.copy(rows)
+        else:
+            self.bulk_create(rows, options['batch_size'])
+
+    def existing(self, batch):
+        return set(Ingredient.objects.filter(
+            name__in={name for name, _ in batch}
+        ).values_list('name', 'measurement_unit'))
+
+    def diff(self, rows, batch_size):
+        seen = set()
+        new = existing = 0
+        for batch in batches(rows, batch_size):
+            stored = self.existing(batch)
+            for row in batch:
+                if row in stored or row in seen:
+                    existing += 1
+                    continue
+                seen.add(row)
+                new += 1
+                if self.verbosity > 1:
+                    self.stdout.write('+ {} ({})'.format(*row))
+        self.stdout.write(f'Будет добавлено: {new}, уже есть: {existing}')
+
+    @transaction.atomic
+    def bulk_create(self, rows, batch_size):
+        before = Ingredient.objects.count()
+        for batch in batches(rows, batch_size):
+            Ingredient.objects.bulk_create(
+                [
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in batch
+                ],
+                ignore_conflicts=True
+            )
+        self.report(Ingredient.objects.count() - before)
+
+    @transaction.atomic
+    def copy(self, rows):
+        table = Ingredient._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE ingredient_load '
+                '(name varchar(200), measurement_unit varchar(200)) '
+                'ON COMMIT DROP'
+            )
+            cursor.copy_expert(
+                'COPY ingredient_load FROM STDIN WITH (FORMAT csv)',
+                CSVStream(rows)
+            )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT DISTINCT name, measurement_unit FROM ingredient_load '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING'
+            )
+            self.report(cursor.rowcount)
+
+    def report(self, count):
+        if count:
+            ingredients_loaded.send(sender=Ingredient)
+        self.stdout.write(self.style.SUCCESS(
+            f'Добавлено ингредиентов: {count}'
+        ))
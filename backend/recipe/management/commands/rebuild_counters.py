@@ -0,0 +1,28 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipe.counters import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчет счетчиков избранного, списков покупок '
+        'и рецептов автора.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать число разошедшихся счетчиков.'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixed = rebuild(apps.get_model, options['dry_run'])
+        verb = 'Расходится' if options['dry_run'] else 'Исправлено'
+        for counter, count in fixed.items():
+            self.stdout.write(f'{counter}: {verb.lower()} {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} записей: {sum(fixed.values())}'
+        ))
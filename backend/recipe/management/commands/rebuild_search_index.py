@@ -0,0 +1,16 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipe.fulltext import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Перестроение полнотекстового индекса рецептов.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            indexed = rebuild(apps.get_model)
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано рецептов: {indexed}'
+        ))
@@ -0,0 +1,22 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipe.shopping_list import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересчет списков покупок по рецептам в корзинах пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='users',
+            help='id пользователя; по умолчанию пересчитываются все.'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            written = rebuild(apps.get_model, options['users'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Записано строк списков покупок: {written}'
+        ))
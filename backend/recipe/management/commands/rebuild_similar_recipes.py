@@ -0,0 +1,32 @@
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipe.similarity import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчет похожих рецептов по ингредиентам и тегам '
+        'для рецептов, измененных с прошлого запуска.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать соседей всех рецептов.'
+        )
+        parser.add_argument(
+            '--count', type=int, default=settings.SIMILAR_RECIPES_COUNT,
+            help='Число соседей каждого рецепта.'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuilt = rebuild(
+                apps.get_model, options['count'], options['full']
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано рецептов: {rebuilt}'
+        ))
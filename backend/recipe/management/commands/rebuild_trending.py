@@ -0,0 +1,20 @@
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipe.trending import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчет рейтингов популярных рецептов за 24 часа и 7 дней. '
+        'Запускается периодически, например из cron.'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            sizes = rebuild(apps.get_model, settings.TRENDING_SIZE)
+        for window, size in sizes.items():
+            self.stdout.write(f'{window}: рецептов в рейтинге {size}')
+        self.stdout.write(self.style.SUCCESS('Рейтинги обновлены'))
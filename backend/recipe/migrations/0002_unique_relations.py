@@ -0,0 +1,55 @@
+# Generated by Django 3.2.3 on 2026-10-18 04:02
+
+from django.db import migrations, models
+from django.db.models import Min
+
+# Уникальные связи из моделей, для которых не было миграции.
+# Повторы, накопившиеся без ограничений, удаляются до их создания.
+UNIQUE_FIELDS = (
+    ('Favorite', ('user', 'recipe')),
+    ('Shopping', ('user', 'recipe')),
+    ('Subscription', ('user', 'subscriber')),
+    ('IngredientRecipe', ('ingredient', 'recipe')),
+    ('TagRecipe', ('tag', 'recipe')),
+)
+
+
+def delete_duplicates(apps, schema_editor):
+    """Из повторяющихся связей остается созданная первой."""
+    for name, fields in UNIQUE_FIELDS:
+        model = apps.get_model('recipe', name)
+        first = model.objects.values(*fields).annotate(
+            first_id=Min('id')
+        ).values_list('first_id', flat=True)
+        model.objects.exclude(id__in=list(first)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='favorite',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_favorites'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredientrecipe',
+            constraint=models.UniqueConstraint(fields=('ingredient', 'recipe'), name='unique_ingredient_recipe'),
+        ),
+        migrations.AddConstraint(
+            model_name='shopping',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_shoppings'),
+        ),
+        migrations.AddConstraint(
+            model_name='subscription',
+            constraint=models.UniqueConstraint(fields=('user', 'subscriber'), name='unique_subscription'),
+        ),
+        migrations.AddConstraint(
+            model_name='tagrecipe',
+            constraint=models.UniqueConstraint(fields=('tag', 'recipe'), name='unique_tag_recipe'),
+        ),
+    ]
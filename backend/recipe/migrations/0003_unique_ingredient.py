@@ -0,0 +1,68 @@
+# Generated by Django 3.2.3 on 2026-10-18 04:02
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicates(apps, schema_editor):
+    """Повторы пары (название, единица) сливаются в первый ингредиент.
+
+    Рецепты переходят на него; если рецепт уже содержит его,
+    количества складываются.
+    """
+    Ingredient = apps.get_model('recipe', 'Ingredient')
+    IngredientRecipe = apps.get_model('recipe', 'IngredientRecipe')
+    groups = Ingredient.objects.values('name', 'measurement_unit').annotate(
+        first_id=Min('id'), total=Count('id')
+    ).filter(total__gt=1)
+    for group in groups:
+        duplicates = Ingredient.objects.filter(
+            name=group['name'], measurement_unit=group['measurement_unit']
+        ).exclude(id=group['first_id'])
+        for row in IngredientRecipe.objects.filter(
+            ingredient__in=duplicates
+        ):
+            kept = IngredientRecipe.objects.filter(
+                ingredient_id=group['first_id'], recipe_id=row.recipe_id
+            ).first()
+            if kept is None:
+                row.ingredient_id = group['first_id']
+                row.save(update_fields=['ingredient'])
+            else:
+                kept.amount += row.amount
+                kept.save(update_fields=['amount'])
+                row.delete()
+        duplicates.delete()
+
+
+class Migration(migrations.Migration):
+    # В PostgreSQL таблицу с отложенными проверками внешних ключей
+    # нельзя изменять в той же транзакции, поэтому слияние фиксируется
+    # до создания ограничения.
+    atomic = False
+
+    dependencies = [
+        ('recipe', '0002_unique_relations'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='ingredient',
+            options={'verbose_name_plural': 'Ингредиенты'},
+        ),
+        migrations.AlterModelOptions(
+            name='recipe',
+            options={'ordering': ('-id',), 'verbose_name_plural': 'Рецепты'},
+        ),
+        migrations.AlterModelOptions(
+            name='tag',
+            options={'verbose_name_plural': 'Теги'},
+        ),
+        migrations.RunPython(
+            merge_duplicates, migrations.RunPython.noop, atomic=True
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
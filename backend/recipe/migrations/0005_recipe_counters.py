@@ -0,0 +1,31 @@
+# Generated by Django 3.2.3 on 2026-10-18 04:17
+
+from django.db import migrations, models
+
+from recipe.counters import rebuild
+
+
+def fill_counters(apps, schema_editor):
+    rebuild(apps.get_model)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0004_recipe_updated_at_tableversion'),
+        ('user', '0002_user_recipes_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shoppings_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations
+
+# Схема и заполнение записаны в миграции, а не берутся из
+# `recipe.fulltext`, чтобы ее результат не зависел от текущего кода.
+# Ключ строки в PostgreSQL переименован в `rowid` миграцией 0012.
+SCHEMA = {
+    'postgresql': (
+        'CREATE TABLE recipe_search ('
+        'recipe_id bigint PRIMARY KEY REFERENCES recipe_recipe (id) '
+        'ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+        'document tsvector NOT NULL)',
+        'CREATE INDEX recipe_search_document_idx '
+        'ON recipe_search USING GIN (document)',
+        'INSERT INTO recipe_search (recipe_id, document) '
+        "SELECT id, setweight(to_tsvector('russian', name), 'A') "
+        "|| setweight(to_tsvector('russian', text), 'B') "
+        'FROM recipe_recipe',
+    ),
+    'sqlite': (
+        'CREATE VIRTUAL TABLE recipe_search USING fts5('
+        "name, text, tokenize = 'unicode61 remove_diacritics 2')",
+        'INSERT INTO recipe_search (rowid, name, text) '
+        'SELECT id, name, text FROM recipe_recipe',
+    ),
+}
+
+
+def create_index(apps, schema_editor):
+    for sql in SCHEMA.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(sql)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor in SCHEMA:
+        schema_editor.execute('DROP TABLE recipe_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0007_recipe_author_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
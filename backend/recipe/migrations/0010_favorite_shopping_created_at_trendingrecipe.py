@@ -0,0 +1,67 @@
+# Generated by Django 3.2.3 on 2026-10-18 05:04
+
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+# Время уже существующих добавлений неизвестно: отметка в прошлом
+# не дает им попасть в окна рейтинга популярных рецептов.
+LEGACY_CREATED_AT = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def backfill_created_at(apps, schema_editor):
+    for label in ('recipe.Favorite', 'recipe.Shopping'):
+        apps.get_model(label).objects.update(created_at=LEGACY_CREATED_AT)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0009_similarrecipe'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingRecipe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(max_length=8, verbose_name='Окно')),
+                ('score', models.PositiveIntegerField(verbose_name='Счет')),
+            ],
+            options={
+                'verbose_name_plural': 'Популярные рецепты',
+            },
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата добавления'),
+        ),
+        migrations.AddField(
+            model_name='shopping',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата добавления'),
+        ),
+        migrations.RunPython(
+            backfill_created_at, migrations.RunPython.noop
+        ),
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['created_at', 'recipe'], name='favorite_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shopping',
+            index=models.Index(fields=['created_at', 'recipe'], name='shopping_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='trendingrecipe',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipe.recipe'),
+        ),
+        migrations.AddConstraint(
+            model_name='trendingrecipe',
+            constraint=models.UniqueConstraint(fields=('window', 'recipe'), name='unique_trending_recipe'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.3 on 2026-10-18 05:32
+
+from django.conf import settings
+from django.db import migrations, models
+import recipe.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipe', '0010_favorite_shopping_created_at_trendingrecipe'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='author',
+            field=models.ForeignKey(on_delete=recipe.deletion.cascade_marked, related_name='recipes', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
+        ),
+        migrations.AlterField(
+            model_name='shopping',
+            name='recipe',
+            field=models.ForeignKey(on_delete=recipe.deletion.cascade_marked, related_name='shoppings', to='recipe.recipe'),
+        ),
+        migrations.AlterField(
+            model_name='shopping',
+            name='user',
+            field=models.ForeignKey(on_delete=recipe.deletion.cascade_marked, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 3.2.3 on 2026-10-18 05:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def rename_key(old, new):
+    """Переименование ключа индекса PostgreSQL из миграции 0008
+    в `rowid`, как у скрытого столбца FTS5."""
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(
+                f'ALTER TABLE recipe_search RENAME COLUMN {old} TO {new}'
+            )
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0011_shopping_cascade_marked'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearch',
+            fields=[
+                ('recipe', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='recipe.recipe')),
+            ],
+            options={
+                'db_table': 'recipe_search',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(
+            rename_key('recipe_id', 'rowid'),
+            rename_key('rowid', 'recipe_id'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:04
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0012_recipesearch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tableversion',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Дата создания'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:10
+
+from django.db import migrations, models
+import recipe.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0013_tableversion_created_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='favorite',
+            name='recipe',
+            field=models.ForeignKey(on_delete=recipe.deletion.cascade_marked, related_name='favorites', to='recipe.recipe'),
+        ),
+    ]
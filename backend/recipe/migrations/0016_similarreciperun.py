@@ -0,0 +1,49 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:22
+
+from django.db import migrations, models
+
+VERSION_NAME = 'similar_recipe'
+
+
+def move_last_run(apps, schema_editor):
+    """Время прошлого запуска хранилось в `TableVersion`."""
+    versions = apps.get_model('recipe.TableVersion').objects.filter(
+        name=VERSION_NAME
+    )
+    started_at = versions.values_list('updated_at', flat=True).first()
+    if started_at is not None:
+        apps.get_model('recipe.SimilarRecipeRun').objects.create(
+            started_at=started_at
+        )
+    versions.delete()
+
+
+def restore_last_run(apps, schema_editor):
+    runs = apps.get_model('recipe.SimilarRecipeRun').objects
+    started_at = runs.values_list('started_at', flat=True).first()
+    if started_at is not None:
+        apps.get_model('recipe.TableVersion').objects.create(
+            name=VERSION_NAME, updated_at=started_at
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0015_relation_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarRecipeRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(verbose_name='Время запуска')),
+                ('recipes', models.PositiveIntegerField(default=0, verbose_name='Пересчитано рецептов')),
+            ],
+            options={
+                'verbose_name_plural': 'Запуски пересчета похожих рецептов',
+            },
+        ),
+        migrations.RunPython(move_last_run, restore_last_run),
+    ]
@@ -1,9 +1,77 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils import timezone
+
+from user.models import CountersModel
+from .deletion import cascade_marked
 
 User = get_user_model()
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Набор запросов модели `Recipe`."""
+
+    def for_read(self, user):
+        """Рецепты со всеми связями, нужными для вывода.
+
+        Ингредиенты, теги и авторы подгружаются отдельными запросами
+        на всю страницу, флаги избранного, списка покупок и подписки
+        на автора вычисляются в самом запросе.
+        """
+        authors = User.objects.all()
+        queryset = self.select_related(None)
+        if user.is_authenticated:
+            authors = authors.annotate(subscribed=models.Exists(
+                Subscription.objects.filter(
+                    user=user, subscriber=models.OuterRef('pk')
+                )
+            ))
+            queryset = queryset.annotate(
+                is_favorited=models.Exists(Favorite.objects.filter(
+                    user=user, recipe=models.OuterRef('pk')
+                )),
+                is_in_shopping_cart=models.Exists(Shopping.objects.filter(
+                    user=user, recipe=models.OuterRef('pk')
+                )),
+            )
+        return queryset.prefetch_related(
+            models.Prefetch('author', queryset=authors),
+            models.Prefetch(
+                'ingredient_recipe',
+                queryset=IngredientRecipe.objects.select_related(
+                    'ingredient'
+                )
+            ),
+            'tags',
+        )
+
+
+class SubscriptionQuerySet(models.QuerySet):
+    """Набор запросов модели `Subscription`."""
+
+    def for_read(self, recipes_limit=None):
+        """Подписки с авторами и их последними рецептами.
+
+        Последние `recipes_limit` рецептов каждого автора выбираются
+        одним запросом на страницу через коррелированный подзапрос,
+        рецепты доступны в атрибуте `feed_recipes` автора.
+        """
+        recipes = Recipe.objects.order_by('-id')
+        if recipes_limit:
+            recipes = recipes.filter(id__in=models.Subquery(
+                Recipe.objects.filter(
+                    author=models.OuterRef('author')
+                ).order_by('-id').values('id')[:recipes_limit]
+            ))
+        return self.select_related('subscriber').prefetch_related(
+            models.Prefetch(
+                'subscriber__recipes',
+                queryset=recipes,
+                to_attr='feed_recipes'
+            )
+        )
+
+
 class Ingredient(models.Model):
     """Модель ингредиента."""
     name = models.CharField(
@@ -17,6 +85,12 @@ class Ingredient(models.Model):
 
     class Meta:
         verbose_name_plural = 'Ингредиенты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.name} ({self.measurement_unit})'
@@ -45,12 +119,16 @@ class Tag(models.Model):
         return self.slug
 
 
-class Recipe(models.Model):
+class Recipe(CountersModel):
     """Модель рецепта."""
+    counter_fields = ('favorites_count', 'shoppings_count')
+
+    # Поиск по автору обслуживает индекс `recipe_author_id_idx`.
     author = models.ForeignKey(
         User,
-        on_delete=models.CASCADE,
+        on_delete=cascade_marked,
         related_name='recipes',
+        db_index=False,
         verbose_name='Автор'
     )
     name = models.CharField(
@@ -77,15 +155,57 @@ class Recipe(models.Model):
         upload_to='recipes/images/',
         verbose_name='Картинка'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном'
+    )
+    shoppings_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В списках покупок'
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name_plural = 'Рецепты'
         ordering = ('-id',)
+        indexes = [
+            models.Index(
+                fields=['author', '-id'],
+                name='recipe_author_id_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.name} {self.author}'
 
 
+class RecipeSearch(models.Model):
+    """Строка полнотекстового индекса рецепта.
+
+    Таблицу создает и заполняет `recipe.fulltext`, модель нужна только
+    для соединения с рецептами в запросах поиска.
+    """
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        related_name='search_entry'
+    )
+
+    class Meta:
+        managed = False
+        db_table = 'recipe_search'
+
+
 class IngredientRecipe(models.Model):
     """Модель связи ингредиента и рецепта."""
     ingredient = models.ForeignKey(
@@ -114,10 +234,12 @@ class IngredientRecipe(models.Model):
 
 class TagRecipe(models.Model):
     """Модель связи тега и рецепта."""
-    tag = models.ForeignKey(Tag, on_delete=models.CASCADE)
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, db_index=False)
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
 
     class Meta:
+        # Индекс ограничения `(tag, recipe)` обслуживает фильтр по тегам
+        # и поиск связей тега.
         constraints = [
             models.UniqueConstraint(
                 fields=['tag', 'recipe'],
@@ -129,6 +251,83 @@ class TagRecipe(models.Model):
         return f'{self.tag} {self.recipe}'
 
 
+class SimilarRecipe(models.Model):
+    """Похожий рецепт с косинусной близостью по ингредиентам и тегам.
+
+    Заполняется командой `rebuild_similar_recipes`, для каждого рецепта
+    хранится не больше `SIMILAR_RECIPES_COUNT` ближайших.
+    """
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.FloatField(verbose_name='Близость')
+
+    class Meta:
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='unique_similar_recipe'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} {self.similar} {self.score:.3f}'
+
+
+class SimilarRecipeRun(models.Model):
+    """Последний запуск `rebuild_similar_recipes`.
+
+    Повторный запуск пересчитывает рецепты, измененные после
+    `started_at`. Хранится одна строка.
+    """
+    started_at = models.DateTimeField(verbose_name='Время запуска')
+    recipes = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Пересчитано рецептов'
+    )
+
+    class Meta:
+        verbose_name_plural = 'Запуски пересчета похожих рецептов'
+
+    def __str__(self):
+        return f'{self.started_at:%Y-%m-%d %H:%M:%S} {self.recipes}'
+
+
+class TrendingRecipe(models.Model):
+    """Место рецепта в рейтинге популярности за окно времени.
+
+    Заполняется командой `rebuild_trending`: счет — число добавлений
+    в избранное и списки покупок за окно.
+    """
+    window = models.CharField(max_length=8, verbose_name='Окно')
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.PositiveIntegerField(verbose_name='Счет')
+
+    class Meta:
+        verbose_name_plural = 'Популярные рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['window', 'recipe'],
+                name='unique_trending_recipe'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.window} {self.recipe} {self.score}'
+
+
 class Subscription(models.Model):
     """Модель подписки."""
     user = models.ForeignKey(
@@ -136,6 +335,8 @@ class Subscription(models.Model):
     subscriber = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='is_subscribed')
 
+    objects = SubscriptionQuerySet.as_manager()
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -148,30 +349,129 @@ class Subscription(models.Model):
 class Favorite(models.Model):
     """Модель избранного."""
     user = models.ForeignKey(
-        User, on_delete=models.CASCADE)
+        User, on_delete=models.CASCADE, db_index=False)
     recipe = models.ForeignKey(
-        Recipe, on_delete=models.CASCADE, related_name='favorites')
+        Recipe, on_delete=cascade_marked, related_name='favorites')
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Дата добавления'
+    )
 
     class Meta:
+        # Индекс ограничения `(user, recipe)` обслуживает фильтр
+        # `is_favorited` и поиск записей пользователя.
         constraints = [
             models.UniqueConstraint(
                 fields=['user', 'recipe'],
                 name='unique_favorites'
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['created_at', 'recipe'],
+                name='favorite_created_idx'
+            ),
+        ]
 
 
 class Shopping(models.Model):
     """Модель списка покупок."""
     user = models.ForeignKey(
-        User, on_delete=models.CASCADE)
+        User, on_delete=cascade_marked, db_index=False)
     recipe = models.ForeignKey(
-        Recipe, on_delete=models.CASCADE, related_name='shoppings')
+        Recipe, on_delete=cascade_marked, related_name='shoppings')
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Дата добавления'
+    )
 
     class Meta:
+        # Индекс ограничения `(user, recipe)` обслуживает фильтр
+        # `is_in_shopping_cart` и поиск записей пользователя.
         constraints = [
             models.UniqueConstraint(
                 fields=['user', 'recipe'],
                 name='unique_shoppings'
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['created_at', 'recipe'],
+                name='shopping_created_idx'
+            ),
+        ]
+
+
+class ShoppingListItem(models.Model):
+    """Итоговое количество ингредиента в списке покупок пользователя.
+
+    Обновляется при добавлении и удалении рецептов из списка покупок
+    и при изменении ингредиентов рецепта, полностью пересчитывается
+    командой `rebuild_shopping_lists`.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items'
+    )
+    amount = models.BigIntegerField(verbose_name='Количество')
+
+    class Meta:
+        verbose_name_plural = 'Списки покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_item'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} {self.ingredient} {self.amount}'
+
+
+class TableVersion(models.Model):
+    """Счетчик изменений таблицы.
+
+    Используется для HTTP-валидаторов `ETag` и `Last-Modified`
+    списков, которые дорого сравнивать по содержимому. Дата создания
+    входит в `ETag`: после пересоздания строки счетчик начинается
+    заново, и без нее старые `ETag` совпали бы с новыми.
+    """
+    name = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name='Таблица'
+    )
+    version = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Версия'
+    )
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        editable=False,
+        verbose_name='Дата создания'
+    )
+    updated_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Дата изменения'
+    )
+
+    class Meta:
+        verbose_name_plural = 'Версии таблиц'
+
+    def __str__(self):
+        return f'{self.name} {self.version}'
+
+    @classmethod
+    def bump(cls, name):
+        updated = cls.objects.filter(name=name).update(
+            version=models.F('version') + 1,
+            updated_at=timezone.now()
+        )
+        if not updated:
+            cls.objects.get_or_create(name=name, defaults={'version': 1})
@@ -0,0 +1,175 @@
+from itertools import islice
+
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.db.models.expressions import RawSQL
+
+from .models import IngredientRecipe, Recipe, Shopping, ShoppingListItem
+
+BATCH_SIZE = 1000
+
+UPSERT = (
+    'INSERT INTO {table} ({user}, {ingredient}, {amount}) {select} '
+    'ON CONFLICT ({user}, {ingredient}) '
+    'DO UPDATE SET {amount} = {table}.{amount} + excluded.{amount}'
+)
+
+
+def quoted(model, *fields):
+    """Имена таблицы и столбцов модели для сырого SQL."""
+    quote = connection.ops.quote_name
+    return [quote(model._meta.db_table)] + [
+        quote(model._meta.get_field(field).column) for field in fields
+    ]
+
+
+def upsert(select, params):
+    """Прибавление количеств из `select` к строкам списков покупок.
+
+    `select` возвращает тройки `(пользователь, ингредиент, количество)`,
+    отсутствующие строки создаются. PostgreSQL и SQLite выполняют
+    `INSERT ... ON CONFLICT DO UPDATE` одним запросом.
+    """
+    table, user, ingredient, amount = quoted(
+        ShoppingListItem, 'user', 'ingredient', 'amount'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(UPSERT.format(
+            table=table, user=user, ingredient=ingredient, amount=amount,
+            select=select
+        ), params)
+
+
+def add_recipe(user_id, recipe_id, sign=1):
+    """Добавление ингредиентов рецепта в список покупок пользователя."""
+    table, recipe, ingredient, amount = quoted(
+        IngredientRecipe, 'recipe', 'ingredient', 'amount'
+    )
+    upsert(
+        f'SELECT %s, {ingredient}, %s * {amount} FROM {table} '
+        f'WHERE {recipe} = %s',
+        [user_id, sign, recipe_id]
+    )
+
+
+@transaction.atomic
+def remove_recipe(user_id, recipe_id):
+    """Вычитание ингредиентов рецепта из списка покупок пользователя."""
+    add_recipe(user_id, recipe_id, sign=-1)
+    ShoppingListItem.objects.filter(user_id=user_id, amount__lte=0).delete()
+
+
+def remove_shopping(condition, params):
+    """Вычитание рецептов из списков покупок одним запросом.
+
+    `condition` отбирает строки `Shopping` (псевдоним `shopping`),
+    ингредиенты всех отобранных рецептов суммируются по пользователю.
+    """
+    table, recipe, user = quoted(Shopping, 'recipe', 'user')
+    links, link_recipe, ingredient, amount = quoted(
+        IngredientRecipe, 'recipe', 'ingredient', 'amount'
+    )
+    with transaction.atomic():
+        upsert(
+            f'SELECT shopping.{user}, links.{ingredient}, '
+            f'-SUM(links.{amount}) FROM {table} shopping '
+            f'JOIN {links} links ON links.{link_recipe} = '
+            f'shopping.{recipe} WHERE {condition} '
+            f'GROUP BY shopping.{user}, links.{ingredient}',
+            params
+        )
+        ShoppingListItem.objects.filter(
+            amount__lte=0,
+            user_id__in=RawSQL(
+                f'SELECT shopping.{user} FROM {table} shopping '
+                f'WHERE {condition}', params
+            ),
+        ).delete()
+
+
+def remove_recipe_everywhere(recipe_id):
+    """Вычитание удаляемого рецепта из всех списков покупок."""
+    recipe = quoted(Shopping, 'recipe')[1]
+    remove_shopping(f'shopping.{recipe} = %s', [recipe_id])
+
+
+def remove_author_recipes(author_id):
+    """Вычитание рецептов удаляемого автора из чужих списков покупок.
+
+    Собственный список автора удаляется вместе с ним.
+    """
+    recipe, user = quoted(Shopping, 'recipe', 'user')[1:]
+    recipes, recipe_id, author = quoted(Recipe, 'id', 'author')
+    remove_shopping(
+        f'shopping.{user} <> %s AND shopping.{recipe} IN '
+        f'(SELECT {recipe_id} FROM {recipes} WHERE {author} = %s)',
+        [author_id, author_id]
+    )
+
+
+def change_recipe(recipe_id, deltas):
+    """Перенос изменений ингредиентов рецепта в списки покупок
+    всех пользователей, добавивших рецепт.
+
+    `deltas` — словарь `{id ингредиента: изменение количества}`.
+    Все изменения прибавляются одним запросом: пары из `VALUES`
+    соединяются со строками `Shopping` рецепта.
+    """
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items() if delta
+    }
+    users = Shopping.objects.filter(recipe_id=recipe_id).values('user_id')
+    if not deltas or not users.exists():
+        return
+    table, recipe, user = quoted(Shopping, 'recipe', 'user')
+    rows = ', '.join(['(%s, %s)'] * len(deltas))
+    decreased = [
+        ingredient_id for ingredient_id, delta in deltas.items() if delta < 0
+    ]
+    with transaction.atomic():
+        upsert(
+            f'WITH deltas (ingredient, amount) AS (VALUES {rows}) '
+            f'SELECT shopping.{user}, deltas.ingredient, deltas.amount '
+            f'FROM {table} shopping CROSS JOIN deltas '
+            f'WHERE shopping.{recipe} = %s',
+            [value for row in deltas.items() for value in row] + [recipe_id]
+        )
+        if decreased:
+            ShoppingListItem.objects.filter(
+                user_id__in=users, ingredient_id__in=decreased,
+                amount__lte=0
+            ).delete()
+
+
+def rebuild(get_model, user_ids=None):
+    """Полный пересчет списков покупок по таблице `Shopping`.
+
+    `get_model` — функция получения модели по метке, чтобы пересчет
+    работал и в миграциях. Возвращает число записанных строк.
+    """
+    item_model = get_model('recipe.ShoppingListItem')
+    items = item_model.objects.all()
+    lookup = {'recipe__shoppings__isnull': False}
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+        lookup = {'recipe__shoppings__user_id__in': user_ids}
+    items.delete()
+    totals = get_model('recipe.IngredientRecipe').objects.filter(
+        **lookup
+    ).values_list(
+        'recipe__shoppings__user_id', 'ingredient_id'
+    ).annotate(total=Sum('amount')).order_by().iterator(
+        chunk_size=BATCH_SIZE
+    )
+    written = 0
+    while True:
+        batch = [
+            item_model(user_id=user_id, ingredient_id=ingredient_id,
+                       amount=total)
+            for user_id, ingredient_id, total in islice(totals, BATCH_SIZE)
+        ]
+        if not batch:
+            return written
+        item_model.objects.bulk_create(batch)
+        written += len(batch)
@@ -0,0 +1,133 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import Signal, receiver
+
+from .models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    Shopping,
+    Tag,
+    TableVersion,
+    User,
+)
+from . import fulltext, shopping_list
+from .deletion import deleted_by_cascade
+
+# Пакетная загрузка `load_ingredients` идет без сигналов моделей.
+ingredients_loaded = Signal()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(ingredients_loaded)
+def ingredient_changed(sender, **kwargs):
+    TableVersion.bump('ingredient')
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    TableVersion.bump('tag')
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, created, update_fields, **kwargs):
+    """Данные автора входят в ответы о рецептах."""
+    if created or update_fields == {'last_login'}:
+        return
+    TableVersion.bump('user')
+
+
+COUNTER_FIELDS = {
+    Favorite: 'favorites_count',
+    Shopping: 'shoppings_count',
+}
+
+
+def change_counter(model, pk, counter, delta):
+    """Изменение счетчика `counter` записи `pk` на `delta` без гонок.
+
+    Уменьшение не опускает счетчик ниже нуля, если он уже разошелся
+    с данными; такие расхождения исправляет `rebuild_counters`.
+    """
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{counter}__gte': -delta})
+    queryset.update(**{counter: F(counter) + delta})
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=Shopping)
+def user_recipe_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(
+            Recipe, instance.recipe_id, COUNTER_FIELDS[sender], 1
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=Shopping)
+def user_recipe_deleted(sender, instance, **kwargs):
+    if not deleted_by_cascade(instance, 'recipe'):
+        change_counter(
+            Recipe, instance.recipe_id, COUNTER_FIELDS[sender], -1
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, update_fields, **kwargs):
+    if update_fields is None or {'name', 'text'} & update_fields:
+        fulltext.index_recipes(
+            [(instance.pk, instance.name, instance.text)],
+            replace=not created
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_removed(sender, instance, **kwargs):
+    fulltext.remove_recipes([instance.pk])
+
+
+@receiver(post_save, sender=Shopping)
+def shopping_created(sender, instance, created, **kwargs):
+    if created:
+        shopping_list.add_recipe(instance.user_id, instance.recipe_id)
+
+
+@receiver(pre_delete, sender=Shopping)
+def shopping_deleted(sender, instance, **kwargs):
+    """Ингредиенты вычитаются до удаления, пока связи рецепта
+    с ингредиентами не удалены каскадом вместе с рецептом.
+
+    При каскадном удалении рецепта их вычитает `recipe_deleting`,
+    а список покупок удаляемого пользователя удаляется вместе с ним.
+    """
+    if not deleted_by_cascade(instance, 'recipe', 'user'):
+        shopping_list.remove_recipe(instance.user_id, instance.recipe_id)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    """Вычитание рецепта из всех списков покупок одним запросом.
+
+    Рецепты удаляемого автора вычитает `author_deleting`.
+    """
+    if not deleted_by_cascade(instance, 'author'):
+        shopping_list.remove_recipe_everywhere(instance.pk)
+
+
+@receiver(pre_delete, sender=User)
+def author_deleting(sender, instance, **kwargs):
+    shopping_list.remove_author_recipes(instance.pk)
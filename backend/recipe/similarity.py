@@ -0,0 +1,241 @@
+import numpy as np
+from django.db.models import Count, Min
+from django.utils import timezone
+
+TAG_WEIGHT = 0.5
+BLOCK_CELLS = 2 ** 22
+BATCH_SIZE = 2000
+
+
+def ranges(starts, counts):
+    """Индексы подряд идущих отрезков `[start, start + count)`."""
+    return (
+        np.repeat(starts - np.cumsum(counts) + counts, counts)
+        + np.arange(counts.sum())
+    )
+
+
+def split(counts, limit):
+    """Срезы `counts` с суммой не больше `limit`.
+
+    Элемент больше `limit` попадает в срез один. Даже для пустого
+    `counts` возвращается один срез.
+    """
+    ends = np.cumsum(counts)
+    start = 0
+    while True:
+        offset = ends[start - 1] if start else 0
+        end = max(start + 1, int(np.searchsorted(
+            ends, offset + limit, side='right'
+        )))
+        yield slice(start, end)
+        if end >= len(counts):
+            return
+        start = end
+
+
+class Features:
+    """Разреженная матрица `рецепт × признак` из ингредиентов и тегов.
+
+    Признаки двоичные, у тегов вес `TAG_WEIGHT`: общий тег сближает
+    рецепты слабее общего ингредиента. Ингредиенты хранятся по
+    столбцам (`indptr`/`rows` — рецепты каждого ингредиента),
+    немногочисленные теги — плотной матрицей.
+    """
+
+    def __init__(self, get_model):
+        self.ids = np.array(sorted(
+            get_model('recipe.Recipe').objects.values_list('id', flat=True)
+        ), dtype=np.int64)
+        links = np.array(
+            get_model('recipe.IngredientRecipe').objects.values_list(
+                'recipe_id', 'ingredient_id'
+            ).order_by(),
+            dtype=np.int64
+        ).reshape(-1, 2)
+        rows = np.searchsorted(self.ids, links[:, 0])
+        features, columns = np.unique(links[:, 1], return_inverse=True)
+        order = np.argsort(columns, kind='stable')
+        self.rows = rows[order]
+        self.columns = columns[order]
+        self.indptr = np.concatenate((
+            [0], np.cumsum(np.bincount(columns, minlength=len(features)))
+        ))
+        self.by_row = np.argsort(self.rows, kind='stable')
+        self.row_indptr = np.concatenate((
+            [0], np.cumsum(np.bincount(self.rows, minlength=len(self.ids)))
+        ))
+
+        links = np.array(
+            get_model('recipe.TagRecipe').objects.values_list(
+                'recipe_id', 'tag_id'
+            ).order_by(),
+            dtype=np.int64
+        ).reshape(-1, 2)
+        tags, tag_columns = np.unique(links[:, 1], return_inverse=True)
+        self.tags = np.zeros((len(self.ids), len(tags)), dtype=np.float32)
+        self.tags[np.searchsorted(self.ids, links[:, 0]), tag_columns] = (
+            TAG_WEIGHT
+        )
+        norms = np.sqrt(
+            np.diff(self.row_indptr) + (self.tags ** 2).sum(axis=1)
+        ).astype(np.float32)
+        norms[norms == 0] = np.inf
+        self.norms = norms
+
+    def shared_ingredients(self, positions):
+        """Число общих ингредиентов рецептов `positions` со всеми
+        рецептами, развернутое в одномерный массив.
+
+        Общие ингредиенты считаются по спискам рецептов каждого
+        ингредиента без перебора всех пар. Списки разворачиваются
+        частями не больше `BLOCK_CELLS` элементов (или одного списка,
+        если он длиннее), поэтому память не зависит от их длины.
+        """
+        size = len(positions) * len(self.ids)
+        starts = self.row_indptr[positions]
+        counts = self.row_indptr[positions + 1] - starts
+        block_rows = np.repeat(np.arange(len(positions)), counts)
+        columns = self.columns[self.by_row[ranges(starts, counts)]]
+        starts = self.indptr[columns]
+        counts = self.indptr[columns + 1] - starts
+        shared = None
+        for part in split(counts, BLOCK_CELLS):
+            cells = np.repeat(block_rows[part] * len(self.ids), counts[part])
+            cells += self.rows[ranges(starts[part], counts[part])]
+            if shared is None:
+                shared = np.bincount(cells, minlength=size)
+            else:
+                shared += np.bincount(cells, minlength=size)
+        return shared
+
+    def scores(self, positions):
+        """Косинусная близость рецептов `positions` ко всем рецептам.
+
+        Теги учитываются произведением плотных матриц. Размер
+        результата — `len(positions) × N`.
+        """
+        result = self.shared_ingredients(positions).reshape(
+            len(positions), len(self.ids)
+        ).astype(np.float32)
+        result += self.tags[positions] @ self.tags.T
+        result /= self.norms[positions, None]
+        result /= self.norms[None, :]
+        result[np.arange(len(positions)), positions] = 0
+        return result
+
+    def blocks(self, positions):
+        """Пары `(positions, scores)` блоками не больше `BLOCK_CELLS`."""
+        size = max(1, BLOCK_CELLS // max(len(self.ids), 1))
+        for start in range(0, len(positions), size):
+            block = positions[start:start + size]
+            yield block, self.scores(block)
+
+
+def top_neighbours(ids, block, scores, count):
+    """Строки `(recipe_id, similar_id, score)` лучших `count` соседей."""
+    count = min(count, scores.shape[1] - 1)
+    if count <= 0:
+        return []
+    best = np.argpartition(-scores, count - 1, axis=1)[:, :count]
+    rows = []
+    for position, row, columns in zip(block, scores, best):
+        for column in columns[np.argsort(-row[columns], kind='stable')]:
+            if row[column] > 0:
+                rows.append((
+                    int(ids[position]), int(ids[column]), float(row[column])
+                ))
+    return rows
+
+
+def outdated(get_model, features, since, count):
+    """Позиции рецептов, чьи списки соседей надо пересчитать.
+
+    Это рецепты, измененные с `since`, и рецепты, на списки которых
+    они могут повлиять: уже содержащие измененный рецепт или те,
+    для кого он теперь ближе худшего из сохраненных соседей. Списки
+    короче `count` (например, после удаления соседа) пересчитываются
+    всегда. Возвращает позиции затронутых рецептов, позиции измененных
+    и уже посчитанные строки соседей измененных.
+    """
+    ids = features.ids
+    changed = np.searchsorted(ids, np.array(
+        get_model('recipe.Recipe').objects.filter(
+            updated_at__gte=since
+        ).values_list('id', flat=True),
+        dtype=np.int64
+    ))
+    count = min(count, len(ids) - 1)
+    threshold = np.full(len(ids), -1, dtype=np.float32)
+    stored = get_model('recipe.SimilarRecipe').objects.values(
+        'recipe_id'
+    ).annotate(total=Count('id'), lowest=Min('score')).values_list(
+        'recipe_id', 'total', 'lowest'
+    ).order_by()
+    for recipe_id, total, lowest in stored:
+        if total >= count:
+            threshold[np.searchsorted(ids, recipe_id)] = lowest
+    reach = np.zeros(len(ids), dtype=np.float32)
+    rows = []
+    for block, scores in features.blocks(changed):
+        rows += top_neighbours(ids, block, scores, count)
+        np.maximum(reach, scores.max(axis=0), out=reach)
+    affected = reach > threshold
+    affected[np.searchsorted(ids, np.array(
+        get_model('recipe.SimilarRecipe').objects.filter(
+            similar_id__in=ids[changed].tolist()
+        ).values_list('recipe_id', flat=True),
+        dtype=np.int64
+    ))] = True
+    affected[changed] = False
+    return np.flatnonzero(affected), changed, rows
+
+
+def rebuild(get_model, count, full=False):
+    """Пересчет таблицы похожих рецептов.
+
+    Без `full` пересчитываются только рецепты, затронутые изменениями
+    с прошлого запуска (`SimilarRecipeRun`).
+    Близости считаются блоками, поэтому память ограничена
+    `BLOCK_CELLS` ячейками при любом числе рецептов. `get_model` —
+    функция получения модели по метке. Возвращает число рецептов
+    с пересчитанными соседями.
+    """
+    started = timezone.now()
+    runs = get_model('recipe.SimilarRecipeRun').objects
+    SimilarRecipe = get_model('recipe.SimilarRecipe')
+    since = runs.values_list('started_at', flat=True).first()
+    features = Features(get_model)
+    if full or since is None:
+        SimilarRecipe.objects.all().delete()
+        positions = np.arange(len(features.ids))
+        changed, rows = positions[:0], []
+    else:
+        positions, changed, rows = outdated(
+            get_model, features, since, count
+        )
+        recipe_ids = features.ids[np.concatenate((positions, changed))]
+        for start in range(0, len(recipe_ids), BATCH_SIZE):
+            SimilarRecipe.objects.filter(recipe_id__in=recipe_ids[
+                start:start + BATCH_SIZE
+            ].tolist()).delete()
+    for block, scores in features.blocks(positions):
+        rows += top_neighbours(features.ids, block, scores, count)
+        if len(rows) >= BATCH_SIZE:
+            save(SimilarRecipe, rows)
+            rows = []
+    save(SimilarRecipe, rows)
+    rebuilt = len(positions) + len(changed)
+    if not runs.update(started_at=started, recipes=rebuilt):
+        runs.create(started_at=started, recipes=rebuilt)
+    return rebuilt
+
+
+def save(model, rows):
+    model.objects.bulk_create(
+        [
+            model(recipe_id=recipe_id, similar_id=similar_id, score=score)
+            for recipe_id, similar_id, score in rows
+        ],
+        batch_size=BATCH_SIZE,
+    )
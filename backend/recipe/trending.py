@@ -0,0 +1,63 @@
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+WINDOWS = {
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+}
+EVENT_MODELS = ('recipe.Favorite', 'recipe.Shopping')
+CACHE_KEY = 'api:trending:{}'
+
+
+def leaders_sql(get_model):
+    """Запрос рейтинга: добавления в избранное и покупки с момента `%s`
+    одним `UNION ALL`, сгруппированные по рецепту."""
+    quote = connection.ops.quote_name
+    events = ' UNION ALL '.join(
+        f'SELECT {quote("recipe_id")} FROM '
+        f'{quote(get_model(label)._meta.db_table)} '
+        f'WHERE {quote("created_at")} >= %s'
+        for label in EVENT_MODELS
+    )
+    return (
+        f'SELECT {quote("recipe_id")}, COUNT(*) AS score '
+        f'FROM ({events}) events GROUP BY {quote("recipe_id")} '
+        f'ORDER BY score DESC, {quote("recipe_id")} DESC LIMIT %s'
+    )
+
+
+def rebuild(get_model, size):
+    """Пересчет рейтингов всех окон из `WINDOWS`.
+
+    На каждое окно выполняется один агрегирующий запрос, в рейтинг
+    попадают `size` лучших рецептов. `get_model` — функция получения
+    модели по метке. После фиксации транзакции новые рейтинги
+    записываются в кэш вместо прежних. Возвращает число рецептов
+    в рейтинге каждого окна.
+    """
+    TrendingRecipe = get_model('recipe.TrendingRecipe')
+    sql = leaders_sql(get_model)
+    now = timezone.now()
+    sizes = {}
+    for window, length in WINDOWS.items():
+        since = connection.ops.adapt_datetimefield_value(now - length)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [since] * len(EVENT_MODELS) + [size])
+            leaders = cursor.fetchall()
+        TrendingRecipe.objects.filter(window=window).delete()
+        TrendingRecipe.objects.bulk_create([
+            TrendingRecipe(window=window, recipe_id=recipe_id, score=score)
+            for recipe_id, score in leaders
+        ])
+        transaction.on_commit(partial(
+            cache.set, CACHE_KEY.format(window), [
+                (recipe_id, score) for recipe_id, score in leaders
+            ], settings.TRENDING_CACHE_TIMEOUT
+        ))
+        sizes[window] = len(leaders)
+    return sizes
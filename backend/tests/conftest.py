@@ -0,0 +1,116 @@
+import base64
+import io
+
+import pytest
+from django.core.cache import cache
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import token_cache
+from api.search import invalidate_ingredient_index
+from recipe.models import Ingredient, Tag
+
+
+def image_base64(size=(4, 4), image_format='PNG'):
+    """Картинка в виде data URL, как ее присылает фронтенд."""
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, image_format)
+    return (
+        f'data:image/{image_format.lower()};base64,'
+        + base64.b64encode(buffer.getvalue()).decode()
+    )
+
+
+@pytest.fixture(autouse=True)
+def clean_caches(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    cache.clear()
+    token_cache.store = None
+    invalidate_ingredient_index()
+
+
+@pytest.fixture
+def users(django_user_model):
+    return [
+        django_user_model.objects.create_user(
+            username=f'user{number}',
+            email=f'user{number}@example.com',
+            password='password-123',
+            first_name='Имя',
+            last_name='Фамилия',
+        )
+        for number in range(3)
+    ]
+
+
+@pytest.fixture
+def user(users):
+    return users[0]
+
+
+@pytest.fixture
+def ingredients(db):
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+        for number in range(10)
+    )
+    return list(Ingredient.objects.order_by('id'))
+
+
+@pytest.fixture
+def tags(db):
+    return [
+        Tag.objects.create(
+            name=f'тег {number}', color=f'#00000{number}', slug=f'tag{number}'
+        )
+        for number in range(3)
+    ]
+
+
+@pytest.fixture
+def anonymous_client():
+    return APIClient()
+
+
+def get_client(user):
+    client = APIClient()
+    token, _ = Token.objects.get_or_create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+@pytest.fixture
+def user_client(user):
+    return get_client(user)
+
+
+def recipe_data(ingredients, tags, name='Рецепт', amount=10,
+                text='Описание'):
+    """Тело запроса создания или изменения рецепта."""
+    return {
+        'ingredients': [
+            {'id': ingredient.id, 'amount': amount}
+            for ingredient in ingredients
+        ],
+        'tags': [tag.id for tag in tags],
+        'image': image_base64(),
+        'name': name,
+        'text': text,
+        'cooking_time': 5,
+    }
+
+
+@pytest.fixture
+def create_recipe(ingredients, tags):
+    """Создание рецепта через API от имени `client`."""
+    def create(client, name='Рецепт', ingredients=ingredients[:3],
+               tags=tags[:1], amount=10, text='Описание'):
+        response = client.post(
+            '/api/recipes/',
+            recipe_data(ingredients, tags, name, amount, text),
+            format='json'
+        )
+        assert response.status_code == 201, response.content
+        return response.json()
+    return create
@@ -0,0 +1,48 @@
+"""Настройки для тестов.
+
+Тесты идут на SQLite в памяти с локальным кэшем, лимиты SQL-запросов
+представлений проверяются строго: превышение роняет тест.
+С `TESTS_DATABASE=postgresql` используется PostgreSQL из переменных
+`POSTGRES_*` и `DB_*`, как в основных настройках.
+"""
+import os
+import tempfile
+
+from foodgram_backend.settings import *  # noqa: F401,F403
+
+SECRET_KEY = os.getenv('SECRET_KEY', 'tests')
+
+DEBUG = False
+
+ALLOWED_HOSTS = ['testserver', 'localhost']
+
+if os.getenv('TESTS_DATABASE') == 'postgresql':
+    DATABASES = {'default': DATABASES['default']}  # noqa: F405
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'foodgram_backend.backends.sqlite3',
+            'NAME': ':memory:',
+        }
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tests',
+    }
+}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+MEDIA_ROOT = os.path.join(tempfile.gettempdir(), 'foodgram_tests_media')
+
+QUERY_BUDGET_ENABLED = True
+
+QUERY_BUDGET_STRICT = True
+
+PERF_TIMING_ENABLED = False
+
+PERF_TIMING_TOKEN = ''
+
+ASYNC_VIEWS = False
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+from rest_framework.authtoken.models import Token
+
+from api import views
+from api.concurrency import StreamingASGIHandler
+from api.middleware import QueryBudgetMiddleware
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def asgi_get(path, user, query_string=b''):
+    """GET-запрос через `ASGIHandler`: статус и тело ответа."""
+    token, _ = Token.objects.get_or_create(user=user)
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'query_string': query_string,
+        'headers': [
+            (b'host', b'testserver'),
+            (b'authorization', f'Token {token.key}'.encode()),
+        ],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 0),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(StreamingASGIHandler()(scope, receive, send))
+    return messages[0]['status'], b''.join(
+        message.get('body', b'') for message in messages[1:]
+    )
+
+
+def test_download_shopping_cart(user, user_client, create_recipe):
+    recipe = create_recipe(user_client)
+    user_client.post(f'/api/recipes/{recipe["id"]}/shopping_cart/')
+    status, body = asgi_get('/api/recipes/download_shopping_cart/', user)
+    assert status == 200
+    assert 'ингредиент 0 (г) - 10' in body.decode()
+
+
+@pytest.mark.parametrize('format', ('txt', 'csv', 'json'))
+def test_download_in_chunks(monkeypatch, user, user_client, create_recipe,
+                            ingredients, format):
+    monkeypatch.setattr(views, 'SHOPPING_CART_CHUNK_SIZE', 2)
+    recipe = create_recipe(user_client, ingredients=ingredients[:5])
+    user_client.post(f'/api/recipes/{recipe["id"]}/shopping_cart/')
+    path = '/api/recipes/download_shopping_cart/'
+    expected = b''.join(
+        user_client.get(path, {'format': format}).streaming_content
+    )
+    status, body = asgi_get(path, user, f'format={format}'.encode())
+    assert status == 200
+    assert body == expected
+    assert body.decode().count('ингредиент') == 5
+
+
+def test_middleware_is_coroutine():
+    async def get_response(request):
+        return None
+
+    assert asyncio.iscoroutinefunction(QueryBudgetMiddleware(get_response))
+    assert not asyncio.iscoroutinefunction(
+        QueryBudgetMiddleware(lambda request: None)
+    )
@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from api import cache
+from api.authentication import TokenCache
+
+from .conftest import get_client
+
+
+def test_cached_token(user, user_client):
+    assert user_client.get('/api/users/me/').status_code == 200
+    with CaptureQueriesContext(connection) as queries:
+        assert user_client.get('/api/users/me/').status_code == 200
+    assert not any(
+        'authtoken' in query['sql'] for query in queries.captured_queries
+    )
+
+
+def test_user_changes_are_visible(user, user_client):
+    user_client.get('/api/users/me/')
+    user.first_name = 'Новое'
+    user.save()
+    assert user_client.get('/api/users/me/').json()['first_name'] == 'Новое'
+    user.is_active = False
+    user.save()
+    assert user_client.get('/api/users/me/').status_code == 401
+
+
+def test_logout(user, user_client):
+    user_client.get('/api/users/me/')
+    assert user_client.post('/api/auth/token/logout/').status_code == 204
+    assert user_client.get('/api/users/me/').status_code == 401
+
+
+@pytest.fixture
+def shared_cache(monkeypatch):
+    """Кэш Django считается общим для процессов."""
+    monkeypatch.setattr(cache, 'PROCESS_CACHES', ())
+
+
+def test_invalidation_reaches_other_workers(user, shared_cache):
+    key = Token.objects.create(user=user).key
+    workers = TokenCache(), TokenCache()
+    for worker in workers:
+        worker.set(key, user)
+        assert worker.get(key).pk == user.pk
+    workers[0].invalidate(user.pk, key)
+    assert workers[1].get(key) is None
+    workers[1].set(key, user)
+    assert workers[1].get(key) is not None
+
+
+def test_other_users_stay_cached(users, shared_cache):
+    keys = [Token.objects.create(user=user).key for user in users[:2]]
+    worker = TokenCache()
+    for key, user in zip(keys, users):
+        worker.set(key, user)
+    TokenCache().invalidate(users[0].pk, keys[0])
+    assert worker.get(keys[0]) is None
+    assert worker.get(keys[1]).pk == users[1].pk
+
+
+def test_process_cache_is_not_versioned(settings):
+    settings.AUTH_TOKEN_CACHE_TTL = 300
+    worker = TokenCache()
+    assert worker.get_store().ttl == 300
+    assert not worker.versioned
+
+
+@pytest.mark.django_db
+def test_hit_rate_is_counted_under_threads(user):
+    worker = TokenCache()
+    assert worker.hit_rate is None
+    key = Token.objects.create(user=user).key
+    worker.set(key, user)
+
+    def lookup():
+        for _ in range(200):
+            worker.get(key)
+            worker.get('unknown')
+
+    threads = [threading.Thread(target=lookup) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert worker.get_stats() == {
+        'hits': 800, 'misses': 800, 'hit_rate': 0.5
+    }
+    assert worker.snapshot()['size'] == 1
+
+
+def test_signal_invalidation_with_shared_cache(users, shared_cache):
+    client = get_client(users[1])
+    client.get('/api/users/me/')
+    users[1].is_active = False
+    users[1].save()
+    assert client.get('/api/users/me/').status_code == 401
@@ -0,0 +1,87 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipe.models import Recipe
+from .conftest import recipe_data
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def post_bulk(client, payload):
+    return client.post('/api/recipes/bulk/', payload, format='json')
+
+
+@pytest.fixture
+def payload(ingredients, tags):
+    return [
+        recipe_data(ingredients[:3], tags[:2], name=f'Рецепт {i}')
+        for i in range(4)
+    ]
+
+
+def test_bulk_create(user, user_client, payload):
+    response = post_bulk(user_client, payload)
+    assert response.status_code == 201, response.content
+    recipes = response.json()
+    assert [recipe['name'] for recipe in recipes] == [
+        f'Рецепт {i}' for i in range(4)
+    ]
+    assert all(
+        len(recipe['ingredients']) == 3 and len(recipe['tags']) == 2
+        for recipe in recipes
+    )
+    user.refresh_from_db()
+    assert user.recipes_count == 4
+
+
+def test_missing_ingredients(user_client, payload):
+    payload[1]['ingredients'] += [
+        {'id': 9999, 'amount': 1}, {'id': 9998, 'amount': 1}
+    ]
+    payload[3]['ingredients'] = [{'id': 9997, 'amount': 1}]
+    with CaptureQueriesContext(connection) as queries:
+        response = post_bulk(user_client, payload)
+    assert response.status_code == 400
+    errors = response.json()
+    assert errors[0] == errors[2] == {}
+    assert errors[1] == {'ingredients': [
+        'Нельзя добавить несуществующие ингредиенты: 9998, 9999'
+    ]}
+    assert errors[3] == {'ingredients': [
+        'Нельзя добавить несуществующие ингредиенты: 9997'
+    ]}
+    assert sum(
+        'FROM "recipe_ingredient"' in query['sql']
+        for query in queries.captured_queries
+    ) == 1
+    assert not Recipe.objects.exists()
+
+
+def test_missing_tags(user_client, payload):
+    payload[2]['tags'] += [999, 998]
+    response = post_bulk(user_client, payload)
+    assert response.status_code == 400
+    assert response.json()[2] == {
+        'tags': ['Нельзя добавить несуществующие теги: 999, 998']
+    }
+
+
+@pytest.mark.parametrize('data', ([], {}, 'рецепт'))
+def test_not_a_list(user_client, data):
+    response = post_bulk(user_client, data)
+    assert response.status_code == 400
+    assert response.json() == ['Ожидается непустой список рецептов']
+
+
+def test_too_many(settings, user_client, payload):
+    settings.RECIPE_BULK_MAX_SIZE = 3
+    response = post_bulk(user_client, payload)
+    assert response.status_code == 400
+    assert response.json() == [
+        'Слишком много рецептов в одном запросе, максимум 3'
+    ]
+
+
+def test_anonymous(anonymous_client, payload):
+    assert post_bulk(anonymous_client, payload).status_code == 401
@@ -0,0 +1,107 @@
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.cache import check_cache_shared, get_versions
+
+from .conftest import recipe_data
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def test_anonymous_list_is_cached(client, user_client, create_recipe):
+    create_recipe(user_client)
+    first = client.get('/api/recipes/')
+    with CaptureQueriesContext(connection) as queries:
+        second = client.get('/api/recipes/')
+    assert second.content == first.content
+    assert len(queries) == 0
+
+
+def test_recipe_change_invalidates_cache(client, user_client,
+                                         create_recipe, ingredients, tags):
+    recipe = create_recipe(user_client)
+    client.get('/api/recipes/')
+    response = user_client.patch(
+        f'/api/recipes/{recipe["id"]}/',
+        recipe_data(ingredients[:3], tags[:1], name='Новое название'),
+        format='json'
+    )
+    assert response.status_code == 200, response.content
+    response = client.get('/api/recipes/')
+    assert response.json()['results'][0]['name'] == 'Новое название'
+
+
+def test_author_change_invalidates_cache(client, user, user_client,
+                                         create_recipe):
+    recipe = create_recipe(user_client)
+    for path in ('/api/recipes/', f'/api/recipes/{recipe["id"]}/'):
+        client.get(path)
+    user.first_name = 'Переименованный'
+    user.save()
+    assert client.get('/api/recipes/').json()['results'][0]['author'][
+        'first_name'
+    ] == 'Переименованный'
+    assert client.get(f'/api/recipes/{recipe["id"]}/').json()['author'][
+        'first_name'
+    ] == 'Переименованный'
+
+
+def test_retrieve_keeps_other_recipes_cached(client, user_client,
+                                             create_recipe, ingredients,
+                                             tags):
+    first, second = create_recipe(user_client), create_recipe(user_client)
+    for recipe in (first, second):
+        client.get(f'/api/recipes/{recipe["id"]}/')
+    response = user_client.patch(
+        f'/api/recipes/{first["id"]}/',
+        recipe_data(ingredients[:3], tags[:1], name='Новое название'),
+        format='json'
+    )
+    assert response.status_code == 200, response.content
+    with CaptureQueriesContext(connection) as queries:
+        client.get(f'/api/recipes/{second["id"]}/')
+    assert len(queries) == 0
+    response = client.get(f'/api/recipes/{first["id"]}/')
+    assert response.json()['name'] == 'Новое название'
+
+
+def test_tag_relations_invalidate_retrieve(client, user_client,
+                                           create_recipe, tags):
+    recipe = create_recipe(user_client)
+    path = f'/api/recipes/{recipe["id"]}/'
+    client.get(path)
+    tags[2].recipe_set.add(recipe['id'])
+    assert tags[2].id in [tag['id'] for tag in client.get(path).json()[
+        'tags'
+    ]]
+    tags[2].recipe_set.clear()
+    assert tags[2].id not in [tag['id'] for tag in client.get(path).json()[
+        'tags'
+    ]]
+
+
+def test_user_without_recipes_keeps_cache(users):
+    versions = get_versions(['recipe'])
+    users[1].first_name = 'Переименованный'
+    users[1].save()
+    assert get_versions(['recipe']) == versions
+
+
+@pytest.mark.parametrize('backend, workers, error', (
+    ('django.core.cache.backends.locmem.LocMemCache', 1, False),
+    ('django.core.cache.backends.locmem.LocMemCache', 4, True),
+    ('django.core.cache.backends.filebased.FileBasedCache', 4, False),
+))
+def test_multiple_workers_need_shared_cache(settings, tmp_path, backend,
+                                            workers, error):
+    settings.GUNICORN_WORKERS = workers
+    settings.CACHES = {
+        'default': {'BACKEND': backend, 'LOCATION': str(tmp_path)}
+    }
+    if error:
+        with pytest.raises(ImproperlyConfigured):
+            check_cache_shared()
+    else:
+        check_cache_shared()
@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+
+from recipe.models import Tag, TableVersion
+from .conftest import get_client
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def recipe(user_client, create_recipe):
+    return create_recipe(user_client)
+
+
+@pytest.fixture(params=(False, True), ids=('anonymous', 'authenticated'))
+def reader(request, users, client):
+    return get_client(users[1]) if request.param else client
+
+
+def test_not_modified(reader, recipe):
+    path = f'/api/recipes/{recipe["id"]}/'
+    etag = reader.get(path)['ETag']
+    assert reader.get(path, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+
+def test_author_change_modifies_recipe(reader, user, recipe):
+    path = f'/api/recipes/{recipe["id"]}/'
+    etag = reader.get(path)['ETag']
+    user.last_name = 'Новая'
+    user.save()
+    response = reader.get(path, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()['author']['last_name'] == 'Новая'
+
+
+def test_login_keeps_etag(reader, users, recipe):
+    path = f'/api/recipes/{recipe["id"]}/'
+    etag = reader.get(path)['ETag']
+    response = reader.post('/api/auth/token/login/', {
+        'email': users[2].email, 'password': 'password-123'
+    })
+    assert response.status_code == 200
+    assert reader.get(path, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+
+def test_tags_not_modified(client, tags):
+    etag = client.get('/api/tags/')['ETag']
+    response = client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    Tag.objects.create(name='Новый', color='#000000', slug='new')
+    response = client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+
+def test_recreated_version_changes_etag(client, tags):
+    etag = client.get('/api/tags/')['ETag']
+    version = TableVersion.objects.get(name='tag')
+    TableVersion.objects.all().delete()
+    TableVersion.objects.create(
+        name='tag', version=version.version,
+        created_at=version.created_at + timedelta(seconds=1)
+    )
+    cache.clear()
+    response = client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
@@ -0,0 +1,75 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipe.models import Favorite, Recipe, Shopping
+from .conftest import get_client
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def recipe(user_client, create_recipe):
+    return Recipe.objects.get(pk=create_recipe(user_client)['id'])
+
+
+def test_counters_follow_relations(users, recipe):
+    for user in users[1:]:
+        client = get_client(user)
+        client.post(f'/api/recipes/{recipe.pk}/favorite/')
+        client.post(f'/api/recipes/{recipe.pk}/shopping_cart/')
+    get_client(users[1]).delete(f'/api/recipes/{recipe.pk}/favorite/')
+    recipe.refresh_from_db()
+    assert recipe.favorites_count == len(users) - 2
+    assert recipe.shoppings_count == len(users) - 1
+    assert users[0].__class__.objects.get(pk=users[0].pk).recipes_count == 1
+
+
+def test_stale_instance_keeps_counters(users, recipe):
+    Favorite.objects.create(user=users[1], recipe=recipe)
+    recipe.name = 'Новое название'
+    recipe.save()
+    recipe.refresh_from_db()
+    assert recipe.favorites_count == 1
+    assert recipe.name == 'Новое название'
+
+
+def test_copy_with_empty_pk(recipe):
+    recipe.pk = None
+    recipe.save()
+    assert Recipe.objects.count() == 2
+    assert recipe.author.__class__.objects.get(
+        pk=recipe.author_id
+    ).recipes_count == 2
+
+
+def test_recipe_delete_skips_counters(users, recipe):
+    for user in users[1:]:
+        Favorite.objects.create(user=user, recipe=recipe)
+        Shopping.objects.create(user=user, recipe=recipe)
+    with CaptureQueriesContext(connection) as queries:
+        recipe.delete()
+    assert not any(
+        'favorites_count' in query['sql'] or 'shoppings_count' in query['sql']
+        for query in queries.captured_queries
+    )
+
+
+def test_rebuild_counters(users, recipe):
+    Favorite.objects.create(user=users[1], recipe=recipe)
+    Recipe.objects.filter(pk=recipe.pk).update(
+        favorites_count=5, shoppings_count=2
+    )
+    out = StringIO()
+    call_command('rebuild_counters', '--dry-run', stdout=out)
+    assert 'Расходится записей: 2' in out.getvalue()
+    call_command('rebuild_counters', stdout=out)
+    assert 'Исправлено записей: 2' in out.getvalue()
+    recipe.refresh_from_db()
+    assert (recipe.favorites_count, recipe.shoppings_count) == (1, 0)
+    out = StringIO()
+    call_command('rebuild_counters', '--dry-run', stdout=out)
+    assert 'Расходится записей: 0' in out.getvalue()
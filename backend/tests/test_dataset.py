@@ -0,0 +1,35 @@
+import random
+
+import pytest
+
+from benchmarks.dataset import describe, generate, unique_pairs
+
+
+def test_unique_pairs_exclude_same_reaches_capacity():
+    users = list(range(5))
+    pairs = unique_pairs(
+        random.Random(0), 20, users, users, exclude_same=True
+    )
+    assert len(pairs) == len(set(pairs)) == 20
+    assert all(first != second for first, second in pairs)
+
+
+def test_unique_pairs_unreachable_count():
+    users = list(range(5))
+    with pytest.raises(ValueError, match='возможно 20'):
+        unique_pairs(random.Random(0), 21, users, users, exclude_same=True)
+
+
+def test_unique_pairs_deterministic():
+    assert unique_pairs(
+        random.Random(1), 10, range(10), range(50)
+    ) == unique_pairs(random.Random(1), 10, range(10), range(50))
+
+
+def test_generate_small_dataset(db):
+    generate(
+        users=2, recipes=3, favorites=6, carts=6, subscriptions=2,
+    )
+    counts = describe()
+    assert counts['favorite'] == counts['shopping'] == 6
+    assert counts['subscription'] == 2
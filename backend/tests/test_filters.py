@@ -0,0 +1,89 @@
+import pytest
+from django.db import connection
+from django.test import RequestFactory
+
+from api.filters import ModelFilter
+from recipe.models import Recipe
+from .conftest import get_client
+
+
+@pytest.fixture
+def recipes(user_client, create_recipe, tags):
+    return [
+        create_recipe(user_client, name='Все теги', tags=tags),
+        create_recipe(user_client, name='Первый тег', tags=tags[:1]),
+        create_recipe(user_client, name='Последний тег', tags=tags[2:]),
+    ]
+
+
+def test_tags_without_duplicates(client, recipes, tags):
+    response = client.get('/api/recipes/', {
+        'tags': [tag.slug for tag in tags[:2]], 'limit': 10
+    })
+    assert response.status_code == 200
+    assert response.json()['count'] == 2
+    assert [recipe['name'] for recipe in response.json()['results']] == [
+        'Первый тег', 'Все теги'
+    ]
+
+
+def test_unknown_tag(client, recipes):
+    response = client.get('/api/recipes/', {'tags': 'нет такого'})
+    assert response.json()['count'] == 0
+
+
+def test_favorited_and_author(users, recipes):
+    client = get_client(users[1])
+    client.post(f'/api/recipes/{recipes[0]["id"]}/favorite/')
+    response = client.get('/api/recipes/', {
+        'is_favorited': 1, 'author': users[0].id
+    })
+    assert [recipe['id'] for recipe in response.json()['results']] == [
+        recipes[0]['id']
+    ]
+
+
+def get_plan(user, **data):
+    request = RequestFactory().get('/')
+    request.user = user
+    return ModelFilter(
+        data, queryset=Recipe.objects.order_by('-id'), request=request
+    ).qs.explain()
+
+
+@pytest.mark.skipif(
+    connection.vendor != 'sqlite', reason='план запроса SQLite'
+)
+@pytest.mark.parametrize('get_data, indexes', (
+    (
+        lambda user: {'tags': ['tag0', 'tag1']},
+        ['sqlite_autoindex_recipe_tagrecipe_1'],
+    ),
+    (lambda user: {'author': user.id}, ['recipe_author_id_idx']),
+    (
+        lambda user: {'is_favorited': 1},
+        ['sqlite_autoindex_recipe_favorite_1'],
+    ),
+    (
+        lambda user: {'is_in_shopping_cart': 1},
+        ['sqlite_autoindex_recipe_shopping_1'],
+    ),
+    (
+        lambda user: {'tags': ['tag0'], 'is_favorited': 1},
+        [
+            'sqlite_autoindex_recipe_tagrecipe_1',
+            'sqlite_autoindex_recipe_favorite_1',
+        ],
+    ),
+), ids=('tags', 'author', 'is_favorited', 'is_in_shopping_cart',
+        'tags_and_favorited'))
+def test_filter_plans(user, tags, get_data, indexes):
+    """Фильтры идут по индексам; `sqlite_autoindex_*` — индексы
+    уникальных ограничений `(tag, recipe)` и `(user, recipe)`."""
+    plan = get_plan(user, **get_data(user))
+    assert 'TEMP B-TREE' not in plan
+    for index in indexes:
+        assert any(
+            'SEARCH' in line and f'INDEX {index} (' in line
+            for line in plan.splitlines()
+        ), plan
@@ -0,0 +1,124 @@
+import pytest
+
+from api import search
+from api.search import RecipeIngredientIndex, get_recipe_ingredient_index
+from .conftest import recipe_data
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+URL = '/api/recipes/from_ingredients/'
+
+
+@pytest.fixture(autouse=True)
+def reset_index():
+    search._recipe_index = None
+
+
+@pytest.fixture
+def recipes(user_client, create_recipe, ingredients):
+    return [
+        create_recipe(user_client, name=name, ingredients=[
+            ingredients[number] for number in numbers
+        ])['id']
+        for name, numbers in (
+            ('Полный', (0, 1)),
+            ('Один', (0,)),
+            ('Частичный', (1, 2, 3)),
+            ('Чужой', (4,)),
+        )
+    ]
+
+
+def build():
+    return RecipeIngredientIndex.build({
+        1: frozenset({1, 2}),
+        2: frozenset({1}),
+        3: frozenset({2, 3, 4}),
+        4: frozenset({5}),
+    })
+
+
+def test_rank():
+    matches = build().rank([1, 2])
+    assert len(matches) == 3
+    assert matches[0:10] == [(1, 2, 2), (2, 1, 1), (3, 1, 3)]
+    assert matches[1:2] == [(2, 1, 1)]
+    assert build().rank([1, 2], max_missing=0)[0:10] == [
+        (1, 2, 2), (2, 1, 1)
+    ]
+    assert len(build().rank([9])) == 0
+
+
+def test_apply_returns_new_index():
+    index = build()
+    changed = index.apply({1: frozenset(), 2: frozenset({3})}, seq=5)
+    assert changed.seq == 5
+    assert changed.rank([1, 2])[0:10] == [(3, 1, 3)]
+    assert changed.rank([3])[0:10] == [(2, 1, 1), (3, 1, 3)]
+    assert index.rank([1, 2])[0:10] == [(1, 2, 2), (2, 1, 1), (3, 1, 3)]
+
+
+def test_endpoint(client, recipes, ingredients):
+    response = client.get(URL, {
+        'ingredients': [ingredients[0].id, ingredients[1].id]
+    })
+    assert response.status_code == 200
+    assert [
+        (recipe['name'], recipe['matched_ingredients'],
+         recipe['missing_ingredients'])
+        for recipe in response.json()['results']
+    ] == [('Полный', 2, 0), ('Один', 1, 0), ('Частичный', 1, 2)]
+    response = client.get(URL, {
+        'ingredients': [ingredients[1].id], 'max_missing': 0
+    })
+    assert response.json()['count'] == 0
+
+
+@pytest.mark.parametrize('params, field', (
+    ({}, 'ingredients'),
+    ({'ingredients': 'соль'}, 'ingredients'),
+    ({'ingredients': [1] * 51}, 'ingredients'),
+    ({'ingredients': 1, 'max_missing': '-1'}, 'max_missing'),
+))
+def test_invalid_params(client, params, field):
+    response = client.get(URL, params)
+    assert response.status_code == 400
+    assert field in response.json()
+
+
+def test_index_replays_journal(monkeypatch, user_client, recipes,
+                               ingredients, tags):
+    index = get_recipe_ingredient_index()
+
+    def rebuild(cls, seq=None):
+        raise AssertionError('индекс перестроен целиком')
+
+    monkeypatch.setattr(
+        RecipeIngredientIndex, 'from_db', classmethod(rebuild)
+    )
+    response = user_client.patch(
+        f'/api/recipes/{recipes[3]}/',
+        recipe_data(ingredients[:2], tags[:1], name='Чужой'),
+        format='json'
+    )
+    assert response.status_code == 200
+    replayed = get_recipe_ingredient_index()
+    assert replayed is not index
+    assert replayed.seq > index.seq
+    assert replayed.recipes[recipes[3]] == frozenset(
+        ingredient.id for ingredient in ingredients[:2]
+    )
+
+
+def test_index_rebuilt_after_long_lag(monkeypatch, settings, user_client,
+                                      recipes):
+    settings.RECIPE_INDEX_MAX_REPLAY = 1
+    get_recipe_ingredient_index()
+
+    def replay(self, recipes, seq):
+        raise AssertionError('журнал длиннее RECIPE_INDEX_MAX_REPLAY')
+
+    monkeypatch.setattr(RecipeIngredientIndex, 'apply', replay)
+    for recipe_id in recipes[:2]:
+        user_client.delete(f'/api/recipes/{recipe_id}/')
+    assert set(get_recipe_ingredient_index().recipes) == set(recipes[2:])
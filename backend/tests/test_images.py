@@ -0,0 +1,120 @@
+import base64
+import io
+import os
+import tracemalloc
+
+import pytest
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.test import RequestFactory
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+from api.fields import Base64ImageField
+from .conftest import image_base64, recipe_data
+
+SIDE = 1000
+
+
+@pytest.fixture(scope='module')
+def large_png():
+    """Несжатая картинка примерно в 3 МБ."""
+    buffer = io.BytesIO()
+    Image.frombytes(
+        'RGB', (SIDE, SIDE), os.urandom(SIDE * SIDE * 3)
+    ).save(buffer, 'PNG', compress_level=0)
+    return buffer.getvalue()
+
+
+def traced_peak(func, *args):
+    """Результат и пик памяти Python; модули Pillow уже загружены."""
+    Base64ImageField().to_internal_value(image_base64())
+    tracemalloc.start()
+    try:
+        result = func(*args)
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_base64_memory(large_png):
+    data = 'data:image/png;base64,' + base64.b64encode(large_png).decode()
+    image, peak = traced_peak(Base64ImageField().to_internal_value, data)
+    assert image.size == len(large_png)
+    assert peak < len(large_png) / 4
+
+
+def test_multipart_memory(large_png):
+    upload = io.BytesIO(large_png)
+    upload.name = 'image.png'
+    request = RequestFactory().post('/api/recipes/', {'image': upload})
+
+    def parse():
+        image = request.FILES['image']
+        return Base64ImageField().to_internal_value(image)
+
+    image, peak = traced_peak(parse)
+    assert isinstance(image, TemporaryUploadedFile)
+    assert image.size == len(large_png)
+    assert peak < len(large_png) / 4
+
+
+@pytest.mark.parametrize('max_size, max_side, code', (
+    (1000, 5000, 'too_large'),
+    (10 ** 8, SIDE - 1, 'too_big'),
+))
+def test_base64_limits(settings, large_png, max_size, max_side, code):
+    settings.RECIPE_IMAGE_MAX_SIZE = max_size
+    settings.RECIPE_IMAGE_MAX_SIDE = max_side
+    data = 'data:image/png;base64,' + base64.b64encode(large_png).decode()
+    with pytest.raises(ValidationError) as error:
+        Base64ImageField().to_internal_value(data)
+    assert error.value.get_codes() == [code]
+
+
+@pytest.mark.parametrize('data, code', (
+    ('data:image/png;base64,@@@@', 'invalid_base64'),
+    ('data:image/png,iVBORw0KGgo=', 'invalid_base64'),
+    (
+        'data:image/png;base64,' + base64.b64encode(b'text').decode(),
+        'invalid_image',
+    ),
+))
+def test_invalid_base64(data, code):
+    with pytest.raises(ValidationError) as error:
+        Base64ImageField().to_internal_value(data)
+    assert error.value.get_codes() == [code]
+
+
+@pytest.mark.parametrize('max_size, max_side, error', (
+    (10 ** 8, 5000, None),
+    (1000, 5000, 'байт'),
+    (10 ** 8, SIDE - 1, 'пикселей'),
+))
+def test_multipart_upload(settings, user_client, ingredients, tags,
+                          large_png, max_size, max_side, error):
+    settings.RECIPE_IMAGE_MAX_SIZE = max_size
+    settings.RECIPE_IMAGE_MAX_SIDE = max_side
+    upload = io.BytesIO(large_png)
+    upload.name = 'image.png'
+    data = recipe_data(ingredients[:1], tags[:1])
+    data.pop('ingredients')
+    response = user_client.post('/api/recipes/', {
+        **data,
+        'ingredients[0]id': ingredients[0].id,
+        'ingredients[0]amount': 5,
+        'image': upload,
+    }, format='multipart')
+    if error is None:
+        assert response.status_code == 201, response.content
+        assert response.json()['ingredients'][0]['amount'] == 5
+    else:
+        assert response.status_code == 400
+        assert error in response.json()['image'][0]
+
+
+def test_base64_upload(user_client, ingredients, tags):
+    data = recipe_data(ingredients[:1], tags[:1])
+    data['image'] = image_base64(image_format='JPEG')
+    response = user_client.post('/api/recipes/', data, format='json')
+    assert response.status_code == 201, response.content
+    assert response.json()['image'].endswith('.jpeg')
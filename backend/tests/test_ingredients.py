@@ -0,0 +1,89 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from api import search
+from api.cache import bump_version
+from api.search import IngredientIndex, get_ingredient_index
+from recipe.models import Ingredient, TableVersion
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+NAMES = (
+    'Сахар', 'сахарная пудра', 'Ванильный сахар', 'Соль', 'Соус соевый',
+    'Масло сливочное', 'Сливки',
+)
+
+
+@pytest.fixture
+def ingredients():
+    Ingredient.objects.bulk_create(
+        Ingredient(name=name, measurement_unit='г') for name in NAMES
+    )
+
+
+def names(items):
+    return [item['name'] for item in items]
+
+
+def test_prefix_before_substring():
+    index = IngredientIndex(
+        (number, name, 'г') for number, name in enumerate(NAMES)
+    )
+    assert names(index.search('сахар')) == [
+        'Сахар', 'сахарная пудра', 'Ванильный сахар'
+    ]
+    assert names(index.search('СЛИВ')) == ['Сливки', 'Масло сливочное']
+    assert names(index.search('ли')) == ['Масло сливочное', 'Сливки']
+    assert names(index.search('сахар', limit=2)) == [
+        'Сахар', 'сахарная пудра'
+    ]
+    assert len(index.search('')) == len(NAMES)
+    assert index.search('нет такого') == []
+
+
+def test_long_query_ngrams():
+    index = IngredientIndex(
+        (number, name, 'г') for number, name in enumerate(NAMES)
+    )
+    assert names(index.search('ьный сах')) == ['Ванильный сахар']
+    assert names(index.search('сос')) == []
+
+
+def test_endpoint(client, ingredients):
+    response = client.get('/api/ingredients/', {'name': 'сол', 'limit': 5})
+    assert response.status_code == 200
+    assert response.json() == [{
+        'id': Ingredient.objects.get(name='Соль').id,
+        'name': 'Соль',
+        'measurement_unit': 'г',
+    }]
+
+
+def test_rebuilt_after_save(client, ingredients):
+    assert names(get_ingredient_index().search('перец')) == []
+    Ingredient.objects.create(name='Перец', measurement_unit='г')
+    assert names(get_ingredient_index().search('перец')) == ['Перец']
+
+
+def test_rebuilt_after_other_process(ingredients):
+    index = get_ingredient_index()
+    Ingredient.objects.bulk_create([
+        Ingredient(name='Перец', measurement_unit='г')
+    ])
+    assert get_ingredient_index() is index
+    bump_version('ingredient')
+    assert names(get_ingredient_index().search('перец')) == ['Перец']
+
+
+def test_load_ingredients(tmp_path, ingredients):
+    path = tmp_path / 'ingredients.csv'
+    path.write_text('Перец,г\nСоль,г\n', encoding='utf-8')
+    get_ingredient_index()
+    version = search._version
+    call_command('load_ingredients', str(path), stdout=StringIO())
+    assert search._index is None
+    assert names(get_ingredient_index().search('перец')) == ['Перец']
+    assert search._version != version
+    assert TableVersion.objects.get(name='ingredient').version == 1
@@ -0,0 +1,114 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+from recipe.management.commands import load_ingredients
+from recipe.management.commands.load_ingredients import CSVStream, read_json
+from recipe.models import Ingredient, IngredientRecipe
+
+
+def load(*args):
+    out = StringIO()
+    call_command('load_ingredients', *map(str, args), stdout=out)
+    return out.getvalue()
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / 'ingredients.csv'
+    path.write_text(
+        'соль,г\n\n"мука, пшеничная",г\nсоль,г\n', encoding='utf-8'
+    )
+    return path
+
+
+@pytest.mark.django_db
+def test_load_csv(csv_file):
+    assert 'Добавлено ингредиентов: 2' in load(csv_file)
+    assert set(Ingredient.objects.values_list(
+        'name', 'measurement_unit'
+    )) == {('соль', 'г'), ('мука, пшеничная', 'г')}
+    assert 'Добавлено ингредиентов: 0' in load(csv_file)
+    assert Ingredient.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_load_json(tmp_path):
+    path = tmp_path / 'ingredients.json'
+    path.write_text(json.dumps([
+        {'name': f'ингредиент {i}', 'measurement_unit': 'г'}
+        for i in range(10)
+    ]), encoding='utf-8')
+    load(path, '--batch-size', 3)
+    assert Ingredient.objects.count() == 10
+
+
+@pytest.mark.django_db
+def test_dry_run(csv_file):
+    Ingredient.objects.create(name='соль', measurement_unit='г')
+    assert 'Будет добавлено: 1, уже есть: 2' in load(csv_file, '--dry-run')
+    assert Ingredient.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_short_row(tmp_path):
+    path = tmp_path / 'ingredients.csv'
+    path.write_text('соль,г\n\nперец\n', encoding='utf-8')
+    with pytest.raises(CommandError, match='Строка 3'):
+        load(path)
+    assert not Ingredient.objects.exists()
+
+
+def test_read_json_chunks(monkeypatch):
+    monkeypatch.setattr(load_ingredients, 'CHUNK_SIZE', 7)
+    rows = read_json(StringIO(
+        ' [ {"name": "a,]", "measurement_unit": "b"} ,'
+        ' {"name": "c", "measurement_unit": "d"}]\n'
+    ))
+    assert list(rows) == [('a,]', 'b'), ('c', 'd')]
+    assert list(read_json(StringIO('[]'))) == []
+
+
+def test_csv_stream():
+    stream = CSVStream([('a"b', 'c'), ('d', 'e')])
+    assert stream.read(3) == '"a"'
+    assert stream.read() == '"b","c"\n"d","e"\n'
+    assert stream.read(5) == ''
+
+
+@pytest.mark.django_db(transaction=True)
+def test_migration_merges_duplicates(user):
+    executor = MigrationExecutor(connection)
+    before = [('recipe', '0001_initial')]
+    latest = executor.loader.graph.leaf_nodes('recipe')
+    executor.migrate(before)
+    apps = executor.loader.project_state(before).apps
+    Ingredient_ = apps.get_model('recipe.Ingredient')
+    IngredientRecipe_ = apps.get_model('recipe.IngredientRecipe')
+    salt, duplicate, pepper = (
+        Ingredient_.objects.create(name=name, measurement_unit='г')
+        for name in ('соль', 'соль', 'перец')
+    )
+    recipe = apps.get_model('recipe.Recipe').objects.create(
+        author_id=user.id, name='Рецепт', text='Описание',
+        cooking_time=1, image='recipes/image.png'
+    )
+    for ingredient, amount in (
+        (salt, 5), (duplicate, 7), (duplicate, 1), (pepper, 2)
+    ):
+        IngredientRecipe_.objects.create(
+            ingredient_id=ingredient.id, recipe_id=recipe.id, amount=amount
+        )
+    executor = MigrationExecutor(connection)
+    executor.migrate(latest)
+    assert list(Ingredient.objects.values_list('name', flat=True)) == [
+        'соль', 'перец'
+    ]
+    assert dict(IngredientRecipe.objects.values_list(
+        'ingredient__name', 'amount'
+    )) == {'соль': 12, 'перец': 2}
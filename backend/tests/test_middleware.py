@@ -0,0 +1,28 @@
+import logging
+
+import pytest
+
+from api.middleware import QueryBudgetExceeded
+from api.views import RecipeViewSet
+
+
+@pytest.fixture
+def tight_budget(monkeypatch, user_client, create_recipe):
+    create_recipe(user_client)
+    monkeypatch.setattr(RecipeViewSet, 'query_budget', {'list': 1})
+
+
+def test_query_budget_exceeded(client, tight_budget):
+    with pytest.raises(QueryBudgetExceeded, match='RecipeViewSet.list'):
+        client.get('/api/recipes/')
+
+
+def test_query_budget_warning(client, settings, tight_budget, caplog):
+    settings.QUERY_BUDGET_STRICT = False
+    with caplog.at_level(logging.WARNING, logger='api.middleware'):
+        assert client.get('/api/recipes/').status_code == 200
+    assert 'при лимите 1' in caplog.text
+
+
+def test_query_budget_within_limit(db, client):
+    assert client.get('/api/recipes/').status_code == 200
@@ -0,0 +1,75 @@
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def cursor_of(link):
+    return parse_qs(urlparse(link).query)['cursor'][0]
+
+
+def walk(client, limit, on_page=None):
+    """Идентификаторы всех страниц курсора и число страниц."""
+    ids = []
+    pages = 0
+    params = {'cursor': '', 'limit': limit}
+    while True:
+        data = client.get('/api/recipes/', params).json()
+        ids += [recipe['id'] for recipe in data['results']]
+        pages += 1
+        if on_page:
+            on_page(pages)
+        if data['next'] is None:
+            return ids, pages
+        params['cursor'] = cursor_of(data['next'])
+
+
+@pytest.fixture
+def recipes(user_client, create_recipe):
+    return [
+        create_recipe(user_client, name=f'Рецепт {i}')['id']
+        for i in range(7)
+    ]
+
+
+def test_cursor_pages(client, recipes):
+    ids, pages = walk(client, 3)
+    assert ids == sorted(recipes, reverse=True)
+    assert pages == 3
+
+
+def test_no_duplicates_after_insert(client, user_client, create_recipe,
+                                    recipes):
+    def insert(page):
+        if page == 1:
+            create_recipe(user_client, name='Новый')
+
+    ids, _ = walk(client, 3, insert)
+    assert ids == sorted(recipes, reverse=True)
+
+
+def test_previous_page(client, recipes):
+    first = client.get('/api/recipes/', {'cursor': '', 'limit': 3}).json()
+    assert first['previous'] is None
+    assert 'count' not in first
+    second = client.get('/api/recipes/', {
+        'cursor': cursor_of(first['next']), 'limit': 3
+    }).json()
+    back = client.get('/api/recipes/', {
+        'cursor': cursor_of(second['previous']), 'limit': 3
+    }).json()
+    assert back['results'] == first['results']
+
+
+def test_count(client, recipes):
+    data = client.get('/api/recipes/', {
+        'cursor': '', 'limit': 3, 'count': 'true'
+    }).json()
+    assert data['count'] == len(recipes)
+
+
+@pytest.mark.parametrize('cursor', ('not-a-cursor', 'bz1hYmM='))
+def test_invalid_cursor(client, recipes, cursor):
+    response = client.get('/api/recipes/', {'cursor': cursor})
+    assert response.status_code == 404
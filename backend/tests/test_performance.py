@@ -0,0 +1,84 @@
+import json
+import logging
+import re
+
+import pytest
+
+from api.middleware import QueryTimer
+
+
+@pytest.fixture
+def records(caplog):
+    """Записи лога `api.performance` в виде словарей."""
+    caplog.set_level(logging.INFO, logger='api.performance')
+    return lambda: [
+        json.loads(record.getMessage()) for record in caplog.records
+        if record.name == 'api.performance'
+    ]
+
+
+@pytest.fixture
+def timing(settings):
+    settings.PERF_TIMING_ENABLED = True
+
+
+def test_server_timing(timing, client, records, user_client, create_recipe):
+    create_recipe(user_client)
+    response = client.get('/api/recipes/')
+    assert re.findall(
+        r'(\w+);dur=', response['Server-Timing']
+    ) == ['total', 'db', 'app', 'render']
+    record = records()[-1]
+    assert record['view'] == 'RecipeViewSet.list'
+    assert record['status'] == 200
+    assert record['queries'] > 0
+    assert record['duplicated_queries'] == 0
+    assert 'auth_cache' in record
+
+
+def test_timing_token(settings, client, records, db):
+    settings.PERF_TIMING_TOKEN = 'secret'
+    assert 'Server-Timing' not in client.get('/api/tags/')
+    assert 'Server-Timing' not in client.get(
+        '/api/tags/', HTTP_X_PERF_TIMING='sécret'
+    )
+    response = client.get('/api/tags/', HTTP_X_PERF_TIMING='secret')
+    assert 'Server-Timing' in response
+    assert [record['view'] for record in records()] == ['TagViewSet.list']
+
+
+def test_disabled(client, records, db):
+    assert 'Server-Timing' not in client.get('/api/tags/')
+    assert records() == []
+
+
+def test_streamed_response(timing, user_client, records, create_recipe):
+    recipe = create_recipe(user_client)
+    user_client.post(f'/api/recipes/{recipe["id"]}/shopping_cart/')
+    response = user_client.get('/api/recipes/download_shopping_cart/')
+    assert response.streaming
+    assert records()[-1]['view'] != 'RecipeViewSet.download_shopping_cart'
+    content = b''.join(response.streaming_content).decode()
+    assert 'ингредиент 0' in content
+    record = records()[-1]
+    assert record['view'] == 'RecipeViewSet.download_shopping_cart'
+    assert record['streamed']
+    assert record['queries'] > 0
+
+
+def test_duplicate_fingerprint():
+    timer = QueryTimer()
+
+    def execute(sql, params, many, context):
+        return None
+
+    for sql in (
+        'SELECT * FROM recipe WHERE id IN (%s, %s)',
+        'SELECT * FROM recipe WHERE id IN (%s, %s, %s)',
+        'SELECT * FROM recipe WHERE id IN (%s, %s)',
+        'SELECT * FROM tag',
+    ):
+        timer(execute, sql, [], False, {})
+    assert timer.count == 4
+    assert timer.duplicates == 2
+    assert timer.most_duplicated == 'SELECT * FROM recipe WHERE id IN (%s)'
@@ -0,0 +1,138 @@
+import os
+import threading
+
+import pytest
+
+from foodgram_backend.backends import pool as pool_module
+from foodgram_backend.backends.pool import ConnectionPool, PoolTimeout
+from .conftest import get_client
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def check(connection):
+    if connection.closed:
+        raise ConnectionError('соединение закрыто')
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Управляемое `time.monotonic` модуля пула."""
+    now = [1000.0]
+    monkeypatch.setattr(pool_module.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def make_pool(**options):
+    options = {'min_size': 0, 'max_size': 2, 'timeout': 0.05, **options}
+    return ConnectionPool(FakeConnection, check, **options)
+
+
+def test_reuse():
+    pool = make_pool(min_size=1)
+    first = pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+    stats = pool.snapshot()
+    assert stats['hits'] == 2 and stats['misses'] == 0
+
+
+def test_timeout():
+    pool = make_pool()
+    pool.acquire(), pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert pool.snapshot()['timeouts'] == 1
+
+
+def test_wait_for_release():
+    pool = make_pool(timeout=5)
+    first, _ = pool.acquire(), pool.acquire()
+    timer = threading.Timer(0.05, pool.release, [first])
+    timer.start()
+    assert pool.acquire() is first
+    timer.join()
+    stats = pool.snapshot()
+    assert stats['waits'] == 1 and stats['timeouts'] == 0
+
+
+def test_failed_health_check_is_discarded():
+    pool = make_pool()
+    broken = pool.acquire()
+    pool.release(broken)
+    broken.closed = True
+    connection = pool.acquire()
+    assert connection is not broken and not connection.closed
+    stats = pool.snapshot()
+    assert stats['discarded'] == 1 and stats['size'] == 1
+
+
+def test_lifetime_expiry(clock):
+    pool = make_pool(max_lifetime=60)
+    old = pool.acquire()
+    pool.release(old)
+    clock[0] += 61
+    fresh = pool.acquire()
+    assert fresh is not old and old.closed
+    clock[0] += 61
+    pool.release(fresh)
+    assert fresh.closed
+    assert pool.snapshot()['size'] == 0
+
+
+def test_failed_connect_frees_slot():
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError('база недоступна')
+        return FakeConnection()
+
+    pool = ConnectionPool(connect, check, max_size=1, timeout=0.05)
+    with pytest.raises(ConnectionError):
+        pool.acquire()
+    assert pool.acquire() is not None
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='нужен os.fork')
+def test_fork_reset(monkeypatch):
+    pool = make_pool()
+    monkeypatch.setitem(pool_module.pools, 'test', pool)
+    parent = pool.acquire()
+    pool.release(parent)
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        child = pool.acquire()
+        os.write(write, str(
+            (child is not parent, parent.closed, pool.snapshot()['size'])
+        ).encode())
+        os._exit(0)
+    os.close(write)
+    os.waitpid(pid, 0)
+    with os.fdopen(read) as result:
+        assert result.read() == '(True, False, 1)'
+    assert pool.acquire() is parent
+
+
+@pytest.mark.django_db
+def test_stats_endpoint(monkeypatch, users):
+    pool = make_pool()
+    pool.release(pool.acquire())
+    monkeypatch.setitem(pool_module.pools, 'test', pool)
+    admin, user = users[:2]
+    admin.is_staff = True
+    admin.save()
+    assert get_client(user).get('/api/stats/').status_code == 403
+    response = get_client(admin).get('/api/stats/')
+    assert response.status_code == 200
+    data = response.json()
+    assert data['db_pool']['test'] == pool.snapshot()
+    assert {'hits', 'misses', 'hit_rate'} <= set(data['auth_cache'])
@@ -0,0 +1,75 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipe.models import IngredientRecipe
+from .conftest import recipe_data
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+@pytest.fixture
+def recipe(user_client, create_recipe, ingredients, tags):
+    return create_recipe(
+        user_client, ingredients=ingredients[:3], tags=tags[:2], amount=10
+    )
+
+
+def update(client, recipe, ingredients, tags, amounts=None):
+    data = recipe_data(ingredients, tags)
+    if amounts is not None:
+        for item, amount in zip(data['ingredients'], amounts):
+            item['amount'] = amount
+    with CaptureQueriesContext(connection) as queries:
+        response = client.patch(
+            f'/api/recipes/{recipe["id"]}/', data, format='json'
+        )
+    assert response.status_code == 200, response.content
+    return [
+        query['sql'] for query in queries.captured_queries
+        if query['sql'].startswith(WRITES)
+    ]
+
+
+def relation_writes(writes, table):
+    return [sql for sql in writes if f'"{table}"' in sql.split(' (')[0]]
+
+
+def test_no_relation_changes(user_client, recipe, ingredients, tags):
+    writes = update(user_client, recipe, ingredients[:3], tags[:2])
+    assert len(writes) == 1
+    assert writes[0].startswith('UPDATE "recipe_recipe"')
+
+
+def test_mixed_ingredient_changes(user_client, recipe, ingredients, tags):
+    writes = update(
+        user_client, recipe, [ingredients[0], ingredients[1], ingredients[5]],
+        tags[:2], amounts=[10, 20, 30]
+    )
+    ingredient_writes = relation_writes(writes, 'recipe_ingredientrecipe')
+    assert [sql.split()[0] for sql in ingredient_writes] == [
+        'DELETE', 'UPDATE', 'INSERT'
+    ]
+    assert relation_writes(writes, 'recipe_tagrecipe') == []
+    assert dict(IngredientRecipe.objects.filter(
+        recipe_id=recipe['id']
+    ).values_list('ingredient_id', 'amount')) == {
+        ingredients[0].id: 10, ingredients[1].id: 20, ingredients[5].id: 30,
+    }
+
+
+def test_tags_only(user_client, recipe, ingredients, tags):
+    writes = update(user_client, recipe, ingredients[:3], tags[1:])
+    assert relation_writes(writes, 'recipe_ingredientrecipe') == []
+    assert [
+        sql.split()[0]
+        for sql in relation_writes(writes, 'recipe_tagrecipe')
+    ] == ['DELETE', 'INSERT']
+
+
+def test_write_count(user_client, recipe, ingredients, tags):
+    writes = update(
+        user_client, recipe, [ingredients[0], ingredients[1], ingredients[5]],
+        tags[1:], amounts=[10, 20, 30]
+    )
+    assert len(writes) == 6
@@ -0,0 +1,92 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .conftest import get_client
+
+LIST_QUERIES = 5
+DETAIL_QUERIES = 6
+FLAG_TABLES = ('recipe_favorite', 'recipe_shopping')
+
+
+@pytest.fixture
+def recipes(users, create_recipe, ingredients, tags):
+    """По два рецепта у каждого пользователя, с разными ингредиентами."""
+    return [
+        create_recipe(
+            get_client(author),
+            name=f'Рецепт {number}',
+            ingredients=ingredients[number:number + 4],
+            tags=tags[:number % 3 + 1],
+        )
+        for number, author in enumerate(users * 2)
+    ]
+
+
+@pytest.fixture(params=(False, True), ids=('anonymous', 'authenticated'))
+def reader(request, users, client):
+    """Клиент читателя; токен авторизованного уже в кэше."""
+    if not request.param:
+        return client
+    reader = get_client(users[1])
+    assert reader.get('/api/users/me/').status_code == 200
+    return reader
+
+
+@pytest.mark.parametrize('limit', (1, 6))
+def test_list_queries(reader, recipes, limit, django_assert_num_queries):
+    with django_assert_num_queries(LIST_QUERIES):
+        response = reader.get('/api/recipes/', {'limit': limit})
+    assert response.status_code == 200
+    assert len(response.json()['results']) == limit
+
+
+def count_flag_queries(client, **params):
+    """Число запросов к избранному и спискам покупок за один запрос API."""
+    with CaptureQueriesContext(connection) as context:
+        response = client.get('/api/recipes/', params)
+    assert response.status_code == 200
+    return sum(
+        any(table in query['sql'] for table in FLAG_TABLES)
+        for query in context.captured_queries
+    )
+
+
+def test_flags_not_per_recipe(users, recipes):
+    reader = get_client(users[1])
+    assert count_flag_queries(reader, limit=1) == count_flag_queries(
+        reader, limit=6
+    )
+    assert count_flag_queries(get_client(users[1]), limit=6) <= 2
+
+
+def test_list_flags(users, recipes):
+    reader = get_client(users[1])
+    recipe_id = recipes[0]['id']
+    reader.post(f'/api/recipes/{recipe_id}/favorite/')
+    reader.post(f'/api/recipes/{recipe_id}/shopping_cart/')
+    results = {
+        recipe['id']: recipe
+        for recipe in reader.get(
+            '/api/recipes/', {'limit': 10}
+        ).json()['results']
+    }
+    assert results[recipe_id]['is_favorited']
+    assert results[recipe_id]['is_in_shopping_cart']
+    assert not results[recipes[1]['id']]['is_favorited']
+
+
+def test_retrieve_flags(users, recipes):
+    reader = get_client(users[1])
+    recipe_id = recipes[0]['id']
+    reader.post(f'/api/recipes/{recipe_id}/favorite/')
+    response = reader.get(f'/api/recipes/{recipe_id}/')
+    assert response.json()['is_favorited']
+    assert not response.json()['is_in_shopping_cart']
+
+
+def test_retrieve_queries(reader, recipes, django_assert_num_queries):
+    with django_assert_num_queries(DETAIL_QUERIES):
+        response = reader.get(f'/api/recipes/{recipes[0]["id"]}/')
+    assert response.status_code == 200
+    assert response.json()['name'] == recipes[0]['name']
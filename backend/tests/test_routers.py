@@ -0,0 +1,42 @@
+import pytest
+from django.test import RequestFactory
+
+from api.routers import REPLICA, get_read_database, pin_to_primary
+from api.views import RecipeViewSet
+
+from .conftest import get_client
+
+
+@pytest.fixture
+def read_databases(monkeypatch):
+    """Базы чтения, выбранные роутером в `RecipeViewSet.list`."""
+    databases = []
+    list_view = RecipeViewSet.list
+
+    def recording_list(self, request, *args, **kwargs):
+        databases.append(get_read_database(request._request))
+        return list_view(self, request, *args, **kwargs)
+
+    monkeypatch.setattr(RecipeViewSet, 'list', recording_list)
+    return databases
+
+
+def test_anonymous_cache_fill_reads_primary(db, client, read_databases):
+    assert client.get('/api/recipes/').status_code == 200
+    assert client.get('/api/recipes/').status_code == 200
+    assert read_databases == [None]
+
+
+def test_authenticated_reads_replica(user, read_databases):
+    client = get_client(user)
+    assert client.get('/api/recipes/').status_code == 200
+    assert read_databases == [REPLICA]
+
+
+def test_pinned_after_write(user, read_databases):
+    client = get_client(user)
+    pin_to_primary(RequestFactory().post(
+        '/api/recipes/', **client._credentials
+    ))
+    assert client.get('/api/recipes/').status_code == 200
+    assert read_databases == [None]
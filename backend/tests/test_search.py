@@ -0,0 +1,67 @@
+import pytest
+from django.db import connection
+
+from recipe import fulltext
+from recipe.models import Recipe
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor not in fulltext.MATCH,
+    reason='нет полнотекстового индекса'
+)
+
+
+@pytest.fixture
+def recipes(user_client, create_recipe):
+    return [
+        create_recipe(user_client, name='Борщ', text='Суп со свеклой'),
+        create_recipe(user_client, name='Щи', text='Не борщ'),
+        create_recipe(user_client, name='Каша', text='Гречневая'),
+    ]
+
+
+def names(response):
+    return [recipe['name'] for recipe in response.json()['results']]
+
+
+def test_name_ranked_first(client, recipes):
+    response = client.get('/api/recipes/', {'search': 'борщ'})
+    assert response.json()['count'] == 2
+    assert names(response) == ['Борщ', 'Щи']
+
+
+def test_prefix_and_filters(client, recipes, users):
+    response = client.get('/api/recipes/', {
+        'search': 'греч', 'author': users[0].id
+    })
+    assert names(response) == ['Каша']
+    response = client.get('/api/recipes/', {
+        'search': 'греч', 'author': users[1].id
+    })
+    assert response.json()['count'] == 0
+
+
+def test_pagination(client, recipes):
+    response = client.get('/api/recipes/', {
+        'search': 'борщ', 'limit': 1, 'page': 2
+    })
+    assert response.json()['count'] == 2
+    assert names(response) == ['Щи']
+
+
+def test_index_follows_changes(user_client, client, recipes):
+    user_client.delete(f'/api/recipes/{recipes[0]["id"]}/')
+    response = client.get('/api/recipes/', {'search': 'борщ'})
+    assert names(response) == ['Щи']
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(
+    connection.vendor != 'sqlite', reason='план запроса SQLite'
+)
+def test_index_joined_once():
+    queryset = fulltext.search(Recipe.objects.all(), 'борщ')
+    sql, params = queryset.query.sql_with_params()
+    assert sql.count('recipe_search" MATCH') == 1
+    plan = queryset.explain()
+    assert 'SCAN recipe_search VIRTUAL TABLE' in plan
+    assert 'SEARCH recipe_recipe USING INTEGER PRIMARY KEY' in plan
@@ -0,0 +1,121 @@
+from io import StringIO
+
+import pytest
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipe import shopping_list
+from recipe.models import Recipe, ShoppingListItem
+from .conftest import get_client, recipe_data
+
+
+def get_items():
+    return sorted(ShoppingListItem.objects.values_list(
+        'user_id', 'ingredient_id', 'amount'
+    ))
+
+
+def rebuilt_items():
+    """Списки покупок, пересчитанные с нуля по таблице `Shopping`."""
+    shopping_list.rebuild(apps.get_model)
+    return get_items()
+
+
+@pytest.fixture
+def carts(users, create_recipe, ingredients):
+    """Рецепты первого пользователя в списках покупок всех."""
+    author = get_client(users[0])
+    recipes = [
+        create_recipe(
+            author, name=f'Рецепт {number}',
+            ingredients=ingredients[number:number + 3], amount=number + 1
+        )
+        for number in range(3)
+    ]
+    other = create_recipe(
+        get_client(users[1]), ingredients=ingredients[:2], amount=7
+    )
+    for user in users:
+        client = get_client(user)
+        for recipe in recipes + [other]:
+            response = client.post(
+                f'/api/recipes/{recipe["id"]}/shopping_cart/'
+            )
+            assert response.status_code == 201, response.content
+    return recipes
+
+
+def test_add_and_remove(users, carts):
+    client = get_client(users[1])
+    client.delete(f'/api/recipes/{carts[0]["id"]}/shopping_cart/')
+    items = get_items()
+    assert items == rebuilt_items()
+
+
+def delete_queries(func):
+    with CaptureQueriesContext(connection) as queries:
+        func()
+    return [
+        query['sql'] for query in queries.captured_queries
+        if 'recipe_shoppinglistitem' in query['sql']
+    ]
+
+
+def test_recipe_deletion(carts):
+    recipe = Recipe.objects.get(pk=carts[0]['id'])
+    queries = delete_queries(recipe.delete)
+    assert len(queries) == 2
+    items = get_items()
+    assert items == rebuilt_items()
+
+
+def test_author_deletion(users, carts):
+    queries = delete_queries(users[0].delete)
+    assert len(queries) == 3
+    assert queries[-1].startswith('DELETE')
+    items = get_items()
+    assert {user_id for user_id, _, _ in items} == {
+        users[1].id, users[2].id
+    }
+    assert items == rebuilt_items()
+
+
+def test_recipes_queryset_deletion(carts):
+    Recipe.objects.filter(id__in=[recipe['id'] for recipe in carts]).delete()
+    items = get_items()
+    assert items == rebuilt_items()
+    assert {amount for _, _, amount in items} == {7}
+
+
+def test_recipe_update(user, user_client, carts, ingredients, tags):
+    data = recipe_data(
+        [ingredients[0], ingredients[2], ingredients[5]], tags[:1]
+    )
+    for item, amount in zip(data['ingredients'], (4, 1, 6)):
+        item['amount'] = amount
+    with CaptureQueriesContext(connection) as queries:
+        response = user_client.patch(
+            f'/api/recipes/{carts[0]["id"]}/', data, format='json'
+        )
+    assert response.status_code == 200, response.content
+    writes = [
+        query['sql'].split()[0] for query in queries.captured_queries
+        if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+        and '"recipe_shoppinglistitem"' in query['sql'].split(' (')[0]
+    ]
+    assert writes == ['INSERT', 'DELETE']
+    items = get_items()
+    assert items == rebuilt_items()
+
+
+def test_rebuild_command(users, carts):
+    items = get_items()
+    ShoppingListItem.objects.filter(user=users[1]).update(amount=1)
+    ShoppingListItem.objects.filter(user=users[2]).delete()
+    call_command(
+        'rebuild_shopping_lists', '--user', users[1].id,
+        '--user', users[2].id, stdout=StringIO()
+    )
+    assert get_items() == items
@@ -0,0 +1,100 @@
+from io import StringIO
+
+import numpy as np
+import pytest
+from django.apps import apps
+from django.core.management import call_command
+
+from recipe import similarity
+from recipe.models import SimilarRecipe, SimilarRecipeRun, TableVersion
+from .conftest import recipe_data
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+COMPOSITIONS = (
+    ('Борщ', (0, 1, 2, 3), (0,)),
+    ('Щи', (0, 1, 2), (0,)),
+    ('Рассольник', (1, 2, 4), (1,)),
+    ('Салат', (5, 6), (1,)),
+    ('Винегрет', (2, 5, 6), (1, 2)),
+    ('Компот', (7,), (2,)),
+)
+
+
+@pytest.fixture
+def recipes(user_client, create_recipe, ingredients, tags):
+    return {
+        name: create_recipe(
+            user_client, name=name,
+            ingredients=[ingredients[number] for number in numbers],
+            tags=[tags[number] for number in tag_numbers],
+        )['id']
+        for name, numbers, tag_numbers in COMPOSITIONS
+    }
+
+
+def dense_scores():
+    """Косинусная близость, посчитанная напрямую по всем парам."""
+    vectors = np.array([
+        [1.0 if number in numbers else 0.0 for number in range(10)]
+        + [
+            similarity.TAG_WEIGHT if number in tag_numbers else 0.0
+            for number in range(3)
+        ]
+        for _, numbers, tag_numbers in COMPOSITIONS
+    ])
+    norms = np.linalg.norm(vectors, axis=1)
+    scores = vectors @ vectors.T / np.outer(norms, norms)
+    np.fill_diagonal(scores, 0)
+    return scores
+
+
+def neighbours():
+    return {
+        (recipe_id, similar_id): round(score, 5)
+        for recipe_id, similar_id, score in SimilarRecipe.objects.values_list(
+            'recipe_id', 'similar_id', 'score'
+        )
+    }
+
+
+@pytest.mark.parametrize('block_cells', (similarity.BLOCK_CELLS, 3))
+def test_scores(monkeypatch, recipes, block_cells):
+    monkeypatch.setattr(similarity, 'BLOCK_CELLS', block_cells)
+    features = similarity.Features(apps.get_model)
+    positions = np.arange(len(features.ids))
+    scores = np.concatenate([
+        block_scores for _, block_scores in features.blocks(positions)
+    ])
+    np.testing.assert_allclose(scores, dense_scores(), rtol=1e-6)
+
+
+def test_rebuild_command(client, recipes):
+    out = StringIO()
+    call_command('rebuild_similar_recipes', '--count', 2, stdout=out)
+    assert f'Пересчитано рецептов: {len(recipes)}' in out.getvalue()
+    assert SimilarRecipeRun.objects.get().recipes == len(recipes)
+    assert not TableVersion.objects.filter(name='similar_recipe').exists()
+    response = client.get(f'/api/recipes/{recipes["Борщ"]}/similar/')
+    assert [recipe['name'] for recipe in response.json()] == [
+        'Щи', 'Рассольник'
+    ]
+
+
+def test_incremental_rebuild(user_client, recipes, ingredients, tags):
+    call_command('rebuild_similar_recipes', '--count', 2, stdout=StringIO())
+    response = user_client.patch(
+        f'/api/recipes/{recipes["Компот"]}/',
+        recipe_data(ingredients[5:7], tags[1:2], name='Компот'),
+        format='json'
+    )
+    assert response.status_code == 200
+    out = StringIO()
+    call_command('rebuild_similar_recipes', '--count', 2, stdout=out)
+    assert 'Пересчитано рецептов: 3' in out.getvalue()
+    incremental = neighbours()
+    call_command(
+        'rebuild_similar_recipes', '--count', 2, '--full', stdout=StringIO()
+    )
+    assert incremental == neighbours()
+    assert (recipes['Салат'], recipes['Компот']) in incremental
@@ -0,0 +1,44 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .conftest import get_client
+
+
+@pytest.fixture
+def subscriptions(users, user_client, create_recipe):
+    for author in users[1:]:
+        author_client = get_client(author)
+        for number in range(3):
+            create_recipe(author_client, name=f'Рецепт {number}')
+        response = user_client.post(f'/api/users/{author.id}/subscribe/')
+        assert response.status_code == 201, response.content
+    return users[1:]
+
+
+def get_subscriptions(client, **params):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get('/api/users/subscriptions/', params)
+    assert response.status_code == 200
+    return response.json()['results'], len(queries)
+
+
+def test_queries_do_not_depend_on_limits(user_client, subscriptions):
+    user_client.get('/api/users/me/')
+    short, short_queries = get_subscriptions(
+        user_client, limit=1, recipes_limit=1
+    )
+    full, full_queries = get_subscriptions(
+        user_client, limit=50, recipes_limit=2
+    )
+    assert short_queries == full_queries
+    assert len(short) == 1 and len(short[0]['recipes']) == 1
+    assert len(full) == len(subscriptions)
+    for author in full:
+        assert len(author['recipes']) == 2
+        assert author['recipes_count'] == 3
+
+
+def test_recipes_limit_ignores_invalid_value(user_client, subscriptions):
+    results, _ = get_subscriptions(user_client, recipes_limit='много')
+    assert all(len(author['recipes']) == 3 for author in results)
@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.utils import timezone
+
+from recipe.models import Favorite
+from .conftest import get_client
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def get_trending(client, window='24h'):
+    response = client.get('/api/recipes/trending/', {'window': window})
+    assert response.status_code == 200
+    return [
+        (recipe['id'], recipe['trending_score'])
+        for recipe in response.json()
+    ]
+
+
+@pytest.fixture
+def recipes(user_client, create_recipe):
+    return [create_recipe(user_client, name=f'Рецепт {i}') for i in range(3)]
+
+
+def test_rebuild_refreshes_cache(client, users, recipes):
+    call_command('rebuild_trending')
+    assert get_trending(client) == []
+    for user in users[1:]:
+        get_client(user).post(f'/api/recipes/{recipes[1]["id"]}/favorite/')
+    get_client(users[1]).post(
+        f'/api/recipes/{recipes[2]["id"]}/shopping_cart/'
+    )
+    call_command('rebuild_trending')
+    assert get_trending(client) == [
+        (recipes[1]['id'], 2), (recipes[2]['id'], 1)
+    ]
+
+
+def test_windows(client, users, recipes):
+    get_client(users[1]).post(f'/api/recipes/{recipes[0]["id"]}/favorite/')
+    Favorite.objects.update(created_at=timezone.now() - timedelta(days=2))
+    call_command('rebuild_trending')
+    assert get_trending(client, '24h') == []
+    assert get_trending(client, '7d') == [(recipes[0]['id'], 1)]
+
+
+def test_legacy_events_outside_windows(users, recipes):
+    executor = MigrationExecutor(connection)
+    before = [('recipe', '0009_similarrecipe')]
+    latest = executor.loader.graph.leaf_nodes('recipe')
+    executor.migrate(before)
+    apps = executor.loader.project_state(before).apps
+    apps.get_model('recipe.Favorite').objects.create(
+        user_id=users[1].id, recipe_id=recipes[0]['id']
+    )
+    executor = MigrationExecutor(connection)
+    executor.migrate(latest)
+    favorite = Favorite.objects.get()
+    assert favorite.created_at < timezone.now() - timedelta(days=365)
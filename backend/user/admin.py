@@ -10,8 +10,10 @@ class UserAdmin(admin.ModelAdmin):
         'username',
         'first_name',
         'last_name',
+        'recipes_count',
     )
     list_filter = ('email', 'username')
+    readonly_fields = ('recipes_count',)
 
 
 admin.site.register(User, UserAdmin)
@@ -2,11 +2,44 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 
 
-class User(AbstractUser):
+class CountersModel(models.Model):
+    """Модель со счетчиками, которые меняются только выражениями `F()`.
+
+    При сохранении существующей записи счетчики из `counter_fields`
+    не перезаписываются значениями, прочитанными ранее. Запись
+    с `pk = None` сохраняется как новая, со всеми полями.
+    """
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and self.pk is not None
+            and kwargs.get('update_fields') is None
+        ):
+            skipped = set(self.counter_fields) | self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skipped
+                and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(AbstractUser, CountersModel):
     """Модель пользователя."""
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name', 'password']
+    counter_fields = ('recipes_count',)
     email = models.EmailField(unique=True)
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число рецептов'
+    )
 
     def __str__(self):
         return f'{self.username}'